@@ -1,52 +1,644 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, abort, g, send_from_directory, url_for
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as VerifyTimeout
+import atexit
+import gzip
+import hashlib
 import json
+import multiprocessing
 import os
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+from werkzeug.http import http_date
+
+import ghosts
+import leaderboard
+import live
+import metrics
+import replay
+import static_assets
+import telemetry
 
 app = Flask(__name__)
 
-# High score file
+# Leaderboard database; highscore.json is only read to import the old
+# high score the first time the database is created
+LEADERBOARD_DB = os.environ.get('LEADERBOARD_DB', 'leaderboard.db')
 HIGH_SCORE_FILE = 'highscore.json'
+PLAYER_NAME_MAX = 32
+# Largest score, level or coin count accepted; SQLite integers stop at 2**63
+SCORE_FIELD_MAX = 2 ** 31
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+
+# Live leaderboard stream. Each open stream holds a server thread, so keep
+# LIVE_MAX_SUBSCRIBERS below gunicorn's --threads to leave room for requests.
+# The default leaves 2 of the default 4 threads; raise both for more viewers,
+# or serve asgi:app, where a viewer doesn't hold a thread.
+LIVE_MAX_SUBSCRIBERS = int(os.environ.get('LIVE_MAX_SUBSCRIBERS', 2))
+LIVE_POLL_INTERVAL = float(os.environ.get('LIVE_POLL_INTERVAL', 0.5))
+LIVE_COALESCE = float(os.environ.get('LIVE_COALESCE', 0.1))
+LIVE_KEEPALIVE = 15.0
+LIVE_RETRY_MS = 5000
+
+_leaderboard_feed = None
+
+# Batched score ingestion: events are queued in memory and written by a
+# background thread in batches of up to INGEST_BATCH_SIZE, one transaction
+# each. Requests that would overflow the queue are refused with 503.
+INGEST_MAX_QUEUE = int(os.environ.get('INGEST_MAX_QUEUE', 20000))
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 1000))
+INGEST_MAX_EVENTS = 1000  # per request
+INGEST_SHUTDOWN_TIMEOUT = 10.0
+
+_ingest_queue = deque()
+_ingest_cond = threading.Condition()
+_ingest_thread = None
+_ingest_stopping = False
+_ingest_stats = {
+    'accepted': 0,
+    'overloaded': 0,
+    'written': 0,
+    'batches': 0,
+    'write_errors': 0,
+    'dropped': 0,
+    'max_queued': 0,
+}
+
+# Game config, served from memory: serialized and gzipped once per change to
+# the file, with a strong ETag per encoding so clients can revalidate cheaply
+CONFIG_FILE = 'levels.json'
+_config_cache = None
+_config_lock = threading.Lock()
+
+# Fingerprinted static files from static_assets.py. A hashed URL never changes
+# content, so browsers may keep it for a year without revalidating.
+ASSET_MANIFEST = static_assets.load_manifest()
+ASSET_FILES = frozenset(ASSET_MANIFEST['files'].values())
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Score verification: submitted runs are re-simulated in a process pool so
+# request threads only wait, never burn CPU on the simulation themselves.
+VERIFY_WORKERS = int(os.environ.get('VERIFY_WORKERS', os.cpu_count() or 1))
+VERIFY_MAX_PENDING = int(os.environ.get('VERIFY_MAX_PENDING', 64))
+VERIFY_TIMEOUT = float(os.environ.get('VERIFY_TIMEOUT', 2.0))
+VERIFY_MAX_FRAMES = int(os.environ.get('VERIFY_MAX_FRAMES', 60 * 60 * 30))
+REQUIRE_VERIFIED_SCORES = os.environ.get('REQUIRE_VERIFIED_SCORES', '0') == '1'
+
+_verify_pool = None
+_verify_lock = threading.Lock()
+_verify_stats = {
+    'submitted': 0,
+    'verified': 0,
+    'rejected': 0,
+    'timed_out': 0,
+    'overloaded': 0,
+    'pending': 0,
+    'max_pending': 0,
+}
+_verify_latencies = deque(maxlen=1000)
+_verify_started = time.monotonic()
+
+# Client frame-time telemetry, appended to gzipped segments in TELEMETRY_DIR
+# and summarized with `python telemetry.py rollup`
+TELEMETRY_DIR = os.environ.get('TELEMETRY_DIR', 'telemetry')
+TELEMETRY_SEGMENT_BYTES = int(os.environ.get('TELEMETRY_SEGMENT_BYTES', 16 * 1024 * 1024))
+TELEMETRY_MAX_SEGMENTS = int(os.environ.get('TELEMETRY_MAX_SEGMENTS', 32))
+TELEMETRY_MAX_BODY = 64 * 1024
+
+_telemetry_log = None
+_telemetry_lock = threading.Lock()
+
+# Replays of the best verified runs, for players to race as ghosts
+GHOST_DIR = os.environ.get('GHOST_DIR', 'ghosts')
+GHOST_CAPACITY = int(os.environ.get('GHOST_CAPACITY', ghosts.DEFAULT_CAPACITY))
+
+_ghost_store = None
+_ghost_lock = threading.Lock()
+
+# Prometheus metrics at /metrics. Each worker writes its values to a file in
+# METRICS_DIR and a scrape adds them all up. The default directory is per
+# gunicorn master, so workers of one server share it.
+METRICS_DIR = os.environ.get('METRICS_DIR') or os.path.join(
+    tempfile.gettempdir(), f'flappybird-metrics-{os.getppid()}')
+
+registry = metrics.Metrics(METRICS_DIR)
+registry.define('flappybird_http_requests_total', 'counter',
+                'Requests answered, by route, method and status.', ('route', 'method', 'status'))
+registry.define('flappybird_http_request_duration_seconds', 'histogram',
+                'Time to produce a response (to the first byte, for streams).', ('route', 'method'))
+registry.define('flappybird_http_requests_in_flight', 'gauge',
+                'Requests being handled. Near workers x threads means requests are queueing.')
+registry.define('flappybird_io_duration_seconds', 'histogram',
+                'Leaderboard database calls and levels.json reads.', ('operation',))
+
+def get_leaderboard():
+    # Opened lazily so each gunicorn worker gets its own connections and cache
+    global _leaderboard
+    with _leaderboard_lock:
+        if _leaderboard is None:
+            board = leaderboard.Leaderboard(LEADERBOARD_DB, legacy_file=HIGH_SCORE_FILE)
+            _leaderboard = registry.instrument(
+                board, ('submit', 'submit_many', 'top', 'high_score', 'player_best', 'level_stats'),
+                'flappybird_io_duration_seconds', 'leaderboard')
+        return _leaderboard
+
+def get_ghost_store():
+    global _ghost_store
+    with _ghost_lock:
+        if _ghost_store is None:
+            _ghost_store = registry.instrument(ghosts.GhostStore(GHOST_DIR, GHOST_CAPACITY),
+                                               ('add', 'get'), 'flappybird_io_duration_seconds',
+                                               'ghosts')
+        return _ghost_store
+
+def store_ghost(run, score, player):
+    """Keep a verified run's replay if it's one of the best; returns its rank or None."""
+    seed, flaps, frames = run
+    store = get_ghost_store()
+    # Most runs don't make the cut: check before encoding the replay
+    if not store.qualifies(score):
+        return None
+    return store.add(replay.Replay(seed, sorted(flaps), frames, score), player)
+
+def get_telemetry_log():
+    global _telemetry_log
+    with _telemetry_lock:
+        if _telemetry_log is None:
+            _telemetry_log = telemetry.TelemetryLog(TELEMETRY_DIR, TELEMETRY_SEGMENT_BYTES,
+                                                    TELEMETRY_MAX_SEGMENTS)
+        return _telemetry_log
+
+@atexit.register
+def flush_telemetry():
+    if _telemetry_log is not None:
+        _telemetry_log.flush()
+
+def get_leaderboard_feed(max_subscribers=LIVE_MAX_SUBSCRIBERS):
+    # The first caller's max_subscribers sticks: asgi.py allows many more
+    global _leaderboard_feed
+    board = get_leaderboard()
+    with _leaderboard_lock:
+        if _leaderboard_feed is None:
+            _leaderboard_feed = live.LeaderboardFeed(board, leaderboard.TOP_N, LIVE_POLL_INTERVAL,
+                                                     LIVE_COALESCE, max_subscribers)
+    _leaderboard_feed.start()
+    return _leaderboard_feed
+
+def scores_changed():
+    # Push the change to this worker's streams now rather than on the next poll
+    if _leaderboard_feed is not None:
+        _leaderboard_feed.notify()
+
+def parse_score_event(data):
+    """(score, player, level, coins) from a submitted run, or None if invalid."""
+    if not isinstance(data, dict):
+        return None
+    score = data.get('score', 0)
+    player = data.get('player', leaderboard.DEFAULT_PLAYER)
+    level = data.get('level')
+    coins = data.get('coins')
+    if (not isinstance(score, int) or not 0 <= score <= SCORE_FIELD_MAX
+            or not isinstance(player, str) or not 0 < len(player) <= PLAYER_NAME_MAX
+            or not (level is None or isinstance(level, int) and 1 <= level <= SCORE_FIELD_MAX)
+            or not (coins is None or isinstance(coins, int) and 0 <= coins <= SCORE_FIELD_MAX)):
+        return None
+    return score, player, level, coins
+
+def parse_replay(data):
+    """(seed, flap frames, frames played) from a submitted run, or None if invalid."""
+    seed = data['seed']
+    flaps = data.get('flaps', [])
+    frames = data.get('frames')
+    if (not isinstance(seed, int) or not 0 <= seed < 2 ** 64
+            or not isinstance(frames, int) or not 0 < frames <= VERIFY_MAX_FRAMES
+            or not isinstance(flaps, list) or len(flaps) > VERIFY_MAX_FRAMES
+            or not all(isinstance(f, int) and f >= 0 for f in flaps)):
+        return None
+    return seed, flaps, frames
+
+def enqueue_scores(events):
+    """Queue runs for the background writer; False if the queue is too full.
+
+    events are (score, player, level, coins, verified) tuples. With
+    REQUIRE_VERIFIED_SCORES set, an unverified run is a ValueError: the
+    endpoints refuse them first, and this keeps any other caller from
+    getting one onto the leaderboard.
+    """
+    global _ingest_thread
+    if REQUIRE_VERIFIED_SCORES and not all(event[4] for event in events):
+        raise ValueError('REQUIRE_VERIFIED_SCORES is set: only verified runs can be queued')
+    with _ingest_cond:
+        if _ingest_thread is None:
+            # Started lazily so each gunicorn worker gets its own writer
+            _ingest_thread = threading.Thread(target=_ingest_loop, name='score-writer', daemon=True)
+            _ingest_thread.start()
+        if _ingest_stopping or len(_ingest_queue) + len(events) > INGEST_MAX_QUEUE:
+            _ingest_stats['overloaded'] += len(events)
+            return False
+        _ingest_queue.extend(events)
+        _ingest_stats['accepted'] += len(events)
+        _ingest_stats['max_queued'] = max(_ingest_stats['max_queued'], len(_ingest_queue))
+        _ingest_cond.notify()
+    return True
+
+def _ingest_loop():
+    board = get_leaderboard()
+    while True:
+        with _ingest_cond:
+            while not _ingest_queue and not _ingest_stopping:
+                _ingest_cond.wait()
+            if not _ingest_queue:
+                return  # Stopping, and everything has been written
+            # Events that arrive while a batch is being written make up the next one
+            batch = [_ingest_queue.popleft() for _ in range(min(len(_ingest_queue), INGEST_BATCH_SIZE))]
+        try:
+            board.submit_many(batch)
+            scores_changed()
+        except sqlite3.Error:
+            with _ingest_cond:
+                _ingest_stats['write_errors'] += 1
+                if _ingest_stopping:
+                    continue  # Give up on this batch rather than hang shutdown
+                _ingest_queue.extendleft(reversed(batch))
+            time.sleep(0.5)
+            continue
+        except Exception:
+            # Retrying won't help a batch the database can't take: drop it,
+            # but keep the writer alive for everything queued behind it
+            app.logger.exception('dropped a batch of %d scores', len(batch))
+            with _ingest_cond:
+                _ingest_stats['dropped'] += len(batch)
+            continue
+        with _ingest_cond:
+            _ingest_stats['written'] += len(batch)
+            _ingest_stats['batches'] += 1
+
+@atexit.register
+def flush_scores():
+    """Write out everything still queued; runs when a worker shuts down."""
+    global _ingest_stopping
+    with _ingest_cond:
+        _ingest_stopping = True
+        _ingest_cond.notify()
+        thread = _ingest_thread
+    if thread is not None:
+        thread.join(INGEST_SHUTDOWN_TIMEOUT)
+
+def ingest_stats():
+    with _ingest_cond:
+        stats = dict(_ingest_stats)
+        stats['queued'] = len(_ingest_queue)
+    stats['max_queue'] = INGEST_MAX_QUEUE
+    stats['batch_size'] = INGEST_BATCH_SIZE
+    return stats
+
+def get_config_cache():
+    """levels.json as (mtime, last_modified, variants), reloaded when the file changes.
 
-def load_high_score():
-    if os.path.exists(HIGH_SCORE_FILE):
-        with open(HIGH_SCORE_FILE, 'r') as f:
-            return json.load(f).get('high_score', 0)
-    return 0
-
-def save_high_score(score):
-    current_high_score = load_high_score()
-    if score > current_high_score:
-        with open(HIGH_SCORE_FILE, 'w') as f:
-            json.dump({'high_score': score}, f)
+    variants maps "client accepts gzip" to that encoding's (body, ETag, headers).
+    """
+    global _config_cache
+    with registry.timer('flappybird_io_duration_seconds', ('config.stat',)):
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+    cached = _config_cache
+    if cached is None or cached[0] != mtime:
+        with _config_lock:
+            cached = _config_cache
+            if cached is None or cached[0] != mtime:
+                with registry.timer('flappybird_io_duration_seconds', ('config.load',)):
+                    with open(CONFIG_FILE, 'rb') as f:
+                        config = json.load(f)
+                body = app.json.dumps(config).encode() + b'\n'
+                digest = hashlib.sha256(body).hexdigest()[:32]
+                last_modified = mtime // 1_000_000_000
+                headers = [('Content-Type', 'application/json'),
+                           ('Last-Modified', http_date(last_modified)),
+                           # Always revalidate, so edits show up on the next load
+                           ('Cache-Control', 'no-cache'),
+                           ('Vary', 'Accept-Encoding')]
+                variants = {
+                    False: (body, digest, headers + [('ETag', f'"{digest}"')]),
+                    True: (gzip.compress(body, mtime=0), f'{digest}-gzip',
+                           headers + [('ETag', f'"{digest}-gzip"'), ('Content-Encoding', 'gzip')]),
+                }
+                cached = _config_cache = (mtime, last_modified, variants)
+    return cached
+
+def get_verify_pool():
+    # Created lazily so each gunicorn worker gets its own pool after forking
+    global _verify_pool
+    with _verify_lock:
+        if _verify_pool is None:
+            _verify_pool = ProcessPoolExecutor(max_workers=VERIFY_WORKERS,
+                                               mp_context=multiprocessing.get_context('spawn'))
+        return _verify_pool
+
+def verify_admit():
+    """Count a submitted run; False if too many are already waiting."""
+    with _verify_lock:
+        _verify_stats['submitted'] += 1
+        if _verify_stats['pending'] >= VERIFY_MAX_PENDING:
+            _verify_stats['overloaded'] += 1
+            return False
+        _verify_stats['pending'] += 1
+        _verify_stats['max_pending'] = max(_verify_stats['max_pending'], _verify_stats['pending'])
         return True
-    return False
+
+def verify_release(future=None):
+    # Frees a verify_admit() slot once the simulation has actually finished
+    # (or was cancelled before starting), not when a request stops waiting
+    with _verify_lock:
+        _verify_stats['pending'] -= 1
+
+def verify_submit(seed, flaps, frames, score):
+    """Start re-simulating an admitted run on the pool; returns the future."""
+    try:
+        future = get_verify_pool().submit(replay.verify, seed, flaps, score, frames)
+    except BaseException:
+        verify_release()
+        raise
+    future.add_done_callback(verify_release)
+    return future
+
+def verify_done(result, start):
+    if result is None:
+        return
+    with _verify_lock:
+        _verify_stats[result] += 1
+        _verify_latencies.append(time.perf_counter() - start)
+
+def verify_run(seed, flaps, frames, score):
+    """Re-simulate a run within the latency budget.
+
+    Returns 'verified', 'rejected', 'timed_out' or 'overloaded'.
+    """
+    if not verify_admit():
+        return 'overloaded'
+
+    start = time.perf_counter()
+    result = None
+    try:
+        future = verify_submit(seed, flaps, frames, score)
+        try:
+            matches, _, _ = future.result(timeout=VERIFY_TIMEOUT)
+            result = 'verified' if matches else 'rejected'
+        except VerifyTimeout:
+            future.cancel()
+            result = 'timed_out'
+    finally:
+        verify_done(result, start)
+    return result
+
+def verify_stats():
+    with _verify_lock:
+        stats = dict(_verify_stats)
+        latencies = sorted(_verify_latencies)
+    uptime = time.monotonic() - _verify_started
+    stats['verified_per_second'] = stats['verified'] / uptime if uptime else 0
+    if latencies:
+        stats['latency_ms'] = {
+            'p50': latencies[len(latencies) // 2] * 1000,
+            'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+            'max': latencies[-1] * 1000,
+        }
+    stats['workers'] = VERIFY_WORKERS
+    stats['max_pending_allowed'] = VERIFY_MAX_PENDING
+    stats['timeout_ms'] = VERIFY_TIMEOUT * 1000
+    return stats
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    registry.inc('flappybird_http_requests_in_flight')
+
+@app.after_request
+def record_request_metrics(response):
+    # Also runs for error responses, including unhandled exceptions
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    registry.observe('flappybird_http_request_duration_seconds', (route, request.method),
+                     time.perf_counter() - g.request_start)
+    registry.inc('flappybird_http_requests_total', (route, request.method, str(response.status_code)))
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if 'request_start' in g:
+        registry.inc('flappybird_http_requests_in_flight', value=-1)
+
+@app.template_global()
+def asset_url(filename):
+    """URL of a file under static/: the hashed copy if it's been built."""
+    hashed = ASSET_MANIFEST['files'].get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('get_asset', filename=hashed)
+
+@app.template_global()
+def asset_urls():
+    # For game.js, which loads images and sounds itself
+    return {filename: asset_url(filename) for filename in ASSET_MANIFEST['files']}
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/assets/<path:filename>')
+def get_asset(filename):
+    if filename not in ASSET_FILES:
+        abort(404)
+    path, encoding, mimetype = static_assets.choose_variant(
+        ASSET_MANIFEST, filename, request.headers.get('Accept-Encoding'))
+    response = send_from_directory(os.path.abspath(static_assets.DIST_DIR), path, mimetype=mimetype,
+                                   download_name=os.path.basename(filename))
+    response.headers['Cache-Control'] = ASSET_CACHE_CONTROL
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if filename in ASSET_MANIFEST['encodings']:
+        response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 @app.route('/api/config')
 def get_config():
-    with open('levels.json', 'r') as f:
-        config = json.load(f)
-    return jsonify(config)
+    _, last_modified, variants = get_config_cache()
+    body, etag, headers = variants[static_assets.accepts_encoding(
+        request.headers.get('Accept-Encoding'), 'gzip')]
+    if 'If-None-Match' in request.headers:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        since = request.if_modified_since
+        not_modified = since is not None and since.timestamp() >= last_modified
+    if not_modified:
+        return Response(status=304, headers=headers)
+    return Response(body, headers=headers)
 
 @app.route('/api/highscore', methods=['GET'])
 def get_high_score():
-    return jsonify({'high_score': load_high_score()})
+    return jsonify({'high_score': get_leaderboard().high_score()})
 
 @app.route('/api/highscore', methods=['POST'])
 def update_high_score():
     data = request.get_json()
-    score = data.get('score', 0)
-    is_new_high = save_high_score(score)
+    event = parse_score_event(data)
+    if event is None:
+        return jsonify({'success': False, 'error': 'invalid score'}), 400
+    score, player, level, coins = event
+
+    # Runs sent as a seed plus the frames the player flapped on are
+    # re-simulated with the desktop game's rules before being accepted.
+    verified = False
+    if 'seed' in data:
+        run = parse_replay(data)
+        if run is None:
+            return jsonify({'success': False, 'error': 'invalid run'}), 400
+        result = verify_run(*run, score)
+        if result == 'rejected':
+            return jsonify({'success': False, 'error': 'score does not match replay'}), 422
+        if result != 'verified':
+            return jsonify({'success': False, 'error': f'verification {result}'}), 503
+        verified = True
+    elif REQUIRE_VERIFIED_SCORES:
+        return jsonify({'success': False, 'error': 'seed and flaps are required'}), 400
+
+    board = get_leaderboard()
+    is_new_high = board.submit(score, player, level, coins, verified)
+    scores_changed()
+    if verified:
+        store_ghost(run, score, player)
     return jsonify({
         'success': True,
         'is_new_high': is_new_high,
-        'high_score': load_high_score()
+        'high_score': board.high_score()
     })
 
+@app.route('/api/leaderboard')
+def get_top_players():
+    limit = request.args.get('limit', leaderboard.TOP_N, type=int)
+    limit = max(1, min(limit, 100))
+    top = get_leaderboard().top(limit)
+    return jsonify({'players': [{'player': player, 'score': best} for player, best in top]})
+
+@app.route('/api/ghost')
+def get_ghost():
+    rank = request.args.get('rank', 1, type=int)
+    # The replay.py bytes straight out of the store's memory map; WSGI
+    # servers only take bytes, so the few hundred bytes are copied once here
+    ghost = get_ghost_store().get(rank)
+    if ghost is None:
+        abort(404)
+    data, player, score, frames = ghost
+    response = Response(bytes(data), mimetype='application/octet-stream')
+    response.headers['X-Ghost-Player'] = quote(player)
+    response.headers['X-Ghost-Score'] = str(score)
+    response.headers['X-Ghost-Frames'] = str(frames)
+    return response
+
+@app.route('/api/ghosts')
+def get_ghosts():
+    limit = max(1, min(request.args.get('limit', leaderboard.TOP_N, type=int), 100))
+    return jsonify({'ghosts': [{'rank': rank, 'player': player, 'score': score, 'frames': frames}
+                               for rank, player, score, frames in get_ghost_store().top(limit)]})
+
+@app.route('/api/leaderboard/stream')
+def stream_leaderboard():
+    # Server-Sent Events: the current top players right away, then again
+    # whenever they change
+    feed = get_leaderboard_feed()
+    if not feed.subscribe():
+        response = jsonify({'success': False, 'error': 'too many live viewers'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    def events():
+        yield f'retry: {LIVE_RETRY_MS}\n\n'.encode()
+        seen = 0
+        while True:
+            seen, message = feed.wait(seen, LIVE_KEEPALIVE)
+            # A comment line keeps proxies from closing an idle stream
+            yield message or b': keepalive\n\n'
+
+    response = Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the client goes away, even if the stream never started
+    response.call_on_close(feed.unsubscribe)
+    return response
+
+@app.route('/api/leaderboard/player/<player>')
+def get_player(player):
+    return jsonify(get_leaderboard().player_best(player))
+
+@app.route('/api/leaderboard/levels')
+def get_level_stats():
+    return jsonify({'levels': get_leaderboard().level_stats()})
+
+@app.route('/api/scores', methods=['POST'])
+def ingest_scores():
+    # Write-behind: answers once the runs are queued, before they're stored.
+    # Runs that need verifying go through POST /api/highscore one at a time.
+    if REQUIRE_VERIFIED_SCORES:
+        return jsonify({'success': False, 'error': 'submit verified runs to /api/highscore'}), 400
+    data = request.get_json(silent=True)
+    events = data.get('events') if isinstance(data, dict) else None
+    if not isinstance(events, list) or not 0 < len(events) <= INGEST_MAX_EVENTS:
+        return jsonify({'success': False,
+                        'error': f'send 1 to {INGEST_MAX_EVENTS} events'}), 400
+    runs = []
+    for data in events:
+        event = parse_score_event(data)
+        if event is None:
+            return jsonify({'success': False, 'error': 'invalid score'}), 400
+        runs.append(event + (False,))
+    if not enqueue_scores(runs):
+        response = jsonify({'success': False, 'error': 'ingestion queue is full'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    return jsonify({'success': True, 'accepted': len(runs)}), 202
+
+@app.route('/api/scores/stats')
+def get_ingest_stats():
+    return jsonify(ingest_stats())
+
+@app.route('/api/leaderboard/stream/stats')
+def get_stream_stats():
+    return jsonify(get_leaderboard_feed().stats())
+
+@app.route('/api/verify/stats')
+def get_verify_stats():
+    return jsonify(verify_stats())
+
+@app.route('/api/telemetry', methods=['POST'])
+def ingest_telemetry():
+    # Sent with navigator.sendBeacon, so nobody reads the answer
+    if (request.content_length or 0) > TELEMETRY_MAX_BODY:
+        return jsonify({'success': False, 'error': 'batch too large'}), 413
+    # Chunked bodies have no Content-Length: stop reading past the limit
+    body = bytearray()
+    while len(body) <= TELEMETRY_MAX_BODY:
+        chunk = request.stream.read(TELEMETRY_MAX_BODY + 1 - len(body))
+        if not chunk:
+            break
+        body += chunk
+    if len(body) > TELEMETRY_MAX_BODY:
+        return jsonify({'success': False, 'error': 'batch too large'}), 413
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    batch = telemetry.parse_batch(data)
+    if batch is None:
+        return jsonify({'success': False, 'error': 'invalid telemetry'}), 400
+    get_telemetry_log().append(batch)
+    return jsonify({'success': True}), 202
+
+@app.route('/metrics')
+def get_metrics():
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
-
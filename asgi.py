@@ -0,0 +1,520 @@
+"""asyncio entry point serving the same routes as app.py, for high concurrency.
+
+The Flask app gives every in-flight request its own gunicorn thread, so slow
+clients and long-lived connections use up the pool. Here, one event loop per
+worker multiplexes all connections. The page and the config are served from
+memory. SQLite calls and file writes block, so they go to a small thread
+pool, and score verification awaits the same process pool that app.py uses.
+Storage, validation, statistics and /metrics are shared with app.py, so both
+entry points can run side by side on one leaderboard database:
+
+    gunicorn -k uvicorn.workers.UvicornWorker --workers 2 asgi:app
+
+Live leaderboard streams are the main reason to run this: under gthread each
+viewer holds a thread, here a viewer is a coroutine. One thread per worker
+waits on app.py's LeaderboardFeed and wakes the streams on the event loop.
+"""
+import asyncio
+import json
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, quote
+
+from flask import render_template
+from werkzeug.http import parse_date, parse_etags
+
+import app as wsgi
+import leaderboard
+import static_assets
+import telemetry
+
+STORAGE_THREADS = int(os.environ.get('ASGI_STORAGE_THREADS', 4))
+MAX_BODY = 1024 * 1024
+# Streams are coroutines here, so the cap is far above app.py's
+LIVE_MAX_SUBSCRIBERS = int(os.environ.get('ASGI_LIVE_MAX_SUBSCRIBERS', 10000))
+
+_storage = ThreadPoolExecutor(STORAGE_THREADS, thread_name_prefix='storage')
+_static_cache = {}
+_index_page = None
+_live = None
+
+
+async def storage(func, *args):
+    """Run a blocking leaderboard call off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_storage, func, *args)
+
+
+async def respond(send, status, body=b'', headers=()):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-length', str(len(body)).encode()), *headers]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def respond_json(send, obj, status=200, headers=()):
+    # Same encoding as Flask's jsonify
+    body = wsgi.app.json.dumps(obj, separators=(',', ':')).encode() + b'\n'
+    await respond(send, status, body, [(b'content-type', b'application/json'), *headers])
+
+
+async def read_body(receive, limit=MAX_BODY):
+    """The request body, or None once it's longer than limit."""
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > limit:
+            return None
+        if not message.get('more_body'):
+            return body
+
+
+async def read_json(receive):
+    """The request body parsed as JSON, or None if it's too large or malformed."""
+    body = await read_body(receive)
+    if body is None:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def request_header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def query_int(scope, name, default):
+    """An integer query parameter, or default if it's missing or not a number."""
+    values = parse_qs(scope['query_string'].decode('latin-1')).get(name)
+    try:
+        return int(values[0]) if values else default
+    except ValueError:
+        return default
+
+
+async def verify_run(seed, flaps, frames, score):
+    """app.verify_run, awaiting the process pool instead of blocking a thread."""
+    if not wsgi.verify_admit():
+        return 'overloaded'
+    start = time.perf_counter()
+    result = None
+    try:
+        future = wsgi.verify_submit(seed, flaps, frames, score)
+        try:
+            matches, _, _ = await asyncio.wait_for(asyncio.wrap_future(future),
+                                                   wsgi.VERIFY_TIMEOUT)
+            result = 'verified' if matches else 'rejected'
+        except asyncio.TimeoutError:
+            result = 'timed_out'
+    finally:
+        wsgi.verify_done(result, start)
+    return result
+
+
+def record_run(score, player, level, coins, verified, run=None):
+    board = wsgi.get_leaderboard()
+    is_new_high = board.submit(score, player, level, coins, verified)
+    wsgi.scores_changed()
+    if verified:
+        wsgi.store_ghost(run, score, player)
+    return is_new_high, board.high_score()
+
+
+def high_score():
+    return wsgi.get_leaderboard().high_score()
+
+
+def top_players(limit):
+    return wsgi.get_leaderboard().top(limit)
+
+
+def player_best(player):
+    return wsgi.get_leaderboard().player_best(player)
+
+
+def level_stats():
+    return wsgi.get_leaderboard().level_stats()
+
+
+def append_telemetry(batch):
+    wsgi.get_telemetry_log().append(batch)
+
+
+def ghost_run(rank):
+    return wsgi.get_ghost_store().get(rank)
+
+
+def top_ghosts(limit):
+    return wsgi.get_ghost_store().top(limit)
+
+
+class LiveBridge:
+    """Hands LeaderboardFeed messages to the event loop's streams.
+
+    The feed wakes waiting threads; one thread waits on it here and passes
+    each message to the loop, where `changed` wakes every stream at once.
+    """
+
+    def __init__(self, feed, loop):
+        self.feed = feed
+        self.loop = loop
+        self.seq = 0
+        self.message = None
+        self.changed = asyncio.Event()
+        threading.Thread(target=self._run, name='leaderboard-bridge', daemon=True).start()
+
+    def _run(self):
+        seen = 0
+        while True:
+            seen, message = self.feed.wait(seen, wsgi.LIVE_KEEPALIVE)
+            if message is None:
+                continue
+            try:
+                self.loop.call_soon_threadsafe(self._publish, seen, message)
+            except RuntimeError:
+                return  # The loop is closed
+
+    def _publish(self, seq, message):
+        self.seq = seq
+        self.message = message
+        # Streams waiting on the old event wake up; new waits get a fresh one
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+async def index(scope, receive, send):
+    global _index_page
+    if _index_page is None:
+        # The page has no per-request content: render it once
+        with wsgi.app.test_request_context('/'):
+            _index_page = render_template('index.html').encode()
+    await respond(send, 200, _index_page, [(b'content-type', b'text/html; charset=utf-8')])
+
+
+async def get_config(scope, receive, send):
+    # Stats levels.json, and re-reads and gzips it when it changed
+    _, last_modified, variants = await storage(wsgi.get_config_cache)
+    accept_encoding = request_header(scope, b'accept-encoding')
+    body, etag, headers = variants[static_assets.accepts_encoding(accept_encoding, 'gzip')]
+    headers = [(name.lower().encode(), value.encode()) for name, value in headers]
+    if_none_match = request_header(scope, b'if-none-match')
+    if if_none_match is not None:
+        not_modified = parse_etags(if_none_match).contains(etag)
+    else:
+        since = parse_date(request_header(scope, b'if-modified-since'))
+        not_modified = since is not None and since.timestamp() >= last_modified
+    if not_modified:
+        # Same validators as the 200, minus the entity headers
+        headers = [(name, value) for name, value in headers
+                   if name not in (b'content-type', b'content-encoding')]
+        await send({'type': 'http.response.start', 'status': 304, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    await respond(send, 200, body, headers)
+
+
+async def get_high_score(scope, receive, send):
+    await respond_json(send, {'high_score': await storage(high_score)})
+
+
+async def update_high_score(scope, receive, send):
+    data = await read_json(receive)
+    event = wsgi.parse_score_event(data)
+    if event is None:
+        return await respond_json(send, {'success': False, 'error': 'invalid score'}, 400)
+    score, player, level, coins = event
+
+    verified = False
+    run = None
+    if 'seed' in data:
+        run = wsgi.parse_replay(data)
+        if run is None:
+            return await respond_json(send, {'success': False, 'error': 'invalid run'}, 400)
+        result = await verify_run(*run, score)
+        if result == 'rejected':
+            return await respond_json(send, {'success': False, 'error': 'score does not match replay'}, 422)
+        if result != 'verified':
+            return await respond_json(send, {'success': False, 'error': f'verification {result}'}, 503)
+        verified = True
+    elif wsgi.REQUIRE_VERIFIED_SCORES:
+        return await respond_json(send, {'success': False, 'error': 'seed and flaps are required'}, 400)
+
+    is_new_high, best = await storage(record_run, score, player, level, coins, verified, run)
+    await respond_json(send, {'success': True, 'is_new_high': is_new_high, 'high_score': best})
+
+
+async def get_top_players(scope, receive, send):
+    limit = max(1, min(query_int(scope, 'limit', leaderboard.TOP_N), 100))
+    top = await storage(top_players, limit)
+    await respond_json(send, {'players': [{'player': player, 'score': best} for player, best in top]})
+
+
+async def get_player(scope, receive, send):
+    player = scope['path'][len('/api/leaderboard/player/'):]
+    if not player or '/' in player:
+        return await respond(send, 404)
+    await respond_json(send, await storage(player_best, player))
+
+
+async def get_level_stats(scope, receive, send):
+    await respond_json(send, {'levels': await storage(level_stats)})
+
+
+async def get_live():
+    global _live
+    if _live is None:
+        # Reads the leaderboard for the first message
+        feed = await storage(wsgi.get_leaderboard_feed, LIVE_MAX_SUBSCRIBERS)
+        if _live is None:
+            _live = LiveBridge(feed, asyncio.get_running_loop())
+    return _live
+
+
+async def send_events(send, live):
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'text/event-stream; charset=utf-8'),
+                            (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]})
+    body = f'retry: {wsgi.LIVE_RETRY_MS}\n\n'.encode()
+    seen = 0
+    while True:
+        await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        if live.seq == seen:
+            try:
+                await asyncio.wait_for(live.changed.wait(), wsgi.LIVE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                # A comment line keeps proxies from closing an idle stream
+                body = b': keepalive\n\n'
+                continue
+        seen = live.seq
+        body = live.message
+
+
+async def stream_leaderboard(scope, receive, send):
+    live = await get_live()
+    if not live.feed.subscribe():
+        return await respond_json(send, {'success': False, 'error': 'too many live viewers'}, 503,
+                                  [(b'retry-after', b'30')])
+    sender = asyncio.ensure_future(send_events(send, live))
+    try:
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+    finally:
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+        live.feed.unsubscribe()
+
+
+async def get_stream_stats(scope, receive, send):
+    live = await get_live()
+    await respond_json(send, live.feed.stats())
+
+
+async def ingest_scores(scope, receive, send):
+    # Write-behind, as in app.py: the runs are queued for app.py's writer thread
+    if wsgi.REQUIRE_VERIFIED_SCORES:
+        return await respond_json(send, {'success': False,
+                                         'error': 'submit verified runs to /api/highscore'}, 400)
+    data = await read_json(receive)
+    events = data.get('events') if isinstance(data, dict) else None
+    if not isinstance(events, list) or not 0 < len(events) <= wsgi.INGEST_MAX_EVENTS:
+        return await respond_json(send, {'success': False,
+                                         'error': f'send 1 to {wsgi.INGEST_MAX_EVENTS} events'}, 400)
+    runs = []
+    for data in events:
+        event = wsgi.parse_score_event(data)
+        if event is None:
+            return await respond_json(send, {'success': False, 'error': 'invalid score'}, 400)
+        runs.append(event + (False,))
+    if not wsgi.enqueue_scores(runs):
+        return await respond_json(send, {'success': False, 'error': 'ingestion queue is full'}, 503,
+                                  [(b'retry-after', b'1')])
+    await respond_json(send, {'success': True, 'accepted': len(runs)}, 202)
+
+
+async def get_ingest_stats(scope, receive, send):
+    await respond_json(send, wsgi.ingest_stats())
+
+
+async def get_verify_stats(scope, receive, send):
+    await respond_json(send, wsgi.verify_stats())
+
+
+async def ingest_telemetry(scope, receive, send):
+    # read_body stops at the limit, with or without a Content-Length
+    body = await read_body(receive, wsgi.TELEMETRY_MAX_BODY)
+    if body is None:
+        return await respond_json(send, {'success': False, 'error': 'batch too large'}, 413)
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    batch = telemetry.parse_batch(data)
+    if batch is None:
+        return await respond_json(send, {'success': False, 'error': 'invalid telemetry'}, 400)
+    await storage(append_telemetry, batch)
+    await respond_json(send, {'success': True}, 202)
+
+
+async def get_ghost(scope, receive, send):
+    ghost = await storage(ghost_run, query_int(scope, 'rank', 1))
+    if ghost is None:
+        return await respond(send, 404)
+    data, player, score, frames = ghost
+    await respond(send, 200, bytes(data), [(b'content-type', b'application/octet-stream'),
+                                           (b'x-ghost-player', quote(player).encode()),
+                                           (b'x-ghost-score', str(score).encode()),
+                                           (b'x-ghost-frames', str(frames).encode())])
+
+
+async def get_ghosts(scope, receive, send):
+    limit = max(1, min(query_int(scope, 'limit', leaderboard.TOP_N), 100))
+    top = await storage(top_ghosts, limit)
+    await respond_json(send, {'ghosts': [{'rank': rank, 'player': player, 'score': score, 'frames': frames}
+                                         for rank, player, score, frames in top]})
+
+
+async def get_metrics(scope, receive, send):
+    body = await storage(wsgi.registry.render)
+    await respond(send, 200, body.encode(), [(b'content-type', b'text/plain; version=0.0.4; charset=utf-8')])
+
+
+def read_static(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+async def static_file(scope, receive, send):
+    root = os.path.realpath(wsgi.app.static_folder)
+    path = os.path.realpath(os.path.join(root, scope['path'][len('/static/'):]))
+    if not path.startswith(root + os.sep):
+        return await respond(send, 404)
+    body = _static_cache.get(path)
+    if body is None:
+        try:
+            body = await storage(read_static, path)
+        except OSError:
+            return await respond(send, 404)
+        _static_cache[path] = body
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    await respond(send, 200, body, [(b'content-type', content_type.encode())])
+
+
+async def asset_file(scope, receive, send):
+    filename = scope['path'][len('/assets/'):]
+    if filename not in wsgi.ASSET_FILES:
+        return await respond(send, 404)
+    path, encoding, mimetype = static_assets.choose_variant(
+        wsgi.ASSET_MANIFEST, filename, request_header(scope, b'accept-encoding'))
+    path = os.path.join(static_assets.DIST_DIR, path)
+    body = _static_cache.get(path)
+    if body is None:
+        body = _static_cache[path] = await storage(read_static, path)
+    headers = [(b'content-type', mimetype.encode()),
+               (b'cache-control', wsgi.ASSET_CACHE_CONTROL.encode())]
+    if encoding:
+        headers.append((b'content-encoding', encoding.encode()))
+    if filename in wsgi.ASSET_MANIFEST['encodings']:
+        headers.append((b'vary', b'Accept-Encoding'))
+    await respond(send, 200, body, headers)
+
+
+ROUTES = {
+    ('GET', '/'): index,
+    ('GET', '/api/config'): get_config,
+    ('GET', '/api/highscore'): get_high_score,
+    ('POST', '/api/highscore'): update_high_score,
+    ('GET', '/api/leaderboard'): get_top_players,
+    ('GET', '/api/leaderboard/levels'): get_level_stats,
+    ('GET', '/api/leaderboard/stream'): stream_leaderboard,
+    ('GET', '/api/leaderboard/stream/stats'): get_stream_stats,
+    ('POST', '/api/scores'): ingest_scores,
+    ('GET', '/api/scores/stats'): get_ingest_stats,
+    ('GET', '/api/verify/stats'): get_verify_stats,
+    ('POST', '/api/telemetry'): ingest_telemetry,
+    ('GET', '/api/ghost'): get_ghost,
+    ('GET', '/api/ghosts'): get_ghosts,
+    ('GET', '/metrics'): get_metrics,
+}
+# Path prefixes, with the Flask rule they're reported under in /metrics
+PREFIX_ROUTES = (
+    ('/static/', '/static/<path:filename>', static_file),
+    ('/assets/', '/assets/<path:filename>', asset_file),
+    ('/api/leaderboard/player/', '/api/leaderboard/player/<player>', get_player),
+)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Open the database before the first request rather than during it
+            await storage(wsgi.get_leaderboard)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            _storage.shutdown()
+            if wsgi._verify_pool is not None:
+                wsgi._verify_pool.shutdown(cancel_futures=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def not_found(scope, receive, send):
+    await respond(send, 404)
+
+
+async def method_not_allowed(scope, receive, send):
+    await respond(send, 405)
+
+
+def route(method, path):
+    """(Flask rule for /metrics, handler) for a request."""
+    handler = ROUTES.get((method, path))
+    if handler is not None:
+        return path, handler
+    if method == 'GET':
+        for prefix, rule, handler in PREFIX_ROUTES:
+            if path.startswith(prefix):
+                return rule, handler
+    if any(route_path == path for _, route_path in ROUTES):
+        return 'unmatched', method_not_allowed
+    return 'unmatched', not_found
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    method = 'GET' if scope['method'] == 'HEAD' else scope['method']
+    rule, handler = route(method, scope['path'])
+    # The same request metrics as app.py's hooks; streams are timed to their first byte
+    start = time.perf_counter()
+    registry = wsgi.registry
+    started = False
+
+    def record(status):
+        nonlocal started
+        started = True
+        registry.observe('flappybird_http_request_duration_seconds', (rule, scope['method']),
+                         time.perf_counter() - start)
+        registry.inc('flappybird_http_requests_total', (rule, scope['method'], str(status)))
+
+    async def send_timed(message):
+        if message['type'] == 'http.response.start':
+            record(message['status'])
+        await send(message)
+
+    registry.inc('flappybird_http_requests_in_flight')
+    try:
+        await handler(scope, receive, send_timed)
+    finally:
+        registry.inc('flappybird_http_requests_in_flight', value=-1)
+        if not started:
+            # The handler raised before answering; the server sends a 500
+            record(500)
@@ -0,0 +1,313 @@
+"""Vectorized batch simulator: step N headless games at once with NumPy.
+
+State is kept as struct-of-arrays. Per-game values (player position,
+score, level, spawn timers) are 1-D arrays of length N. Entities live in
+fixed-capacity slot arrays of shape (N, capacity) with an `alive` mask,
+and capacity grows when a game runs out of slots. Gravity, wall/enemy/coin
+motion, projectile motion and the shrunken-rect collision checks are array
+operations over all games.
+
+Spawning is the one per-game Python step. Each game owns a random.Random,
+drawn from in the same order as game_engine.Engine, so a batch run scores
+exactly like the scalar engine for the same seeds and flap inputs (see
+verify_against_engine).
+"""
+import random
+
+import numpy as np
+
+from game_engine import game_settings, levels, SCREEN_WIDTH, SCREEN_HEIGHT, BUILDING_COLORS
+
+PLAYER_X = 150
+PLAYER_SIZE = game_settings.player_size
+WALL_WIDTH = game_settings.wall_width
+ENEMY_SIZE = game_settings.enemy_size
+COIN_SIZE = game_settings.coin_size
+PROJECTILE_SIZE = game_settings.projectile_size
+
+# Per-level tables indexed by each game's current level, with intervals
+# already in frames from game_engine's compiled levels
+_LEVEL_FIELDS = ('wall_speed', 'wall_spawn_frames', 'enemy_speed', 'enemy_spawn_frames',
+                 'enemy_shoot_frames', 'projectile_speed', 'coin_speed', 'coin_spawn_frames',
+                 'wall_gap')
+LEVEL_TABLE = {field: np.array([getattr(level, field) for level in levels], dtype=np.float64)
+               for field in _LEVEL_FIELDS}
+# Score needed to leave level i (inf for the last level)
+NEXT_REQUIRED = np.array([np.inf if level.next_required is None else level.next_required
+                          for level in levels])
+
+
+class _Slots:
+    """Fixed-capacity entity storage: one row per game, one column per slot."""
+
+    def __init__(self, n, capacity, fields):
+        self.alive = np.zeros((n, capacity), dtype=bool)
+        self.fields = fields
+        for field in fields:
+            setattr(self, field, np.zeros((n, capacity)))
+
+    def allocate(self, games):
+        """Return one free slot index for each game in `games`, growing if needed."""
+        if not games.size:
+            return games
+        if self.alive[games].all(axis=1).any():
+            self._grow()
+        slots = np.argmin(self.alive[games], axis=1)
+        self.alive[games, slots] = True
+        return slots
+
+    def _grow(self):
+        n, capacity = self.alive.shape
+        self.alive = np.concatenate([self.alive, np.zeros((n, capacity), dtype=bool)], axis=1)
+        for field in self.fields:
+            array = getattr(self, field)
+            setattr(self, field, np.concatenate([array, np.zeros_like(array)], axis=1))
+
+
+def _collide(ax, ay, aw, ah, bx, by, bw, bh):
+    """Vectorized pygame.Rect.colliderect for positive sizes (truncates like pygame)."""
+    ax, ay, bx, by = np.trunc(ax), np.trunc(ay), np.trunc(bx), np.trunc(by)
+    return (ax < bx + bw) & (ay < by + bh) & (ax + aw > bx) & (ay + ah > by)
+
+
+class BatchSim:
+    """N independent games stepped in lockstep; finished games are masked by `done`."""
+
+    def __init__(self, seeds):
+        n = len(seeds)
+        self.n = n
+        self.rngs = [random.Random(seed) for seed in seeds]
+        self.frame = 0
+        self.y = np.full(n, float(SCREEN_HEIGHT // 2))
+        self.velocity = np.zeros(n)
+        self.started = np.zeros(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.coins_collected = np.zeros(n, dtype=np.int64)
+        self.level = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+        self.frames_survived = np.zeros(n, dtype=np.int64)
+        self.last_wall_spawn = np.zeros(n, dtype=np.int64)
+        self.last_enemy_spawn = np.zeros(n, dtype=np.int64)
+        self.last_coin_spawn = np.zeros(n, dtype=np.int64)
+        self.walls = _Slots(n, 4, ('x', 'gap_y', 'gap_height', 'speed', 'passed', 'color'))
+        self.enemies = _Slots(n, 4, ('x', 'y', 'original_y', 'wave_offset', 'speed',
+                                     'last_shot_frame', 'shoot_interval', 'projectile_speed'))
+        self.projectiles = _Slots(n, 8, ('x', 'y', 'velocity_x', 'velocity_y'))
+        self.coins = _Slots(n, 4, ('x', 'y', 'original_y', 'float_offset', 'speed'))
+
+    # Spawning (per-game RNG, same draw order as game_engine.Engine)
+
+    def _spawn_walls(self, games):
+        walls = self.walls
+        slots = walls.allocate(games)
+        levels_ = self.level[games]
+        for game, slot, level in zip(games.tolist(), slots.tolist(), levels_.tolist()):
+            rng = self.rngs[game]
+            walls.gap_y[game, slot] = rng.randint(levels[level].min_gap_y, levels[level].max_gap_y)
+            walls.color[game, slot] = BUILDING_COLORS.index(rng.choice(BUILDING_COLORS))
+        walls.x[games, slots] = SCREEN_WIDTH
+        walls.gap_height[games, slots] = LEVEL_TABLE['wall_gap'][levels_]
+        walls.speed[games, slots] = LEVEL_TABLE['wall_speed'][levels_]
+        walls.passed[games, slots] = 0
+
+    def _spawn_enemies(self, games, frame):
+        enemies = self.enemies
+        slots = enemies.allocate(games)
+        levels_ = self.level[games]
+        for game, slot in zip(games.tolist(), slots.tolist()):
+            rng = self.rngs[game]
+            enemies.original_y[game, slot] = rng.randint(100, SCREEN_HEIGHT - 100)
+            enemies.wave_offset[game, slot] = rng.random() * 10
+        enemies.x[games, slots] = SCREEN_WIDTH + 50
+        enemies.y[games, slots] = enemies.original_y[games, slots]
+        enemies.speed[games, slots] = LEVEL_TABLE['enemy_speed'][levels_]
+        enemies.last_shot_frame[games, slots] = frame
+        enemies.shoot_interval[games, slots] = LEVEL_TABLE['enemy_shoot_frames'][levels_]
+        enemies.projectile_speed[games, slots] = LEVEL_TABLE['projectile_speed'][levels_]
+
+    def _spawn_coins(self, games):
+        coins = self.coins
+        slots = coins.allocate(games)
+        for game, slot in zip(games.tolist(), slots.tolist()):
+            rng = self.rngs[game]
+            coins.original_y[game, slot] = rng.randint(100, SCREEN_HEIGHT - 100)
+            coins.float_offset[game, slot] = rng.random() * 10
+        coins.x[games, slots] = SCREEN_WIDTH + 50
+        coins.y[games, slots] = coins.original_y[games, slots]
+        coins.speed[games, slots] = LEVEL_TABLE['coin_speed'][self.level[games]]
+
+    # Scoring
+
+    def _award(self, counts, points):
+        """Add `points` once per event, checking level-up after each one like the engine."""
+        for _ in range(int(counts.max(initial=0))):
+            scoring = counts > 0
+            self.score[scoring] += points
+            level_up = scoring & (self.score >= NEXT_REQUIRED[self.level])
+            self.level[level_up] += 1
+            counts = counts - 1
+
+    # Stepping
+
+    def step(self, flaps):
+        """Advance every live game by one frame; flaps is a bool array of length N."""
+        live = ~self.done
+        if not live.any():
+            return
+        self.frame += 1
+        frame = self.frame
+        self.frames_survived[live] += 1
+
+        flap = live & flaps
+        self.velocity[flap] = game_settings.flap_strength
+        self.started |= flap
+
+        # Spawns, in engine order: walls, enemies, coins
+        level = self.level
+        wall_due = live & (frame - self.last_wall_spawn > LEVEL_TABLE['wall_spawn_frames'][level])
+        self._spawn_walls(np.flatnonzero(wall_due))
+        self.last_wall_spawn[wall_due] = frame
+        enemy_due = live & (frame - self.last_enemy_spawn > LEVEL_TABLE['enemy_spawn_frames'][level])
+        self._spawn_enemies(np.flatnonzero(enemy_due), frame)
+        self.last_enemy_spawn[enemy_due] = frame
+        coin_due = live & (frame - self.last_coin_spawn > LEVEL_TABLE['coin_spawn_frames'][level])
+        self._spawn_coins(np.flatnonzero(coin_due))
+        self.last_coin_spawn[coin_due] = frame
+
+        # Player
+        moving = live & self.started
+        self.velocity[moving] += game_settings.gravity
+        self.y[moving] += self.velocity[moving]
+        above = live & (self.y < 0)
+        self.y[above] = 0
+        self.velocity[above] = 0
+        floor = SCREEN_HEIGHT - PLAYER_SIZE
+        below = live & (self.y > floor)
+        self.y[below] = floor
+        self.velocity[below] = 0
+
+        player_y = self.y[:, None]
+        hit_y = player_y + 10
+        hit_x = PLAYER_X + 10
+        hit_size = PLAYER_SIZE - 20
+        crashed = np.zeros(self.n, dtype=bool)
+
+        # Walls
+        walls = self.walls
+        active = walls.alive & live[:, None]
+        walls.x[active] -= walls.speed[active]
+        passing = active & (walls.passed == 0) & (walls.x + WALL_WIDTH < PLAYER_X)
+        walls.passed[passing] = 1
+        wall_points = passing.sum(axis=1)
+        top = _collide(hit_x, hit_y, hit_size, hit_size, walls.x, 0, WALL_WIDTH, walls.gap_y)
+        bottom = _collide(hit_x, hit_y, hit_size, hit_size,
+                          walls.x, walls.gap_y + walls.gap_height, WALL_WIDTH, SCREEN_HEIGHT)
+        crashed |= (active & (top | bottom)).any(axis=1)
+        walls.alive[active & (walls.x + WALL_WIDTH < 0)] = False
+        self._award(wall_points, game_settings.score_per_wall)
+
+        # Enemies
+        enemies = self.enemies
+        active = enemies.alive & live[:, None]
+        enemies.x[active] -= enemies.speed[active]
+        wave = np.sin((self.frames_survived[:, None] + enemies.wave_offset) * 0.05)
+        enemies.y = np.where(active, enemies.original_y + 30 * wave, enemies.y)
+        shooting = (active & (enemies.x <= SCREEN_WIDTH) & (enemies.x >= -ENEMY_SIZE) &
+                    (frame - enemies.last_shot_frame > enemies.shoot_interval) &
+                    (enemies.x > PLAYER_X))
+        for column in range(shooting.shape[1]):
+            self._shoot(np.flatnonzero(shooting[:, column]), column, frame)
+        caught = active & _collide(hit_x, hit_y, hit_size, hit_size,
+                                   enemies.x + 10, enemies.y + 10, ENEMY_SIZE - 20, ENEMY_SIZE - 20)
+        enemies.alive[caught | (active & (enemies.x + ENEMY_SIZE < 0))] = False
+        self._award(caught.sum(axis=1), game_settings.score_per_enemy)
+
+        # Projectiles (including ones fired this frame)
+        projectiles = self.projectiles
+        active = projectiles.alive & live[:, None]
+        projectiles.x[active] += projectiles.velocity_x[active]
+        projectiles.y[active] += projectiles.velocity_y[active]
+        hits = _collide(hit_x, hit_y, hit_size, hit_size,
+                        projectiles.x, projectiles.y, PROJECTILE_SIZE, PROJECTILE_SIZE)
+        crashed |= (active & hits).any(axis=1)
+        x, y = projectiles.x, projectiles.y
+        gone = ((x < -PROJECTILE_SIZE) | (x > SCREEN_WIDTH + PROJECTILE_SIZE) |
+                (y < -PROJECTILE_SIZE) | (y > SCREEN_HEIGHT + PROJECTILE_SIZE))
+        projectiles.alive[active & gone] = False
+
+        # Coins
+        coins = self.coins
+        active = coins.alive & live[:, None]
+        coins.x[active] -= coins.speed[active]
+        bob = np.sin((self.frames_survived[:, None] + coins.float_offset) * 0.08)
+        coins.y = np.where(active, coins.original_y + 15 * bob, coins.y)
+        collected = active & _collide(hit_x, hit_y, hit_size, hit_size,
+                                      coins.x + 5, coins.y + 5, COIN_SIZE - 10, COIN_SIZE - 10)
+        coins.alive[collected | (active & (coins.x + COIN_SIZE < 0))] = False
+        coin_counts = collected.sum(axis=1)
+        self.coins_collected += coin_counts
+        self._award(coin_counts, game_settings.score_per_coin)
+
+        self.done |= crashed
+
+    def _shoot(self, games, column, frame):
+        enemies = self.enemies
+        projectiles = self.projectiles
+        enemies.last_shot_frame[games, column] = frame
+        start_x = enemies.x[games, column] + ENEMY_SIZE // 2
+        start_y = enemies.y[games, column] + ENEMY_SIZE // 2
+        dx = (PLAYER_X + PLAYER_SIZE // 2) - start_x
+        dy = (self.y[games] + PLAYER_SIZE // 2) - start_y
+        distance = np.sqrt(dx**2 + dy**2)
+        speed = enemies.projectile_speed[games, column]
+        safe = np.where(distance > 0, distance, 1)
+        slots = projectiles.allocate(games)
+        projectiles.x[games, slots] = start_x
+        projectiles.y[games, slots] = start_y
+        projectiles.velocity_x[games, slots] = np.where(distance > 0, (dx / safe) * speed, -speed)
+        projectiles.velocity_y[games, slots] = np.where(distance > 0, (dy / safe) * speed, 0)
+
+    def run(self, flaps, max_frames=None):
+        """Step until every game is done.
+
+        flaps is either a bool array of shape (frames, N), or a callable
+        taking this BatchSim and returning a bool array of length N.
+        """
+        if max_frames is None:
+            max_frames = len(flaps) if not callable(flaps) else 60 * 60 * 5
+        while not self.done.all() and self.frame < max_frames:
+            if callable(flaps):
+                self.step(flaps(self))
+            else:
+                self.step(flaps[self.frame])
+        return self.score
+
+
+def gap_policy(sim):
+    """Batched version of game_engine.gap_policy."""
+    walls = sim.walls
+    ahead = walls.alive & (walls.x + WALL_WIDTH >= PLAYER_X)
+    # Walls spawn in x order, so the nearest wall ahead has the smallest x
+    x = np.where(ahead, walls.x, np.inf)
+    nearest = np.argmin(x, axis=1)
+    rows = np.arange(sim.n)
+    target = np.where(ahead.any(axis=1),
+                      walls.gap_y[rows, nearest] + walls.gap_height[rows, nearest] // 2,
+                      SCREEN_HEIGHT // 2)
+    return (sim.y + PLAYER_SIZE // 2 > target) & (sim.velocity >= 0)
+
+
+def verify_against_engine(seeds, flaps):
+    """Run the same seeds/flap inputs through BatchSim and game_engine; return mismatched seeds."""
+    import game_engine
+
+    sim = BatchSim(seeds)
+    batch_scores = sim.run(flaps)
+    mismatched = []
+    for index, seed in enumerate(seeds):
+        column = flaps[:, index]
+        engine = game_engine.simulate(lambda engine: column[engine.frame_count],
+                                      seed=seed, max_frames=len(flaps))
+        if engine.score != batch_scores[index] or engine.frame_count != sim.frames_survived[index]:
+            mismatched.append(seed)
+    return mismatched
@@ -0,0 +1,1132 @@
+"""Performance benchmarks for Flappy Bird - City Edition.
+
+Run from the repository root, e.g.:
+
+    python bench.py engine --games 200
+"""
+import argparse
+import time
+
+import game_engine
+
+
+def bench_engine(args):
+    """Headless simulation speed in simulated frames per second per core."""
+    frames = 0
+    scores = []
+    start = time.perf_counter()
+    for seed in range(args.games):
+        engine = game_engine.simulate(seed=seed, max_frames=args.max_frames)
+        frames += engine.frame_count
+        scores.append(engine.score)
+    elapsed = time.perf_counter() - start
+    print(f'games:            {args.games}')
+    print(f'simulated frames: {frames}')
+    print(f'mean score:       {sum(scores) / len(scores):.2f}')
+    print(f'elapsed:          {elapsed:.3f}s')
+    print(f'frames/s/core:    {frames / elapsed:,.0f}')
+    print(f'realtime factor:  {frames / elapsed / 60:,.0f}x')
+
+
+def bench_batch(args):
+    """Vectorized batch simulation speed versus the scalar engine."""
+    import numpy as np
+    import batch_sim
+
+    seeds = list(range(args.games))
+    sim = batch_sim.BatchSim(seeds)
+    start = time.perf_counter()
+    scores = sim.run(batch_sim.gap_policy, max_frames=args.max_frames)
+    elapsed = time.perf_counter() - start
+    frames = int(sim.frames_survived.sum())
+    print(f'games:            {args.games}')
+    print(f'simulated frames: {frames}')
+    print(f'mean score:       {scores.mean():.2f}')
+    print(f'elapsed:          {elapsed:.3f}s')
+    print(f'frames/s/core:    {frames / elapsed:,.0f}')
+
+    check = seeds[:args.verify]
+    flaps = np.random.default_rng(0).random((args.max_frames, len(check))) < 0.06
+    mismatched = batch_sim.verify_against_engine(check, flaps)
+    print(f'parity vs engine: {len(check) - len(mismatched)}/{len(check)} games identical')
+
+
+def bench_verify(args):
+    """Server-side score verification throughput in verified runs per second."""
+    from concurrent.futures import ThreadPoolExecutor
+    import app
+
+    runs = [game_engine.simulate(seed=seed, max_frames=args.max_frames) for seed in range(args.runs)]
+    # Warm the process pool so start-up isn't counted
+    list(ThreadPoolExecutor(app.VERIFY_WORKERS).map(
+        lambda run: app.verify_run(run.seed, run.flap_frames, run.frame_count, run.score),
+        runs[:app.VERIFY_WORKERS]))
+    app._verify_latencies.clear()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as threads:
+        results = list(threads.map(
+            lambda run: app.verify_run(run.seed, run.flap_frames, run.frame_count, run.score), runs))
+    elapsed = time.perf_counter() - start
+    stats = app.verify_stats()
+    print(f'runs:             {len(runs)} ({sum(run.frame_count for run in runs)} frames)')
+    print(f'request threads:  {args.threads}, pool workers: {app.VERIFY_WORKERS}')
+    for result in ('verified', 'rejected', 'timed_out', 'overloaded'):
+        print(f'{result + ":":17} {results.count(result)}')
+    print(f'max queue depth:  {stats["max_pending"]}')
+    print(f'latency p50/p99:  {stats["latency_ms"]["p50"]:.1f}ms / {stats["latency_ms"]["p99"]:.1f}ms')
+    print(f'verified runs/s:  {results.count("verified") / elapsed:,.1f}')
+    app.get_verify_pool().shutdown()
+
+
+def bench_config(args):
+    """Per-frame cost of the level and settings lookups update() makes."""
+    import timeit
+    level = game_engine.levels[-1]
+    settings = game_engine.game_settings
+
+    def frame_lookups():
+        # Spawn timers, then gravity in Player.update()
+        return (level.wall_spawn_frames, level.enemy_spawn_frames, level.coin_spawn_frames,
+                settings.gravity)
+
+    lookups = min(timeit.repeat(frame_lookups, number=args.loops, repeat=5)) / args.loops
+    check = min(timeit.repeat(game_engine.reload_config, number=args.loops, repeat=5)) / args.loops
+    print(f'config lookups:      {lookups * 1e9:.0f}ns per frame')
+    print(f'hot reload check:    {check * 1e9:.0f}ns per check (unchanged levels.json)')
+
+
+def _serve(args, env=None, app='app:app', worker_class=None):
+    """Start the app under gunicorn as the Procfile does; returns (process, host, port)."""
+    import os
+    import socket
+    import subprocess
+    import sys
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+                               '--workers', str(args.workers), '--threads', str(args.server_threads),
+                               '--worker-connections', str(max(1000, args.server_threads + 16)),
+                               '--timeout', '60',
+                               *(['--worker-class', worker_class] if worker_class else []), app],
+                              env=dict(os.environ, **(env or {})),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    return server, '127.0.0.1', port
+
+
+def bench_http(args):
+    """Page-load latency against gunicorn: GET /, /api/config and /api/highscore."""
+    import http.client
+    import threading
+    from urllib.parse import urlsplit
+
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        server, host, port = _serve(args)
+
+    page_times = []
+    endpoint_times = {'/': [], '/api/config': [], '/api/highscore': []}
+    statuses = {}
+    config_bytes = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def client():
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+        etag = None
+        local = []
+        while time.perf_counter() < deadline:
+            page_start = time.perf_counter()
+            for path in endpoint_times:
+                headers = {'Accept-Encoding': 'gzip, deflate'}
+                if path == '/api/config' and etag and args.revalidate:
+                    headers['If-None-Match'] = etag
+                start = time.perf_counter()
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+                local.append((path, time.perf_counter() - start, response.status, len(body)))
+                if path == '/api/config':
+                    etag = response.getheader('ETag') or etag
+            local.append((None, time.perf_counter() - page_start, None, 0))
+        conn.close()
+        with lock:
+            for path, elapsed, status, size in local:
+                if path is None:
+                    page_times.append(elapsed)
+                    continue
+                endpoint_times[path].append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+                if path == '/api/config':
+                    config_bytes[0] += size
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if server is not None:
+        server.terminate()
+        server.wait()
+
+    print(f'clients:                {args.clients} for {args.seconds}s'
+          f'{"" if args.url else f" (gunicorn {args.workers} workers x {args.server_threads} threads)"}')
+    print(f'page loads/s:           {len(page_times) / args.seconds:,.0f}')
+    print(f'page load p50/p99:      {_percentile(page_times, 0.5) * 1000:.2f}ms / '
+          f'{_percentile(page_times, 0.99) * 1000:.2f}ms')
+    for path, times in endpoint_times.items():
+        print(f'{path + " p50/p99:":24}{_percentile(times, 0.5) * 1000:.2f}ms / '
+              f'{_percentile(times, 0.99) * 1000:.2f}ms')
+    print(f'/api/config bytes:      {config_bytes[0] / len(endpoint_times["/api/config"]):.0f} per response')
+    print(f'statuses:               {dict(sorted(statuses.items()))}')
+
+
+def bench_asgi(args):
+    """Flask under gthread vs asgi.py under uvicorn workers at high concurrency."""
+    import asyncio
+    import os
+    import tempfile
+
+    paths = ('/', '/api/config', '/api/highscore')
+
+    async def exchange(reader, writer, method, path, body=b''):
+        writer.write(f'{method} {path} HTTP/1.1\r\nHost: bench\r\nAccept-Encoding: gzip\r\n'
+                     f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'.encode()
+                     + body)
+        head = await reader.readuntil(b'\r\n\r\n')
+        status = int(head.split(b' ', 2)[1])
+        length = 0
+        for line in head.split(b'\r\n'):
+            if line.lower().startswith(b'content-length:'):
+                length = int(line.split(b':')[1])
+        await reader.readexactly(length)
+        return status
+
+    async def client(host, port, deadline, times, statuses, index):
+        reader, writer = await asyncio.open_connection(host, port)
+        n = index
+        while time.perf_counter() < deadline:
+            n += 1
+            if args.post_every and n % args.post_every == 0:
+                method, path, body = 'POST', '/api/highscore', b'{"score": %d, "player": "p%d"}' % (n % 50, index)
+            else:
+                method, path, body = 'GET', paths[n % len(paths)], b''
+            start = time.perf_counter()
+            try:
+                status = await exchange(reader, writer, method, path, body)
+            except (OSError, asyncio.IncompleteReadError):
+                statuses['error'] = statuses.get('error', 0) + 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            times.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+        writer.close()
+
+    async def slow_client(host, port, deadline):
+        # Sends its headers a line at a time, like a client on a poor mobile link
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while time.perf_counter() < deadline:
+                writer.write(b'GET /api/highscore HTTP/1.1\r\nHost: bench\r\n')
+                while time.perf_counter() < deadline - 1:
+                    await asyncio.sleep(1)
+                    writer.write(b'X-Padding: 1\r\n')
+                    await writer.drain()
+                writer.write(b'\r\n')
+                await reader.readuntil(b'\r\n\r\n')
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        writer.close()
+
+    async def load(host, port):
+        times, statuses = [], {}
+        deadline = time.perf_counter() + args.warmup + args.seconds
+        tasks = [asyncio.create_task(slow_client(host, port, deadline)) for _ in range(args.slow)]
+        await asyncio.sleep(0.5)
+        tasks += [asyncio.create_task(client(host, port, deadline, times, statuses, i))
+                  for i in range(args.connections)]
+        # Drop the warm-up requests
+        await asyncio.sleep(args.warmup)
+        del times[:]
+        statuses.clear()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return times, statuses
+
+    modes = (('gthread  app:app', 'app:app', None),
+             ('uvicorn  asgi:app', 'asgi:app', 'uvicorn.workers.UvicornWorker'))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, app, worker_class in modes:
+            # A fresh leaderboard each run so both start from the same data
+            env = {'LEADERBOARD_DB': os.path.join(tmp, f'{app.split(":")[0]}.db')}
+            server, host, port = _serve(args, env, app, worker_class)
+            try:
+                times, statuses = asyncio.run(load(host, port))
+            finally:
+                server.terminate()
+                server.wait()
+            results.append((name, times, statuses))
+
+    print(f'connections:  {args.connections} keep-alive + {args.slow} slow, {args.seconds}s each, '
+          f'{args.workers} workers (gthread x {args.server_threads} threads)')
+    print(f'{"server":18} {"req/s":>8} {"p50":>9} {"p99":>9}  statuses')
+    for name, times, statuses in results:
+        print(f'{name:18} {len(times) / args.seconds:8,.0f} {_percentile(times, 0.5) * 1000:7.1f}ms '
+              f'{_percentile(times, 0.99) * 1000:7.1f}ms  {dict(sorted(statuses.items(), key=str))}')
+
+
+def bench_assets(args):
+    """Bytes and time to first frame for first and repeat visits, /static vs hashed assets."""
+    import http.client
+    import json
+    import os
+    import re
+    import tempfile
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from email.utils import parsedate_to_datetime
+
+    import static_assets
+
+    def visit(host, port, cache):
+        """Load the page like a browser with `cache` left from earlier visits."""
+        local = threading.local()
+        transferred = {'bytes': 0, 'requests': 0, 'not_modified': 0}
+        lock = threading.Lock()
+
+        def fetch(path):
+            entry = cache.get(path)
+            if entry is not None and entry['fresh_until'] > args.revisit_after:
+                return entry['body']
+            headers = {'Accept-Encoding': 'gzip, br'}
+            if entry is not None:
+                if entry['etag']:
+                    headers['If-None-Match'] = entry['etag']
+                if entry['last_modified']:
+                    headers['If-Modified-Since'] = entry['last_modified']
+            conn = getattr(local, 'conn', None)
+            if conn is None:
+                conn = local.conn = http.client.HTTPConnection(host, port, timeout=10)
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+            size = len(body) + sum(len(k) + len(v) + 4 for k, v in response.getheaders()) + 17
+            # Simulated network: one round trip plus the transfer time
+            time.sleep(args.rtt / 1000 + size * 8 / (args.mbps * 1e6))
+            with lock:
+                transferred['bytes'] += size
+                transferred['requests'] += 1
+                transferred['not_modified'] += response.status == 304
+            if response.status == 304:
+                return entry['body']
+            cache_control = response.getheader('Cache-Control') or ''
+            max_age = re.search(r'max-age=(\d+)', cache_control)
+            fresh_until = int(max_age.group(1)) if max_age and 'no-cache' not in cache_control else 0
+            if not max_age and response.getheader('Last-Modified') and 'no-cache' not in cache_control:
+                # Heuristic freshness browsers apply without an explicit lifetime
+                modified = parsedate_to_datetime(response.getheader('Last-Modified')).timestamp()
+                fresh_until = max(0, time.time() - modified) * 0.1
+            cache[path] = {'body': body, 'etag': response.getheader('ETag'),
+                           'last_modified': response.getheader('Last-Modified'),
+                           'fresh_until': fresh_until}
+            return body
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(6) as browser:
+            page = fetch('/').decode()
+            urls = json.loads(re.search(r'window.ASSET_URLS = (.*?);</script>', page).group(1))
+
+            def url(filename):
+                return urls.get(filename, '/static/' + filename)
+
+            css = browser.submit(fetch, re.search(r'<link rel="stylesheet" href="([^"]+)"', page).group(1))
+            fetch(re.search(r'<script src="([^"]+)"', page).group(1))
+            # game.js creates the Audio objects, then init() fetches the config
+            # and sets the image sources; the first frame needs all three images
+            sounds = [browser.submit(fetch, url(f'audio/{name}.mp3'))
+                      for name in ('flap', 'enemy', 'gameover', 'bg')]
+            fetch('/api/config')
+            images = [browser.submit(fetch, url(f'images/{name}.png'))
+                      for name in ('player', 'enemy', 'map')]
+            for future in [css, *images]:
+                future.result()
+            first_frame = time.perf_counter() - start
+            for future in sounds:
+                future.result()
+        return first_frame, transferred
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        dist = os.path.join(tmp, 'dist')
+        static_assets.build(dist_dir=dist)
+        for name, dist_dir in (('/static', os.path.join(tmp, 'none')), ('hashed', dist)):
+            env = {'LEADERBOARD_DB': os.path.join(tmp, 'leaderboard.db'), 'ASSET_DIST_DIR': dist_dir}
+            server, host, port = _serve(args, env)
+            try:
+                cache = {}
+                first = visit(host, port, cache)
+                repeats = [visit(host, port, cache) for _ in range(args.repeats)]
+            finally:
+                server.terminate()
+                server.wait()
+            results.append((name, first, repeats))
+
+    print(f'network: {args.rtt:.0f}ms round trip, {args.mbps:g} Mbit/s; '
+          f'repeat visits {args.revisit_after:.0f}s after the first')
+    print(f'{"assets":8} {"visit":7} {"requests":>8} {"304s":>5} {"bytes":>10} {"first frame":>12}')
+    for name, first, repeats in results:
+        repeat_frame = _percentile([frame for frame, _ in repeats], 0.5)
+        for visit_name, (frame, transferred) in (('first', first), ('repeat', (repeat_frame, repeats[-1][1]))):
+            print(f'{name:8} {visit_name:7} {transferred["requests"]:8} {transferred["not_modified"]:5} '
+                  f'{transferred["bytes"]:10,} {frame * 1000:10.0f}ms')
+
+
+def bench_ingest(args):
+    """Score ingestion throughput: batched POST /api/scores vs one POST /api/highscore per run."""
+    import http.client
+    import json
+    import os
+    import random
+    import sqlite3
+    import tempfile
+    import threading
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'leaderboard.db')
+        server, host, port = _serve(args, {'LEADERBOARD_DB': path})
+        statuses = {}
+        accepted = [0]
+        latencies = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+
+        def client(seed):
+            rng = random.Random(seed)
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            local_statuses = {}
+            local_accepted = 0
+            local_latencies = []
+            while time.perf_counter() < deadline:
+                events = [{'score': rng.randrange(100), 'player': f'player{rng.randrange(1000)}',
+                           'level': rng.randint(1, 5), 'coins': rng.randrange(20)}
+                          for _ in range(args.batch)]
+                if args.batch == 1:
+                    path_, body = '/api/highscore', events[0]
+                else:
+                    path_, body = '/api/scores', {'events': events}
+                start = time.perf_counter()
+                conn.request('POST', path_, json.dumps(body), {'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+                local_latencies.append(time.perf_counter() - start)
+                local_statuses[response.status] = local_statuses.get(response.status, 0) + 1
+                if response.status in (200, 202):
+                    local_accepted += len(events)
+            conn.close()
+            with lock:
+                for status, count in local_statuses.items():
+                    statuses[status] = statuses.get(status, 0) + count
+                accepted[0] += local_accepted
+                latencies.extend(local_latencies)
+
+        threads = [threading.Thread(target=client, args=(seed,)) for seed in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Graceful stop: workers flush their queues on the way out
+        server.terminate()
+        server.wait()
+        conn = sqlite3.connect(path)
+        # Runs imported from highscore.json have no level
+        (stored,) = conn.execute('SELECT COUNT(*) FROM scores WHERE level IS NOT NULL').fetchone()
+        conn.close()
+
+    endpoint = 'POST /api/highscore' if args.batch == 1 else f'POST /api/scores x {args.batch} events'
+    print(f'endpoint:           {endpoint}, {args.clients} clients for {args.seconds}s')
+    print(f'events accepted:    {accepted[0]} ({accepted[0] / args.seconds:,.0f}/s)')
+    print(f'request p50/p99:    {_percentile(latencies, 0.5) * 1000:.2f}ms / '
+          f'{_percentile(latencies, 0.99) * 1000:.2f}ms')
+    print(f'statuses:           {dict(sorted(statuses.items()))}')
+    print(f'stored after stop:  {stored} {"ok" if stored == accepted[0] else "LOST EVENTS"}')
+
+
+def _rss_kb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def bench_sse(args):
+    """Idle SSE connections held by one worker: memory per connection and broadcast latency."""
+    import http.client
+    import json
+    import os
+    import selectors
+    import socket
+    import tempfile
+
+    args.workers = 1
+    args.server_threads = args.connections + 16
+    with tempfile.TemporaryDirectory() as tmp:
+        server, host, port = _serve(args, {'LEADERBOARD_DB': os.path.join(tmp, 'leaderboard.db'),
+                                           'LIVE_MAX_SUBSCRIBERS': str(args.connections),
+                                           'LIVE_COALESCE': str(args.coalesce)})
+        try:
+            with open(f'/proc/{server.pid}/task/{server.pid}/children') as f:
+                worker = int(f.read().split()[0])
+
+            def request(method, path, body=None):
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                conn.request(method, path, body, {'Content-Type': 'application/json'})
+                conn.getresponse().read()
+                conn.close()
+
+            def post(score):
+                request('POST', '/api/highscore', json.dumps({'score': score, 'player': 'bench'}))
+            post(1)
+            request('GET', '/api/leaderboard/stream/stats')  # starts the publisher
+            rss_before = _rss_kb(worker)
+
+            selector = selectors.DefaultSelector()
+            received = {}
+            stream_request = f'GET /api/leaderboard/stream HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode()
+            for _ in range(args.connections):
+                sock = socket.create_connection((host, port))
+                sock.sendall(stream_request)
+                sock.setblocking(False)
+                selector.register(sock, selectors.EVENT_READ)
+                received[sock] = 0
+
+            def drain(until, wanted):
+                """Read until every socket has `wanted` messages; returns arrival times."""
+                arrivals = {}
+                while len(arrivals) < len(received) and time.perf_counter() < until:
+                    for key, _ in selector.select(timeout=0.1):
+                        data = key.fileobj.recv(65536)
+                        received[key.fileobj] += data.count(b'event: leaderboard')
+                        if received[key.fileobj] >= wanted and key.fileobj not in arrivals:
+                            arrivals[key.fileobj] = time.perf_counter()
+                return arrivals
+
+            connected = drain(time.perf_counter() + 60, 1)
+            time.sleep(0.5)
+            rss_after = _rss_kb(worker)
+            print(f'connections held:    {len(connected)}/{args.connections} by one worker')
+            print(f'worker RSS:          {rss_before / 1024:.1f}MB idle -> {rss_after / 1024:.1f}MB '
+                  f'({(rss_after - rss_before) / max(1, len(connected)):.0f}KB per connection)')
+
+            latencies = []
+            for round_ in range(args.rounds):
+                wanted = 2 + round_
+                start = time.perf_counter()
+                post(100 + round_)
+                arrivals = drain(start + 30, wanted)
+                latencies.extend(t - start for t in arrivals.values())
+                time.sleep(0.2)
+            latencies.sort()
+            print(f'broadcast latency:   p50 {_percentile(latencies, 0.5) * 1000:.1f}ms, '
+                  f'p99 {_percentile(latencies, 0.99) * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms '
+                  f'(post to last client, {args.rounds} rounds, coalesce {args.coalesce * 1000:.0f}ms)')
+
+            before = dict(received)
+            for i in range(args.burst):
+                post(1000 + i)
+            drain(time.perf_counter() + 2, max(before.values()) + args.burst)
+            delivered = [received[sock] - before[sock] for sock in received]
+            print(f'burst of {args.burst} writes:  {sum(delivered) / len(delivered):.1f} messages per client')
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def _leaderboard_writer(path, worker, runs, threads):
+    """One process of the concurrent-write stress test; returns its submissions."""
+    import random
+    import threading
+    import leaderboard
+
+    board = leaderboard.Leaderboard(path)
+    submissions = []
+    lock = threading.Lock()
+
+    def submit(thread):
+        rng = random.Random(worker * 1000 + thread)
+        local = []
+        for _ in range(runs):
+            player = f'player{rng.randrange(50)}'
+            score = rng.randrange(10000)
+            local.append((player, score, board.submit(score, player, level=rng.randint(1, 5))))
+        with lock:
+            submissions.extend(local)
+
+    pool = [threading.Thread(target=submit, args=(thread,)) for thread in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return submissions
+
+
+def bench_leaderboard(args):
+    """Leaderboard write correctness under concurrent POSTs, and read throughput."""
+    import json
+    import multiprocessing
+    import os
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    import leaderboard
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'leaderboard.db')
+        leaderboard.Leaderboard(path).close()
+        start = time.perf_counter()
+        with ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = list(pool.map(_leaderboard_writer, [path] * args.workers, range(args.workers),
+                                    [args.runs] * args.workers, [args.threads] * args.workers))
+        elapsed = time.perf_counter() - start
+        submissions = [s for result in results for s in result]
+
+        board = leaderboard.Leaderboard(path)
+        conn = board._connect()
+        (rows,) = conn.execute('SELECT COUNT(*) FROM scores').fetchone()
+        expected = {}
+        for player, score, _ in submissions:
+            expected[player] = max(expected.get(player, 0), score)
+        stored = dict(conn.execute('SELECT player, best FROM players').fetchall())
+        new_highs = [score for _, score, is_new_high in submissions if is_new_high]
+        top_score = max(score for _, score, _ in submissions)
+        print(f'writers:               {args.workers} processes x {args.threads} threads')
+        print(f'runs submitted:        {len(submissions)} in {elapsed:.2f}s '
+              f'({len(submissions) / elapsed:,.0f} writes/s)')
+        print(f'rows stored:           {rows} {"ok" if rows == len(submissions) else "LOST WRITES"}')
+        print(f'player bests:          {"ok" if stored == expected else "MISMATCH"}')
+        print(f'high score:            {board.high_score()} '
+              f'{"ok" if board.high_score() == top_score else "MISMATCH"}')
+        print(f'new-high responses:    {len(new_highs)} '
+              f'{"ok" if len(set(new_highs)) == len(new_highs) and top_score in new_highs else "RACED"}')
+
+        def reads_per_second(read):
+            count = 0
+            deadline = time.perf_counter() + args.seconds
+            while time.perf_counter() < deadline:
+                for _ in range(100):
+                    read()
+                count += 100
+            return count / args.seconds
+
+        uncached = 'SELECT player, best FROM players ORDER BY best DESC, player LIMIT 10'
+        legacy = os.path.join(tmp, 'highscore.json')
+        with open(legacy, 'w') as f:
+            json.dump({'high_score': top_score}, f)
+
+        def read_legacy():
+            with open(legacy, 'r') as f:
+                return json.load(f).get('high_score', 0)
+        print(f'top-10 reads/s:        {reads_per_second(board.top):,.0f} cached, '
+              f'{reads_per_second(lambda: conn.execute(uncached).fetchall()):,.0f} uncached')
+        print(f'high score reads/s:    {reads_per_second(board.high_score):,.0f} '
+              f'(highscore.json: {reads_per_second(read_legacy):,.0f})')
+        board.close()
+
+
+def _render_scene(level, dirty_rects=False):
+    """A desktop Game at the given level index, with a display-free SDL driver."""
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import flappy_bird
+
+    game = flappy_bird.Game(dirty_rects=dirty_rects)
+    game.on_event = lambda event: None  # keep benchmarks silent and off highscore.json
+    game.game_over = lambda: None  # invulnerable, so the scene reaches a steady state
+    game.start_game()
+    game.current_level = level
+    game.level_config = game_engine.levels[level]
+    return flappy_bird, game
+
+
+def _percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def bench_profile(args):
+    """Per-phase frame times from the built-in profiler, and what profiling costs."""
+    import os
+    flappy_bird, game = _render_scene(args.level - 1)
+
+    def play(profile):
+        game.start_game(seed=args.seed)
+        game.current_level = args.level - 1
+        game.level_config = game_engine.levels[args.level - 1]
+        game.profiler.enable(profile)
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            game.profiler.begin_frame()
+            if game_engine.gap_policy(game):
+                game.flap()
+            game.update()
+            game.draw()
+        return (time.perf_counter() - start) / args.frames
+
+    play(False)  # warm sprite and text caches
+    disabled = min(play(False) for _ in range(3))
+    draw_profile = game.draw_profile
+    game.draw_profile = lambda: None
+    timing_only = min(play(True) for _ in range(3))
+    game.draw_profile = draw_profile
+    enabled = min(play(True) for _ in range(3))
+    stats, counts = game.profiler.summary()
+    print(f'level {args.level}, {args.frames} frames; entities at the end: '
+          + ', '.join(f'{name} {value}' for name, value in counts.items()))
+    print(f'{"phase":20} {"p50":>8} {"p99":>8} {"max":>8}')
+    for phase, (p50, p99, peak) in stats.items():
+        if peak:
+            print(f'{phase:20} {p50 * 1e6:6.0f}us {p99 * 1e6:6.0f}us {peak * 1e6:6.0f}us')
+    print(f'frame time, profiler off:  {disabled * 1e6:.0f}us')
+    print(f'frame time, timing only:   {timing_only * 1e6:.0f}us ({(timing_only / disabled - 1) * 100:+.1f}%)')
+    print(f'frame time, with overlay:  {enabled * 1e6:.0f}us ({(enabled / disabled - 1) * 100:+.1f}%)')
+    if args.trace:
+        game.export_trace(args.trace)
+        print(f'trace size: {os.path.getsize(args.trace):,} bytes')
+
+
+def bench_render(args):
+    """Desktop draw() cost per frame at a given level's spawn rates."""
+    import pygame
+    flappy_bird, game = _render_scene(args.level - 1, args.dirty_rects)
+    overrides = {field: value for field, value in (('enemy_spawn_interval', args.enemy_spawn_interval),
+                                                   ('enemy_shoot_interval', args.shoot_interval))
+                 if value is not None}
+    game.level_config = game_engine.override_level(game.level_config, overrides)
+
+    draw_calls = [0]
+    for name in ('rect', 'circle', 'ellipse'):
+        original = getattr(pygame.draw, name)
+
+        def counted(*a, _original=original, **kw):
+            draw_calls[0] += 1
+            return _original(*a, **kw)
+        setattr(pygame.draw, name, counted)
+
+    pushed = [0]
+    flip, update = pygame.display.flip, pygame.display.update
+    screen_area = game_engine.SCREEN_WIDTH * game_engine.SCREEN_HEIGHT
+
+    def counted_flip():
+        pushed[0] += screen_area
+        flip()
+
+    def counted_update(rects):
+        pushed[0] += sum(rect.width * rect.height for rect in rects)
+        update(rects)
+    pygame.display.flip, pygame.display.update = counted_flip, counted_update
+
+    surfaces = [0]
+    surface_class = pygame.Surface
+
+    class CountedSurface(surface_class):
+        def __init__(self, *a, **kw):
+            surfaces[0] += 1
+            super().__init__(*a, **kw)
+    pygame.Surface = CountedSurface
+
+    times = []
+    calls = []
+    allocations = []
+    walls = []
+    projectiles = []
+    pushed_fraction = []
+    for _ in range(args.frames):
+        if game_engine.gap_policy(game):
+            game.flap()
+        game.update()
+        draw_calls[0] = 0
+        surfaces[0] = 0
+        pushed[0] = 0
+        start = time.perf_counter()
+        game.draw()
+        times.append(time.perf_counter() - start)
+        calls.append(draw_calls[0])
+        allocations.append(surfaces[0])
+        pushed_fraction.append(pushed[0] / screen_area)
+        walls.append(len(game.walls))
+        projectiles.append(len(game.projectiles))
+    pygame.Surface = surface_class
+    pygame.display.flip, pygame.display.update = flip, update
+
+    print(f'level:              {args.level} ({game_engine.levels[args.level - 1].name})')
+    print(f'renderer:           {"dirty rects" if args.dirty_rects else "full flip"}')
+    print(f'frames:             {args.frames}')
+    print(f'mean on screen:     {sum(walls) / len(walls):.1f} walls, '
+          f'{sum(projectiles) / len(projectiles):.1f} projectiles')
+    print(f'draw() p50/p99:     {_percentile(times, 0.5) * 1000:.3f}ms / {_percentile(times, 0.99) * 1000:.3f}ms')
+    print(f'screen pushed:      {sum(pushed_fraction) / len(pushed_fraction):.1%} per frame')
+    print(f'pygame.draw calls:  {sum(calls) / len(calls):.1f} per frame')
+    print(f'Surface() allocs:   {sum(allocations) / len(allocations):.2f} per frame')
+    print(f'building sprites:   {len(flappy_bird.building_cache)} cached')
+
+
+def bench_screens(args):
+    """draw() cost per frame on the idle menu and game over screens."""
+    flappy_bird, game = _render_scene(0)
+    del game.game_over  # use the real game_over() again
+    for state in ('menu', 'game_over'):
+        if state == 'menu':
+            game.game_state = 'menu'
+        else:
+            game.start_game()
+            while game.game_state == 'playing':
+                game.update()
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            game.draw()
+        elapsed = time.perf_counter() - start
+        print(f'{state + ":":11} {elapsed / args.frames * 1000:.4f}ms per frame')
+
+
+_STARTUP_SCRIPT = """
+import time
+import flappy_bird
+game = flappy_bird.Game()
+game.draw()
+print(time.time())
+loader = getattr(flappy_bird, 'assets', None)
+if loader is not None:
+    loader.wait()
+print(time.time())
+"""
+
+
+def bench_startup(args):
+    """Cold-start time from launching the desktop game to its first menu frame."""
+    import os
+    import subprocess
+    import sys
+    import tempfile
+
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy',
+               PYGAME_HIDE_SUPPORT_PROMPT='1')
+    def launch(script):
+        start = time.time()
+        output = subprocess.run([sys.executable, '-c', script], env=env, check=True,
+                                capture_output=True, text=True).stdout.split()
+        return [float(t) - start for t in output[-2:]]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env['ASSET_CACHE_DIR'] = cache_dir
+        cold = launch(_STARTUP_SCRIPT)
+        warm = [launch(_STARTUP_SCRIPT) for _ in range(args.runs)]
+    floor = [launch('import time, pygame; pygame.init(); print(time.time())')[0]
+             for _ in range(args.runs)]
+    print(f'{"":20} first menu frame   all assets loaded')
+    print(f'{"empty asset cache:":20} {cold[0] * 1000:13.1f}ms {cold[1] * 1000:16.1f}ms')
+    print(f'{"warm asset cache:":20} {_percentile([t[0] for t in warm], 0.5) * 1000:13.1f}ms '
+          f'{_percentile([t[1] for t in warm], 0.5) * 1000:16.1f}ms')
+    print(f'{"pygame.init() only:":20} {_percentile(floor, 0.5) * 1000:13.1f}ms')
+    print(f'(warm and pygame-only figures are medians of {args.runs} launches)')
+
+
+class _Invulnerable(game_engine.Engine):
+    def game_over(self):
+        pass
+
+
+def bench_stress(args):
+    """Engine update() cost with hundreds of projectiles in flight."""
+    engine = _Invulnerable()
+    engine.start_game(0)
+    engine.current_level = len(game_engine.levels) - 1
+    engine.level_config = game_engine.override_level(game_engine.levels[-1],
+                                                     {'enemy_spawn_interval': args.enemy_spawn_interval,
+                                                      'enemy_shoot_interval': args.shoot_interval})
+    for _ in range(args.warmup):
+        if game_engine.gap_policy(engine):
+            engine.flap()
+        engine.update()
+
+    times = []
+    projectiles = []
+    for _ in range(args.frames):
+        if game_engine.gap_policy(engine):
+            engine.flap()
+        start = time.perf_counter()
+        engine.update()
+        times.append(time.perf_counter() - start)
+        projectiles.append(len(engine.projectiles))
+    print(f'projectiles:       {sum(projectiles) / len(projectiles):.0f} mean, {max(projectiles)} max')
+    print(f'enemies:           {len(engine.enemies)}')
+    print(f'update() p50/p99:  {_percentile(times, 0.5) * 1e6:.1f}us / {_percentile(times, 0.99) * 1e6:.1f}us')
+    print(f'frames/s:          {len(times) / sum(times):,.0f}')
+
+
+def bench_env(args):
+    """RL environment steps per second, from one process up to every core."""
+    import os
+    import numpy as np
+    import rl_env
+
+    actions = np.random.default_rng(0).random((args.steps, args.envs)) < 0.08
+    env = rl_env.FlappyEnv()
+    env.reset(seed=0)
+    flat = actions.reshape(-1)
+    start = time.perf_counter()
+    for action in flat:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+    print(f'FlappyEnv:                    {len(flat) / (time.perf_counter() - start):10,.0f} steps/s')
+
+    baseline = None
+    for workers in range((args.max_workers or os.cpu_count()) + 1):
+        with rl_env.VectorEnv(args.envs, workers=workers, seed=0) as env:
+            env.reset()
+            for action in actions[:args.warmup]:
+                env.step(action)
+            start = time.perf_counter()
+            for action in actions:
+                env.step(action)
+            rate = args.steps * args.envs / (time.perf_counter() - start)
+        if not workers:
+            print(f'VectorEnv({args.envs}), in-process: {rate:10,.0f} steps/s')
+            continue
+        baseline = baseline or rate
+        print(f'VectorEnv({args.envs}), {workers:2} worker{"s" if workers > 1 else " "}: '
+              f'{rate:10,.0f} steps/s ({rate / baseline:.2f}x one worker)')
+
+
+def bench_ghosts(args):
+    """Ghost replay store: appends, lookups by rank and GET /api/ghost?rank= throughput."""
+    import http.client
+    import os
+    import random
+    import shutil
+    import tempfile
+    import threading
+    import ghosts
+    import replay
+
+    rng = random.Random(0)
+    runs = []
+    for _ in range(args.runs):
+        frames = rng.randint(600, 60 * 60 * 3)
+        # Roughly one flap every half second, like the bot players
+        flaps = sorted(rng.sample(range(frames), frames // 30))
+        runs.append(replay.Replay(rng.getrandbits(64), flaps, frames, rng.randint(0, 500)))
+    directory = tempfile.mkdtemp(prefix='ghosts-')
+
+    store = ghosts.GhostStore(directory, capacity=args.runs)
+    start = time.perf_counter()
+    for n, run in enumerate(runs):
+        store.add(run, f'player{n}')
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    print(f'runs stored:          {len(store):,} ({size / len(store):.0f} bytes each on disk)')
+    print(f'appends/s:            {args.runs / elapsed:,.0f}')
+
+    start = time.perf_counter()
+    reopened = ghosts.GhostStore(directory, capacity=args.runs)
+    len(reopened)
+    print(f'open + index load:    {(time.perf_counter() - start) * 1000:.1f}ms')
+
+    ranks = [rng.randint(1, args.runs) for _ in range(args.lookups)]
+    start = time.perf_counter()
+    for rank in ranks:
+        store.get(rank)
+    mapped = args.lookups / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for rank in ranks:
+        replay.Replay.from_bytes(store.get(rank)[0]).to_bytes()
+    parsed = args.lookups / (time.perf_counter() - start)
+    print(f'get(rank)/s:          {mapped:,.0f} (slice of the map)')
+    print(f'  with decode+encode: {parsed:,.0f} (what serving parsed replays would cost)')
+
+    server, host, port = _serve(args, env={'GHOST_DIR': directory, 'GHOST_CAPACITY': str(args.runs)})
+    times = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def client(seed):
+        local_rng = random.Random(seed)
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+        local = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            conn.request('GET', f'/api/ghost?rank={local_rng.randint(1, args.runs)}')
+            response = conn.getresponse()
+            response.read()
+            local.append((time.perf_counter() - start, response.status))
+        conn.close()
+        with lock:
+            times.extend(local)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.terminate()
+    server.wait()
+    statuses = {}
+    for _, status in times:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = [elapsed for elapsed, _ in times]
+    print(f'GET /api/ghost:        {len(times) / args.seconds:,.0f} requests/s with {args.clients} clients '
+          f'(gunicorn {args.workers} workers x {args.server_threads} threads)')
+    print(f'  p50/p99:            {_percentile(latencies, 0.5) * 1000:.2f}ms / '
+          f'{_percentile(latencies, 0.99) * 1000:.2f}ms, statuses {statuses}')
+    shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    engine = commands.add_parser('engine', help=bench_engine.__doc__)
+    engine.add_argument('--games', type=int, default=200)
+    engine.add_argument('--max-frames', type=int, default=60 * 60 * 5)
+    engine.set_defaults(func=bench_engine)
+
+    batch = commands.add_parser('batch', help=bench_batch.__doc__)
+    batch.add_argument('--games', type=int, default=10000)
+    batch.add_argument('--max-frames', type=int, default=60 * 60 * 5)
+    batch.add_argument('--verify', type=int, default=100,
+                       help='games to re-run through the scalar engine for parity')
+    batch.set_defaults(func=bench_batch)
+
+    verify = commands.add_parser('verify', help=bench_verify.__doc__)
+    verify.add_argument('--runs', type=int, default=500)
+    verify.add_argument('--threads', type=int, default=8,
+                        help='concurrent request threads')
+    verify.add_argument('--max-frames', type=int, default=60 * 60 * 5)
+    verify.set_defaults(func=bench_verify)
+
+    config = commands.add_parser('config', help=bench_config.__doc__)
+    config.add_argument('--loops', type=int, default=200000)
+    config.set_defaults(func=bench_config)
+
+    http = commands.add_parser('http', help=bench_http.__doc__)
+    http.add_argument('--url', help='load an already running server instead of starting gunicorn')
+    http.add_argument('--clients', type=int, default=16)
+    http.add_argument('--seconds', type=float, default=10)
+    http.add_argument('--workers', type=int, default=2)
+    http.add_argument('--server-threads', type=int, default=32)
+    http.add_argument('--no-revalidate', dest='revalidate', action='store_false',
+                      help='don\'t send If-None-Match for /api/config, like a browser with an empty cache')
+    http.set_defaults(func=bench_http)
+
+    asgi = commands.add_parser('asgi', help=bench_asgi.__doc__)
+    asgi.add_argument('--connections', type=int, default=256)
+    asgi.add_argument('--slow', type=int, default=0,
+                      help='extra connections that trickle their headers in')
+    asgi.add_argument('--post-every', type=int, default=20,
+                      help='every Nth request posts a score; 0 for reads only')
+    asgi.add_argument('--seconds', type=float, default=10)
+    asgi.add_argument('--warmup', type=float, default=2)
+    asgi.add_argument('--workers', type=int, default=2)
+    asgi.add_argument('--server-threads', type=int, default=32)
+    asgi.set_defaults(func=bench_asgi)
+
+    assets = commands.add_parser('assets', help=bench_assets.__doc__)
+    assets.add_argument('--rtt', type=float, default=50, help='simulated round trip (ms)')
+    assets.add_argument('--mbps', type=float, default=20, help='simulated bandwidth')
+    assets.add_argument('--revisit-after', type=float, default=3600,
+                        help='seconds between visits, for cache freshness')
+    assets.add_argument('--repeats', type=int, default=5)
+    assets.add_argument('--workers', type=int, default=2)
+    assets.add_argument('--server-threads', type=int, default=32)
+    assets.set_defaults(func=bench_assets)
+
+    ingest = commands.add_parser('ingest', help=bench_ingest.__doc__)
+    ingest.add_argument('--batch', type=int, default=100,
+                        help='events per request; 1 posts to /api/highscore instead')
+    ingest.add_argument('--clients', type=int, default=8)
+    ingest.add_argument('--seconds', type=float, default=10)
+    ingest.add_argument('--workers', type=int, default=2)
+    ingest.add_argument('--server-threads', type=int, default=32)
+    ingest.set_defaults(func=bench_ingest)
+
+    sse = commands.add_parser('sse', help=bench_sse.__doc__)
+    sse.add_argument('--connections', type=int, default=2000)
+    sse.add_argument('--rounds', type=int, default=10, help='broadcasts to time')
+    sse.add_argument('--burst', type=int, default=50, help='back-to-back writes to coalesce')
+    sse.add_argument('--coalesce', type=float, default=0.1)
+    sse.set_defaults(func=bench_sse)
+
+    board = commands.add_parser('leaderboard', help=bench_leaderboard.__doc__)
+    board.add_argument('--workers', type=int, default=2, help='writer processes (gunicorn workers)')
+    board.add_argument('--threads', type=int, default=4, help='writer threads per process')
+    board.add_argument('--runs', type=int, default=250, help='scores submitted per thread')
+    board.add_argument('--seconds', type=float, default=2, help='duration of each read benchmark')
+    board.set_defaults(func=bench_leaderboard)
+
+    render = commands.add_parser('render', help=bench_render.__doc__)
+    render.add_argument('--level', type=int, default=5)
+    render.add_argument('--frames', type=int, default=2000)
+    render.add_argument('--dirty-rects', action='store_true',
+                        help='use the dirty-rect renderer instead of full-screen flips')
+    render.add_argument('--enemy-spawn-interval', type=int,
+                        help='override the level\'s enemy_spawn_interval (ms)')
+    render.add_argument('--shoot-interval', type=int,
+                        help='override the level\'s enemy_shoot_interval (ms)')
+    render.set_defaults(func=bench_render)
+
+    profile = commands.add_parser('profile', help=bench_profile.__doc__)
+    profile.add_argument('--level', type=int, default=5)
+    profile.add_argument('--frames', type=int, default=600)
+    profile.add_argument('--seed', type=int, default=1)
+    profile.add_argument('--trace', metavar='FILE', help='also write a Chrome trace')
+    profile.set_defaults(func=bench_profile)
+
+    screens = commands.add_parser('screens', help=bench_screens.__doc__)
+    screens.add_argument('--frames', type=int, default=600)
+    screens.set_defaults(func=bench_screens)
+
+    stress = commands.add_parser('stress', help=bench_stress.__doc__)
+    stress.add_argument('--frames', type=int, default=3000)
+    stress.add_argument('--warmup', type=int, default=600)
+    stress.add_argument('--enemy-spawn-interval', type=int, default=150)
+    stress.add_argument('--shoot-interval', type=int, default=50)
+    stress.set_defaults(func=bench_stress)
+
+    env = commands.add_parser('env', help=bench_env.__doc__)
+    env.add_argument('--envs', type=int, default=64, help='games per VectorEnv')
+    env.add_argument('--steps', type=int, default=2000, help='timed steps per run')
+    env.add_argument('--warmup', type=int, default=100)
+    env.add_argument('--max-workers', type=int, help='default: CPU count')
+    env.set_defaults(func=bench_env)
+
+    ghost = commands.add_parser('ghosts', help=bench_ghosts.__doc__)
+    ghost.add_argument('--runs', type=int, default=5000, help='replays to store')
+    ghost.add_argument('--lookups', type=int, default=100000)
+    ghost.add_argument('--clients', type=int, default=8)
+    ghost.add_argument('--seconds', type=float, default=5)
+    ghost.add_argument('--workers', type=int, default=2)
+    ghost.add_argument('--server-threads', type=int, default=8)
+    ghost.set_defaults(func=bench_ghosts)
+
+    startup = commands.add_parser('startup', help=bench_startup.__doc__)
+    startup.add_argument('--runs', type=int, default=15,
+                         help='launches to time after the first one has filled the cache')
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,22 +4,21 @@ import json
 import random
 import os
 import math
+import threading
+import time
+from collections import OrderedDict
 from pygame import mixer
 
+import game_engine
+from game_engine import game_settings, SCREEN_WIDTH, SCREEN_HEIGHT, FPS, FRAME_MS
+from profiler import FrameProfiler
+from replay import Replay
+
 # Initialize Pygame
 pygame.init()
 mixer.init()
 
-# Load configuration
-with open('levels.json', 'r') as f:
-    config = json.load(f)
-
-game_settings = config['game_settings']
-levels = config['levels']
-
 # Screen setup
-SCREEN_WIDTH = game_settings['screen_width']
-SCREEN_HEIGHT = game_settings['screen_height']
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption('Flappy Bird - City Edition')
 
@@ -27,13 +26,6 @@ pygame.display.set_caption('Flappy Bird - City Edition')
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 GRAY = (50, 50, 50)
-BUILDING_COLORS = [
-    (100, 149, 237),  # Cornflower blue
-    (255, 127, 80),   # Coral
-    (144, 238, 144),  # Light green
-    (255, 218, 185),  # Peach
-    (221, 160, 221),  # Plum
-]
 
 # Load high score
 HIGH_SCORE_FILE = 'highscore.json'
@@ -48,501 +40,532 @@ def save_high_score(score):
     with open(HIGH_SCORE_FILE, 'w') as f:
         json.dump({'high_score': score}, f)
 
-# Load and scale images
-def load_image(path, size):
-    image = pygame.image.load(path)
-    return pygame.transform.scale(image, size)
-
-player_img = load_image('assets/images/player.png', (game_settings['player_size'], game_settings['player_size']))
-enemy_img = load_image('assets/images/enemy.png', (game_settings['enemy_size'], game_settings['enemy_size']))
-background_original = pygame.image.load('assets/images/map.png')
-background = pygame.transform.scale(background_original, (SCREEN_WIDTH, SCREEN_HEIGHT))
-
-# Create blurred background
-def create_blurred_background():
-    blur_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    blur_surface.blit(background, (0, 0))
-    blur_surface.set_alpha(180)
-    return blur_surface
-
-blurred_bg = create_blurred_background()
-
-# Load sounds
-def load_sound(path):
-    try:
-        return mixer.Sound(path)
-    except:
-        return None
-
-flap_sound = load_sound('assets/audio/flap.mp3')
-enemy_sound = load_sound('assets/audio/enemy.mp3')
-gameover_sound = load_sound('assets/audio/gameover.mp3')
-
-# Background music
-try:
-    mixer.music.load('assets/audio/bg.mp3')
-    mixer.music.set_volume(0.3)
-except:
-    pass
-
-# Fonts
-font_large = pygame.font.Font(None, 72)
-font_medium = pygame.font.Font(None, 48)
-font_small = pygame.font.Font(None, 36)
-
-class Player:
-    def __init__(self):
-        self.x = 150
-        self.y = SCREEN_HEIGHT // 2
-        self.velocity = 0
-        self.size = game_settings['player_size']
-        self.rect = pygame.Rect(self.x, self.y, self.size, self.size)
-        self.angle = 0
-        self.started = False
-        
-    def flap(self):
-        self.velocity = game_settings['flap_strength']
-        self.started = True
-        if flap_sound:
-            flap_sound.play()
+# Assets. Nothing is decoded at import: the menu only needs the background,
+# so images are loaded the first time they're drawn and sounds are decoded on
+# a background thread while the menu is already up. Decoded, scaled pixels and
+# PCM samples are kept in ASSET_CACHE_DIR, keyed by the source file's mtime and
+# the target size or mixer format, so later starts skip PNG/MP3 decoding.
+ASSET_CACHE_DIR = os.environ.get('ASSET_CACHE_DIR', os.path.join('.cache', 'assets'))
+
+PLAYER_IMAGE = ('assets/images/player.png', (game_settings.player_size, game_settings.player_size))
+ENEMY_IMAGE = ('assets/images/enemy.png', (game_settings.enemy_size, game_settings.enemy_size))
+BACKGROUND_IMAGE = ('assets/images/map.png', (SCREEN_WIDTH, SCREEN_HEIGHT))
+FLAP_SOUND = 'assets/audio/flap.mp3'
+ENEMY_SOUND = 'assets/audio/enemy.mp3'
+GAMEOVER_SOUND = 'assets/audio/gameover.mp3'
+MUSIC = 'assets/audio/bg.mp3'
+
+class AssetLoader:
+    def __init__(self, cache_dir=ASSET_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.images = {}
+        # Images decoded by the background thread, not yet converted to the
+        # display format (which has to happen on the main thread)
+        self.decoded = {}
+        self.sounds = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def cache_path(self, path, variant):
+        name = os.path.basename(path).replace('.', '_')
+        return os.path.join(self.cache_dir, f'{name}-{variant}-{os.stat(path).st_mtime_ns}.raw')
+
+    def write_cache(self, cached, data):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            partial = f'{cached}.{threading.get_ident()}.tmp'
+            with open(partial, 'wb') as f:
+                f.write(data)
+            os.replace(partial, cached)
+        except OSError:
+            pass  # The cache is only an optimisation
+
+    def decode_image(self, path, size):
+        cached = self.cache_path(path, f'{size[0]}x{size[1]}')
+        try:
+            with open(cached, 'rb') as f:
+                return pygame.image.frombytes(f.read(), size, 'RGBA')
+        except (OSError, ValueError):
+            pass
+        image = pygame.transform.scale(pygame.image.load(path), size)
+        self.write_cache(cached, pygame.image.tobytes(image, 'RGBA'))
+        return image
+
+    def image(self, path, size, alpha=True):
+        """The image scaled to size, in the display's pixel format."""
+        key = (path, size)
+        image = self.images.get(key)
+        if image is None:
+            with self.lock:
+                decoded = self.decoded.pop(key, None)
+            if decoded is None:
+                decoded = self.decode_image(path, size)
+            # Match the display's pixel format so blits don't convert every frame
+            image = decoded.convert_alpha() if alpha else decoded.convert()
+            self.images[key] = image
+        return image
+
+    def decode_sound(self, path):
+        frequency, size, channels = mixer.get_init()
+        cached = self.cache_path(path, f'{frequency}Hz{size}b{channels}ch')
+        try:
+            with open(cached, 'rb') as f:
+                return mixer.Sound(buffer=f.read())
+        except OSError:
+            pass
+        try:
+            sound = mixer.Sound(path)
+        except (pygame.error, OSError):
+            return None
+        self.write_cache(cached, sound.get_raw())
+        return sound
+
+    def sound(self, path):
+        """The decoded sound, or None if it isn't loaded (yet)."""
+        return self.sounds.get(path)
+
+    def preload(self, images=(), sounds=(), music=None):
+        """Decode sounds, then images, on a background thread (once)."""
+        if self.thread is not None:
+            return
+        def load():
+            for path in sounds:
+                self.sounds[path] = self.decode_sound(path)
+            if music:
+                try:
+                    mixer.music.load(music)
+                    mixer.music.set_volume(0.3)
+                except:
+                    pass
+            for path, size in images:
+                if (path, size) not in self.images:
+                    decoded = self.decode_image(path, size)
+                    with self.lock:
+                        self.decoded[(path, size)] = decoded
+        self.thread = threading.Thread(target=load, name='asset-loader', daemon=True)
+        self.thread.start()
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+
+assets = AssetLoader()
+
+def play_sound(path):
+    # Sounds still being decoded in the background are skipped
+    sound = assets.sound(path)
+    if sound:
+        sound.play()
+
+# Background with the blurred overlay composited once, in display format
+backdrop = None
+
+def get_backdrop():
+    global backdrop
+    if backdrop is None:
+        background = assets.image(*BACKGROUND_IMAGE, alpha=False)
+        blurred_bg = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        blurred_bg.blit(background, (0, 0))
+        blurred_bg.set_alpha(180)
+        backdrop = background.copy()
+        backdrop.blit(blurred_bg, (0, 0))
+        backdrop = backdrop.convert()
+    return backdrop
+
+# How often the running game checks levels.json for edits
+CONFIG_CHECK_MS = 1000
+
+# Frame profiler phases, in the order the game loop runs them. F3 toggles
+# profiling and its overlay, F4 writes the buffered frames as a trace.
+PROFILE_PHASES = (
+    'events', 'idle',
+    'update.spawns', 'update.player', 'update.walls', 'update.enemies',
+    'update.projectiles', 'update.coins',
+    'draw.backdrop', 'draw.walls', 'draw.coins', 'draw.projectiles', 'draw.enemies',
+    'draw.player', 'draw.hud', 'draw.overlay', 'draw.flip',
+)
+PROFILE_COUNTERS = ('walls', 'enemies', 'projectiles', 'coins')
+PROFILE_OVERLAY_REFRESH = 30  # frames between overlay redraws
+PROFILE_FONT = 20
+
+# Dirty-rect renderer: fall back to a full flip when more than this
+# fraction of the screen changed in a frame
+DIRTY_FULL_FLIP_FRACTION = 0.5
+
+def merge_dirty_rects(rects):
+    # A sprite's old and new rects mostly overlap; pushing their union
+    # is cheaper than pushing the overlap twice
+    merged = []
+    for rect in rects:
+        if not rect.width or not rect.height:
+            continue
+        for i, other in enumerate(merged):
+            if rect.colliderect(other):
+                union = rect.union(other)
+                if union.width * union.height < rect.width * rect.height + other.width * other.height:
+                    merged[i] = union
+                    break
+        else:
+            merged.append(rect)
+    return merged
+
+# Pre-rendered building sprites, keyed by (color, width, height, window seed)
+BUILDING_CACHE_SIZE = 64
+building_cache = OrderedDict()
+
+def render_building(color, width, height, window_seed):
+    building = pygame.Surface((width, height))
+    # Main building body
+    building.fill(color)
+    # Building outline
+    pygame.draw.rect(building, BLACK, (0, 0, width, height), 3)
     
-    def update(self):
-        if self.started:
-            self.velocity += game_settings['gravity']
-            self.y += self.velocity
-        
-        # Update angle based on velocity
-        self.angle = max(-30, min(30, -self.velocity * 3))
-        
-        # Keep player on screen
-        if self.y < 0:
-            self.y = 0
-            self.velocity = 0
-        if self.y > SCREEN_HEIGHT - self.size:
-            self.y = SCREEN_HEIGHT - self.size
-            self.velocity = 0
-        
-        self.rect.y = self.y
+    # Windows; lit/unlit pattern is fixed per building by its seed
+    window_rng = random.Random(window_seed)
+    window_size = 8
+    window_spacing = 15
+    for wx in range(10, width - 10, window_spacing):
+        for wy in range(10, height - 10, window_spacing):
+            window_color = (255, 255, 200) if window_rng.random() > 0.3 else (50, 50, 70)
+            building.fill(window_color, (wx, wy, window_size, window_size))
+    return building.convert()
+
+def get_building_sprite(color, width, height, window_seed):
+    key = (color, width, height, window_seed)
+    sprite = building_cache.get(key)
+    if sprite is None:
+        sprite = render_building(color, width, height, window_seed)
+        building_cache[key] = sprite
+        if len(building_cache) > BUILDING_CACHE_SIZE:
+            building_cache.popitem(last=False)
+    else:
+        building_cache.move_to_end(key)
+    return sprite
+
+# Player sprite rotated to each whole degree the player can tilt (angle is
+# clamped to +/-30), with the half-size needed to keep it centred.
+player_sprites = {}
+
+def get_player_sprite(angle):
+    angle = round(angle)
+    sprite = player_sprites.get(angle)
+    if sprite is None:
+        rotated = pygame.transform.rotate(assets.image(*PLAYER_IMAGE), angle)
+        sprite = (rotated, rotated.get_width() // 2, rotated.get_height() // 2)
+        player_sprites[angle] = sprite
+    return sprite
+
+# Projectile pulse frames keyed by (projectile_size, pulse); the pulse only
+# takes a few whole-pixel values.
+projectile_sprites = {}
+
+def render_projectile(size, pulse):
+    radius = size // 2 + pulse
+    offset = radius + 2
+    sprite = pygame.Surface((offset * 2 + 1, offset * 2 + 1), pygame.SRCALPHA)
+    center = (offset, offset)
+    # Outer glow (dark purple/red)
+    pygame.draw.circle(sprite, (80, 20, 60), center, radius + 2)
+    # Middle layer (red)
+    pygame.draw.circle(sprite, (180, 40, 40), center, radius)
+    # Inner core (bright red/orange)
+    pygame.draw.circle(sprite, (255, 100, 80), center, max(2, radius - 3))
+    # Center bright spot
+    pygame.draw.circle(sprite, (255, 200, 150), center, max(1, radius - 5))
+    return sprite.convert_alpha(), offset
+
+def get_projectile_sprite(size, pulse):
+    key = (size, pulse)
+    sprite = projectile_sprites.get(key)
+    if sprite is None:
+        sprite = projectile_sprites[key] = render_projectile(size, pulse)
+    return sprite
+
+# Coin spin atlas: one pre-rendered frame per rotation angle, built once per
+# coin size. Frames only depend on the oval width, so most angles share one.
+coin_atlas = {}
+
+def render_coin_frame(size, oval_width):
+    coin_surface = pygame.Surface((size, size), pygame.SRCALPHA)
+    # Outer gold ring
+    pygame.draw.ellipse(coin_surface, (255, 215, 0), 
+                      (size//2 - oval_width//2, 2, oval_width, size - 4))
+    # Inner darker gold
+    if oval_width > 6:
+        pygame.draw.ellipse(coin_surface, (218, 165, 32), 
+                          (size//2 - oval_width//2 + 3, 5, oval_width - 6, size - 10))
+    # Highlight
+    if oval_width > 10:
+        pygame.draw.ellipse(coin_surface, (255, 255, 200), 
+                          (size//2 - oval_width//2 + 4, 6, oval_width//2, size//4))
+    return coin_surface.convert_alpha()
+
+def get_coin_frames(size):
+    frames = coin_atlas.get(size)
+    if frames is None:
+        by_width = {}
+        frames = []
+        for rotation in range(360):
+            # Calculate 3D rotation effect (oval width based on rotation)
+            oval_width = int(size * abs(math.cos(math.radians(rotation))))
+            if oval_width > 2:  # Only draw if visible
+                if oval_width not in by_width:
+                    by_width[oval_width] = render_coin_frame(size, oval_width)
+                frames.append(by_width[oval_width])
+            else:
+                frames.append(None)
+        coin_atlas[size] = frames
+    return frames
+
+# Fonts, by point size, created on first use
+FONT_LARGE = 72
+FONT_MEDIUM = 48
+FONT_SMALL = 36
+fonts = {}
+
+def get_font(size):
+    font = fonts.get(size)
+    if font is None:
+        font = fonts[size] = pygame.font.Font(None, size)
+    return font
+
+# Rendered text surfaces keyed by (font size, text, color), least recently used
+# evicted first, so unchanged HUD and menu text is rendered only once
+TEXT_CACHE_SIZE = 128
+text_cache = OrderedDict()
+
+def render_text(font_size, text, color):
+    key = (font_size, text, color)
+    rendered = text_cache.get(key)
+    if rendered is None:
+        rendered = get_font(font_size).render(text, True, color)
+        text_cache[key] = rendered
+        if len(text_cache) > TEXT_CACHE_SIZE:
+            text_cache.popitem(last=False)
+    else:
+        text_cache.move_to_end(key)
+    return rendered
+
+# Semi-transparent game over overlay
+def create_game_over_overlay():
+    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    overlay.set_alpha(150)
+    overlay.fill(BLACK)
+    return overlay
+
+game_over_overlay = create_game_over_overlay()
+
+class Player(game_engine.Player):
+    __slots__ = ()
     
     def draw(self, surface):
-        rotated = pygame.transform.rotate(player_img, self.angle)
-        rect = rotated.get_rect(center=(self.x + self.size//2, self.y + self.size//2))
-        surface.blit(rotated, rect)
+        rotated, half_width, half_height = get_player_sprite(self.angle)
+        return surface.blit(rotated, (self.x + self.size//2 - half_width, self.y + self.size//2 - half_height))
+
+class Wall(game_engine.Wall):
+    __slots__ = ('window_seed', 'top_sprite', 'bottom_sprite')
     
-    def reset(self):
-        self.y = SCREEN_HEIGHT // 2
-        self.velocity = 0
-        self.started = False
-
-class Wall:
-    def __init__(self, x, gap_y, gap_height, speed):
-        self.x = x
-        self.gap_y = gap_y
-        self.gap_height = gap_height
-        self.width = game_settings['wall_width']
-        self.speed = speed
-        self.passed = False
-        self.color = random.choice(BUILDING_COLORS)
-        
-    def update(self):
-        self.x -= self.speed
+    def __init__(self, *args):
+        super().__init__(*args)
+        # Cosmetic only, so drawn from the global RNG rather than the game's
+        self.window_seed = random.getrandbits(32)
+        self.top_sprite = None
+        self.bottom_sprite = None
     
     def draw(self, surface):
+        if self.top_sprite is None:
+            bottom_height = SCREEN_HEIGHT - (self.gap_y + self.gap_height)
+            self.top_sprite = get_building_sprite(self.color, self.width, self.gap_y, self.window_seed)
+            self.bottom_sprite = get_building_sprite(self.color, self.width, bottom_height,
+                                                     self.window_seed + 1)
         # Top building (wall)
-        top_height = self.gap_y
-        self.draw_building(surface, self.x, 0, self.width, top_height)
-        
+        top_rect = surface.blit(self.top_sprite, (self.x, 0))
         # Bottom building (wall)
-        bottom_y = self.gap_y + self.gap_height
-        bottom_height = SCREEN_HEIGHT - bottom_y
-        self.draw_building(surface, self.x, bottom_y, self.width, bottom_height)
-    
-    def draw_building(self, surface, x, y, width, height):
-        # Main building body
-        pygame.draw.rect(surface, self.color, (x, y, width, height))
-        # Building outline
-        pygame.draw.rect(surface, BLACK, (x, y, width, height), 3)
-        
-        # Windows
-        window_size = 8
-        window_spacing = 15
-        for wx in range(int(x + 10), int(x + width - 10), window_spacing):
-            for wy in range(int(y + 10), int(y + height - 10), window_spacing):
-                window_color = (255, 255, 200) if random.random() > 0.3 else (50, 50, 70)
-                pygame.draw.rect(surface, window_color, (wx, wy, window_size, window_size))
-    
-    def collides_with(self, player):
-        player_rect = pygame.Rect(player.x + 10, player.y + 10, player.size - 20, player.size - 20)
-        top_rect = pygame.Rect(self.x, 0, self.width, self.gap_y)
-        bottom_rect = pygame.Rect(self.x, self.gap_y + self.gap_height, self.width, SCREEN_HEIGHT)
-        return player_rect.colliderect(top_rect) or player_rect.colliderect(bottom_rect)
-    
-    def is_off_screen(self):
-        return self.x + self.width < 0
-
-class Enemy:
-    def __init__(self, level_config):
-        self.x = SCREEN_WIDTH + 50
-        self.y = random.randint(100, SCREEN_HEIGHT - 100)
-        self.size = game_settings['enemy_size']
-        self.speed = level_config['enemy_speed']
-        self.rect = pygame.Rect(self.x, self.y, self.size, self.size)
-        self.wave_offset = random.random() * 10
-        self.wave_amplitude = 30
-        self.wave_frequency = 0.05
-        self.original_y = self.y
-        self.last_shot_time = pygame.time.get_ticks()
-        self.shoot_interval = level_config['enemy_shoot_interval']
-        self.projectile_speed = level_config['projectile_speed']
-        
-    def update(self, frame_count):
-        self.x -= self.speed
-        # Flying motion - sine wave
-        self.y = self.original_y + self.wave_amplitude * math.sin(
-            (frame_count + self.wave_offset) * self.wave_frequency
-        )
-        self.rect.x = self.x
-        self.rect.y = self.y
-    
-    def can_shoot(self, current_time, player):
-        # Only shoot if enemy is on screen and player is visible
-        if self.x > SCREEN_WIDTH or self.x < -self.size:
-            return False
-        if current_time - self.last_shot_time > self.shoot_interval:
-            # Only shoot if player is somewhat in front (to the left)
-            if self.x > player.x:
-                return True
-        return False
-    
-    def shoot(self, player):
-        self.last_shot_time = pygame.time.get_ticks()
-        # Create projectile from enemy center toward player center
-        start_x = self.x + self.size // 2
-        start_y = self.y + self.size // 2
-        target_x = player.x + player.size // 2
-        target_y = player.y + player.size // 2
-        return Projectile(start_x, start_y, target_x, target_y, self.projectile_speed)
+        bottom_rect = surface.blit(self.bottom_sprite, (self.x, self.gap_y + self.gap_height))
+        return top_rect.union(bottom_rect)
+
+class Enemy(game_engine.Enemy):
+    __slots__ = ()
     
     def draw(self, surface):
-        surface.blit(enemy_img, (self.x, self.y))
-    
-    def collides_with(self, player):
-        player_rect = pygame.Rect(player.x + 10, player.y + 10, player.size - 20, player.size - 20)
-        enemy_rect = pygame.Rect(self.x + 10, self.y + 10, self.size - 20, self.size - 20)
-        return player_rect.colliderect(enemy_rect)
-    
-    def is_off_screen(self):
-        return self.x + self.size < 0
-
-class Projectile:
-    def __init__(self, start_x, start_y, target_x, target_y, speed):
-        self.x = start_x
-        self.y = start_y
-        self.size = game_settings['projectile_size']
-        self.speed = speed
-        
-        # Calculate direction vector
-        dx = target_x - start_x
-        dy = target_y - start_y
-        distance = math.sqrt(dx**2 + dy**2)
-        
-        # Normalize and multiply by speed
-        if distance > 0:
-            self.velocity_x = (dx / distance) * speed
-            self.velocity_y = (dy / distance) * speed
-        else:
-            self.velocity_x = -speed
-            self.velocity_y = 0
-        
-        self.rect = pygame.Rect(self.x, self.y, self.size, self.size)
-        self.animation_frame = 0
-        
-    def update(self):
-        self.x += self.velocity_x
-        self.y += self.velocity_y
-        self.rect.x = self.x
-        self.rect.y = self.y
-        self.animation_frame += 1
+        return surface.blit(assets.image(*ENEMY_IMAGE), (self.x, self.y))
+
+class Projectile(game_engine.Projectile):
+    __slots__ = ()
     
     def draw(self, surface):
-        # Draw a dark energy ball with pulsing effect
-        pulse = abs(math.sin(self.animation_frame * 0.2)) * 3
-        radius = self.size // 2 + int(pulse)
-        center_x = int(self.x + self.size // 2)
-        center_y = int(self.y + self.size // 2)
-        
-        # Outer glow (dark purple/red)
-        pygame.draw.circle(surface, (80, 20, 60), (center_x, center_y), radius + 2)
-        # Middle layer (red)
-        pygame.draw.circle(surface, (180, 40, 40), (center_x, center_y), radius)
-        # Inner core (bright red/orange)
-        pygame.draw.circle(surface, (255, 100, 80), (center_x, center_y), max(2, radius - 3))
-        # Center bright spot
-        pygame.draw.circle(surface, (255, 200, 150), (center_x, center_y), max(1, radius - 5))
-    
-    def collides_with(self, player):
-        player_rect = pygame.Rect(player.x + 10, player.y + 10, player.size - 20, player.size - 20)
-        projectile_rect = pygame.Rect(self.x, self.y, self.size, self.size)
-        return player_rect.colliderect(projectile_rect)
-    
-    def is_off_screen(self):
-        return (self.x < -self.size or self.x > SCREEN_WIDTH + self.size or 
-                self.y < -self.size or self.y > SCREEN_HEIGHT + self.size)
-
-class Coin:
-    def __init__(self, level_config):
-        self.x = SCREEN_WIDTH + 50
-        self.y = random.randint(100, SCREEN_HEIGHT - 100)
-        self.size = game_settings['coin_size']
-        self.speed = level_config['coin_speed']
-        self.rect = pygame.Rect(self.x, self.y, self.size, self.size)
-        self.rotation = 0
-        self.rotation_speed = 3
-        self.float_offset = random.random() * 10
-        self.float_amplitude = 15
-        self.float_frequency = 0.08
-        self.original_y = self.y
-        
-    def update(self, frame_count):
-        self.x -= self.speed
-        # Floating motion - slower sine wave
-        self.y = self.original_y + self.float_amplitude * math.sin(
-            (frame_count + self.float_offset) * self.float_frequency
-        )
-        # Rotation animation
-        self.rotation = (self.rotation + self.rotation_speed) % 360
-        self.rect.x = self.x
-        self.rect.y = self.y
+        # Dark energy ball with pulsing effect
+        pulse = int(abs(math.sin(self.animation_frame * 0.2)) * 3)
+        sprite, offset = get_projectile_sprite(self.size, pulse)
+        return surface.blit(sprite, (int(self.x + self.size // 2) - offset, int(self.y + self.size // 2) - offset))
+
+class Coin(game_engine.Coin):
+    __slots__ = ()
     
     def draw(self, surface):
-        # Create coin surface
-        coin_surface = pygame.Surface((self.size, self.size), pygame.SRCALPHA)
-        
-        # Calculate 3D rotation effect (oval width based on rotation)
-        rotation_factor = abs(math.cos(math.radians(self.rotation)))
-        oval_width = int(self.size * rotation_factor)
-        
-        if oval_width > 2:  # Only draw if visible
-            # Outer gold ring
-            pygame.draw.ellipse(coin_surface, (255, 215, 0), 
-                              (self.size//2 - oval_width//2, 2, oval_width, self.size - 4))
-            # Inner darker gold
-            if oval_width > 6:
-                pygame.draw.ellipse(coin_surface, (218, 165, 32), 
-                                  (self.size//2 - oval_width//2 + 3, 5, oval_width - 6, self.size - 10))
-            # Highlight
-            if oval_width > 10:
-                pygame.draw.ellipse(coin_surface, (255, 255, 200), 
-                                  (self.size//2 - oval_width//2 + 4, 6, oval_width//2, self.size//4))
-        
-        surface.blit(coin_surface, (self.x, self.y))
-    
-    def collides_with(self, player):
-        player_rect = pygame.Rect(player.x + 10, player.y + 10, player.size - 20, player.size - 20)
-        coin_rect = pygame.Rect(self.x + 5, self.y + 5, self.size - 10, self.size - 10)
-        return player_rect.colliderect(coin_rect)
-    
-    def is_off_screen(self):
-        return self.x + self.size < 0
-
-class Game:
-    def __init__(self):
-        self.player = Player()
-        self.walls = []
-        self.enemies = []
-        self.coins = []
-        self.projectiles = []
-        self.score = 0
-        self.coins_collected = 0
+        frame = get_coin_frames(self.size)[self.rotation]
+        if frame is None:  # Edge-on coins are invisible
+            return pygame.Rect(self.x, self.y, 0, 0)
+        return surface.blit(frame, (self.x, self.y))
+
+class Game(game_engine.Engine):
+    player_class = Player
+    wall_class = Wall
+    enemy_class = Enemy
+    projectile_class = Projectile
+    coin_class = Coin
+
+    def __init__(self, record_dir=None, dirty_rects=False, profile=False, trace_file=None):
+        super().__init__()
         self.high_score = load_high_score()
-        self.current_level = 0
-        self.level_config = levels[self.current_level]
-        self.game_state = 'menu'  # menu, playing, game_over
-        self.last_wall_spawn = 0
-        self.last_enemy_spawn = 0
-        self.last_coin_spawn = 0
-        self.frame_count = 0
         self.clock = pygame.time.Clock()
-        
-    def start_game(self):
-        self.player.reset()
-        self.walls = []
-        self.enemies = []
-        self.coins = []
-        self.projectiles = []
-        self.score = 0
-        self.coins_collected = 0
-        self.current_level = 0
-        self.level_config = levels[self.current_level]
-        self.game_state = 'playing'
-        self.last_wall_spawn = pygame.time.get_ticks()
-        self.last_enemy_spawn = pygame.time.get_ticks()
-        self.last_coin_spawn = pygame.time.get_ticks()
-        self.frame_count = 0
+        self.record_dir = record_dir
+        self.dirty_rects = dirty_rects
+        # Rects drawn last frame in dirty-rect mode; None forces a full redraw
+        self.last_drawn = None
+        # What the static menu/game over screen on display shows, if any
+        self.static_screen = None
+        self.profiler = FrameProfiler(PROFILE_PHASES, PROFILE_COUNTERS)
+        self.profiler.enable(profile)
+        self.profile_overlay = None
+        self.trace_file = trace_file
+        # Sounds and sprites the menu doesn't need load while it's showing
+        assets.preload(images=[PLAYER_IMAGE, ENEMY_IMAGE],
+                       sounds=[FLAP_SOUND, ENEMY_SOUND, GAMEOVER_SOUND], music=MUSIC)
+        
+    def start_game(self, seed=None, level=0):
+        super().start_game(seed, level)
         try:
             mixer.music.play(-1)
         except:
             pass
     
-    def check_level_up(self):
-        if self.current_level < len(levels) - 1:
-            next_level = levels[self.current_level + 1]
-            if self.score >= next_level['required_score']:
-                self.current_level += 1
-                self.level_config = levels[self.current_level]
+    def on_event(self, event):
+        if event == 'flap' or event == 'coin':  # Use flap sound for coin collection
+            play_sound(FLAP_SOUND)
+        elif event == 'shoot' or event == 'enemy_hit':
+            play_sound(ENEMY_SOUND)
+        elif event == 'game_over':
+            if self.score > self.high_score:
+                self.high_score = self.score
+                save_high_score(self.high_score)
+            try:
+                mixer.music.stop()
+            except:
+                pass
+            play_sound(GAMEOVER_SOUND)
+            if self.record_dir:
+                self.save_replay()
     
-    def spawn_wall(self):
-        gap_height = self.level_config['wall_gap']
-        min_gap_y = 100
-        max_gap_y = SCREEN_HEIGHT - gap_height - 100
-        gap_y = random.randint(min_gap_y, max_gap_y)
-        wall = Wall(SCREEN_WIDTH, gap_y, gap_height, self.level_config['wall_speed'])
-        self.walls.append(wall)
+    def update(self):
+        if not self.profiler.enabled or self.game_state != 'playing':
+            return super().update()
+        # Time each of the engine's phases
+        self.profiler.skip()
+        super().update(self.profiler.mark)
     
-    def spawn_enemy(self):
-        enemy = Enemy(self.level_config)
-        self.enemies.append(enemy)
+    def toggle_profiler(self):
+        self.profiler.enable(not self.profiler.enabled)
+        self.profile_overlay = None
+        self.static_screen = None
+        self.last_drawn = None
     
-    def spawn_coin(self):
-        coin = Coin(self.level_config)
-        self.coins.append(coin)
+    def export_trace(self, path=None):
+        path = path or f'frame-trace-{time.strftime("%Y%m%d-%H%M%S")}.json'
+        events = self.profiler.export_trace(path)
+        print(f'Wrote {events} trace events to {path} (open in chrome://tracing or ui.perfetto.dev)')
     
-    def update(self):
-        if self.game_state != 'playing':
+    def reload_config(self):
+        # Lets designers tune levels.json without restarting the game
+        if self.record_dir and self.game_state == 'playing':
+            # New rules partway through would make the saved replay fail to
+            # verify; the change is picked up once this run is over
             return
-        
-        self.frame_count += 1
-        current_time = pygame.time.get_ticks()
-        
-        # Spawn walls
-        if current_time - self.last_wall_spawn > self.level_config['wall_spawn_interval']:
-            self.spawn_wall()
-            self.last_wall_spawn = current_time
-        
-        # Spawn enemies
-        if current_time - self.last_enemy_spawn > self.level_config['enemy_spawn_interval']:
-            self.spawn_enemy()
-            self.last_enemy_spawn = current_time
-        
-        # Spawn coins
-        if current_time - self.last_coin_spawn > self.level_config['coin_spawn_interval']:
-            self.spawn_coin()
-            self.last_coin_spawn = current_time
-        
-        # Update player
-        self.player.update()
-        
-        # Update walls
-        for wall in self.walls[:]:
-            wall.update()
-            
-            # Check if player passed the wall
-            if not wall.passed and wall.x + wall.width < self.player.x:
-                wall.passed = True
-                self.score += game_settings['score_per_wall']
-                self.check_level_up()
-            
-            # Check collision
-            if wall.collides_with(self.player):
-                self.game_over()
-            
-            # Remove off-screen walls
-            if wall.is_off_screen():
-                self.walls.remove(wall)
-        
-        # Update enemies
-        for enemy in self.enemies[:]:
-            enemy.update(self.frame_count)
-            
-            # Check if enemy should shoot
-            if enemy.can_shoot(current_time, self.player):
-                projectile = enemy.shoot(self.player)
-                self.projectiles.append(projectile)
-                if enemy_sound:
-                    enemy_sound.play()
-            
-            # Check collision
-            if enemy.collides_with(self.player):
-                if enemy_sound:
-                    enemy_sound.play()
-                self.enemies.remove(enemy)
-                self.score += game_settings['score_per_enemy']
-                self.check_level_up()
-            
-            # Remove off-screen enemies
-            if enemy.is_off_screen():
-                self.enemies.remove(enemy)
-        
-        # Update projectiles
-        for projectile in self.projectiles[:]:
-            projectile.update()
-            
-            # Check collision with player
-            if projectile.collides_with(self.player):
-                self.game_over()
-            
-            # Remove off-screen projectiles
-            if projectile.is_off_screen():
-                self.projectiles.remove(projectile)
-        
-        # Update coins
-        for coin in self.coins[:]:
-            coin.update(self.frame_count)
-            
-            # Check collision
-            if coin.collides_with(self.player):
-                if flap_sound:  # Use flap sound for coin collection
-                    flap_sound.play()
-                self.coins.remove(coin)
-                self.coins_collected += 1
-                self.score += game_settings['score_per_coin']
-                self.check_level_up()
-            
-            # Remove off-screen coins
-            if coin.is_off_screen():
-                self.coins.remove(coin)
-    
-    def game_over(self):
-        self.game_state = 'game_over'
-        if self.score > self.high_score:
-            self.high_score = self.score
-            save_high_score(self.high_score)
         try:
-            mixer.music.stop()
-        except:
-            pass
-        if gameover_sound:
-            gameover_sound.play()
+            if game_engine.reload_config():
+                self.apply_config()
+                print('Reloaded levels.json')
+        except game_engine.ConfigError as e:
+            print(f'Not reloading levels.json: {e}', file=sys.stderr)
+    
+    def save_replay(self):
+        os.makedirs(self.record_dir, exist_ok=True)
+        path = os.path.join(self.record_dir, f'{self.seed}.fbr')
+        Replay.from_engine(self).save(path)
     
     def draw(self):
+        if self.game_state == 'playing':
+            self.static_screen = None
+            if self.dirty_rects:
+                self.draw_dirty()
+                return
+        else:
+            # Menu and game over screens don't move: composite them once and
+            # leave the display alone until what they show changes
+            static_screen = (self.game_state, self.score, self.high_score)
+            if static_screen == self.static_screen:
+                return
+            self.static_screen = static_screen
+        
         # Draw blurred background
-        screen.blit(background, (0, 0))
-        screen.blit(blurred_bg, (0, 0))
+        screen.blit(get_backdrop(), (0, 0))
+        self.profiler.mark('draw.backdrop')
         
         if self.game_state == 'menu':
             self.draw_menu()
         elif self.game_state == 'playing':
             self.draw_game()
+            self.draw_profile()
         elif self.game_state == 'game_over':
             self.draw_game()
             self.draw_game_over()
         
         pygame.display.flip()
+        self.profiler.mark('draw.flip')
+        self.last_drawn = None
+    
+    def draw_dirty(self):
+        # Erase last frame's sprites and HUD, draw this frame's, and push
+        # only the changed rects to the display
+        erased = self.last_drawn
+        if erased is None:
+            screen.blit(get_backdrop(), (0, 0))
+        else:
+            backdrop = get_backdrop()
+            for rect in erased:
+                screen.blit(backdrop, rect, rect)
+        self.profiler.mark('draw.backdrop')
+        drawn = self.draw_game()
+        overlay_rect = self.draw_profile()
+        if overlay_rect is not None:
+            drawn.append(overlay_rect)
+        self.last_drawn = drawn
+        
+        if erased is None:
+            pygame.display.flip()
+        else:
+            dirty = merge_dirty_rects(erased + drawn)
+            dirty_area = sum(rect.width * rect.height for rect in dirty)
+            if dirty_area > DIRTY_FULL_FLIP_FRACTION * SCREEN_WIDTH * SCREEN_HEIGHT:
+                pygame.display.flip()
+            else:
+                pygame.display.update(dirty)
+        self.profiler.mark('draw.flip')
     
     def draw_menu(self):
         # Title
-        title = font_large.render('FLAPPY BIRD', True, WHITE)
+        title = render_text(FONT_LARGE, 'FLAPPY BIRD', WHITE)
         title_rect = title.get_rect(center=(SCREEN_WIDTH // 2, 150))
-        title_shadow = font_large.render('FLAPPY BIRD', True, BLACK)
+        title_shadow = render_text(FONT_LARGE, 'FLAPPY BIRD', BLACK)
         screen.blit(title_shadow, (title_rect.x + 3, title_rect.y + 3))
         screen.blit(title, title_rect)
         
-        subtitle = font_small.render('City Edition', True, WHITE)
+        subtitle = render_text(FONT_SMALL, 'City Edition', WHITE)
         subtitle_rect = subtitle.get_rect(center=(SCREEN_WIDTH // 2, 210))
         screen.blit(subtitle, subtitle_rect)
         
         # High Score
-        high_score_text = font_medium.render(f'High Score: {self.high_score}', True, WHITE)
+        high_score_text = render_text(FONT_MEDIUM, f'High Score: {self.high_score}', WHITE)
         high_score_rect = high_score_text.get_rect(center=(SCREEN_WIDTH // 2, 300))
         screen.blit(high_score_text, high_score_rect)
         
@@ -551,77 +574,121 @@ class Game:
         pygame.draw.rect(screen, (100, 200, 100), button_rect, border_radius=10)
         pygame.draw.rect(screen, WHITE, button_rect, 3, border_radius=10)
         
-        start_text = font_medium.render('START', True, WHITE)
+        start_text = render_text(FONT_MEDIUM, 'START', WHITE)
         start_rect = start_text.get_rect(center=button_rect.center)
         screen.blit(start_text, start_rect)
         
         # Instructions
-        inst1 = font_small.render('Press SPACE or LEFT CLICK to flap', True, WHITE)
-        inst2 = font_small.render('Dodge projectiles! Catch enemies and collect coins!', True, WHITE)
+        inst1 = render_text(FONT_SMALL, 'Press SPACE or LEFT CLICK to flap', WHITE)
+        inst2 = render_text(FONT_SMALL, 'Dodge projectiles! Catch enemies and collect coins!', WHITE)
         screen.blit(inst1, inst1.get_rect(center=(SCREEN_WIDTH // 2, 480)))
         screen.blit(inst2, inst2.get_rect(center=(SCREEN_WIDTH // 2, 520)))
         
         return button_rect
     
     def draw_game(self):
+        """Draw entities and HUD; returns the screen rects that were drawn."""
+        drawn = []
+        mark = self.profiler.mark
+        
         # Draw walls
         for wall in self.walls:
-            wall.draw(screen)
+            drawn.append(wall.draw(screen))
+        mark('draw.walls')
         
         # Draw coins
         for coin in self.coins:
-            coin.draw(screen)
+            drawn.append(coin.draw(screen))
+        mark('draw.coins')
         
         # Draw projectiles
         for projectile in self.projectiles:
-            projectile.draw(screen)
+            drawn.append(projectile.draw(screen))
+        mark('draw.projectiles')
         
         # Draw enemies
         for enemy in self.enemies:
-            enemy.draw(screen)
+            drawn.append(enemy.draw(screen))
+        mark('draw.enemies')
         
         # Draw player
-        self.player.draw(screen)
+        drawn.append(self.player.draw(screen))
+        mark('draw.player')
         
         # Draw HUD
-        score_text = font_medium.render(f'Score: {self.score}', True, WHITE)
-        screen.blit(score_text, (10, 10))
+        score_text = render_text(FONT_MEDIUM, f'Score: {self.score}', WHITE)
+        drawn.append(screen.blit(score_text, (10, 10)))
         
-        level_text = font_small.render(f'Level: {self.level_config["name"]}', True, WHITE)
-        screen.blit(level_text, (10, 60))
+        level_text = render_text(FONT_SMALL, f'Level: {self.level_config.name}', WHITE)
+        drawn.append(screen.blit(level_text, (10, 60)))
         
         # Coin counter with icon
-        coin_text = font_small.render(f'Coins: {self.coins_collected}', True, (255, 215, 0))
-        screen.blit(coin_text, (10, 100))
+        coin_text = render_text(FONT_SMALL, f'Coins: {self.coins_collected}', (255, 215, 0))
+        drawn.append(screen.blit(coin_text, (10, 100)))
         
-        high_score_text = font_small.render(f'High: {self.high_score}', True, WHITE)
+        high_score_text = render_text(FONT_SMALL, f'High: {self.high_score}', WHITE)
         high_score_rect = high_score_text.get_rect(topright=(SCREEN_WIDTH - 10, 10))
-        screen.blit(high_score_text, high_score_rect)
+        drawn.append(screen.blit(high_score_text, high_score_rect))
+        mark('draw.hud')
+        
+        return drawn
+    
+    def draw_profile(self):
+        """Draw the profiler overlay if profiling; returns its rect."""
+        profiler = self.profiler
+        if not profiler.enabled:
+            return None
+        profiler.count('walls', len(self.walls))
+        profiler.count('enemies', len(self.enemies))
+        profiler.count('projectiles', len(self.projectiles))
+        profiler.count('coins', len(self.coins))
+        # Text is slow to render, so the numbers only change a few times a second
+        if self.profile_overlay is None or profiler.frames % PROFILE_OVERLAY_REFRESH == 0:
+            self.profile_overlay = self.render_profile()
+        rect = screen.blit(self.profile_overlay,
+                           self.profile_overlay.get_rect(bottomright=(SCREEN_WIDTH - 10, SCREEN_HEIGHT - 10)))
+        profiler.mark('draw.overlay')
+        return rect
+    
+    def render_profile(self):
+        stats, counts = self.profiler.summary()
+        font = get_font(PROFILE_FONT)
+        lines = [f'{"phase":18}{"p50":>7}{"p99":>7}{"max":>7}  ms']
+        for phase in PROFILE_PHASES + ('frame',):
+            if phase in stats:
+                p50, p99, peak = stats[phase]
+                lines.append(f'{phase:18}{p50 * 1000:7.2f}{p99 * 1000:7.2f}{peak * 1000:7.2f}')
+        lines.append('  '.join(f'{name} {value}' for name, value in counts.items()))
+        line_height = font.get_linesize()
+        width = max(font.size(line)[0] for line in lines) + 12
+        overlay = pygame.Surface((width, line_height * len(lines) + 8))
+        overlay.fill(BLACK)
+        for i, line in enumerate(lines):
+            overlay.blit(font.render(line, True, WHITE, BLACK), (6, 4 + i * line_height))
+        overlay.set_alpha(200)
+        return overlay.convert()
     
     def draw_game_over(self):
         # Semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(150)
-        overlay.fill(BLACK)
-        screen.blit(overlay, (0, 0))
+        screen.blit(game_over_overlay, (0, 0))
         
         # Game Over text
-        game_over_text = font_large.render('GAME OVER', True, (255, 100, 100))
+        game_over_text = render_text(FONT_LARGE, 'GAME OVER', (255, 100, 100))
         game_over_rect = game_over_text.get_rect(center=(SCREEN_WIDTH // 2, 200))
         screen.blit(game_over_text, game_over_rect)
         
         # Final score
-        score_text = font_medium.render(f'Final Score: {self.score}', True, WHITE)
+        score_text = render_text(FONT_MEDIUM, f'Final Score: {self.score}', WHITE)
         score_rect = score_text.get_rect(center=(SCREEN_WIDTH // 2, 280))
         screen.blit(score_text, score_rect)
         
         # High score
         if self.score == self.high_score and self.score > 0:
-            new_high = font_small.render('NEW HIGH SCORE!', True, (255, 215, 0))
+            new_high = render_text(FONT_SMALL, 'NEW HIGH SCORE!', (255, 215, 0))
             new_high_rect = new_high.get_rect(center=(SCREEN_WIDTH // 2, 330))
             screen.blit(new_high, new_high_rect)
         else:
-            high_text = font_small.render(f'High Score: {self.high_score}', True, WHITE)
+            high_text = render_text(FONT_SMALL, f'High Score: {self.high_score}', WHITE)
             high_rect = high_text.get_rect(center=(SCREEN_WIDTH // 2, 330))
             screen.blit(high_text, high_rect)
         
@@ -630,7 +697,7 @@ class Game:
         pygame.draw.rect(screen, (100, 200, 100), button_rect, border_radius=10)
         pygame.draw.rect(screen, WHITE, button_rect, 3, border_radius=10)
         
-        restart_text = font_medium.render('RESTART', True, WHITE)
+        restart_text = render_text(FONT_MEDIUM, 'RESTART', WHITE)
         restart_rect = restart_text.get_rect(center=button_rect.center)
         screen.blit(restart_text, restart_rect)
         
@@ -639,7 +706,7 @@ class Game:
         pygame.draw.rect(screen, (200, 100, 100), menu_button_rect, border_radius=10)
         pygame.draw.rect(screen, WHITE, menu_button_rect, 3, border_radius=10)
         
-        menu_text = font_medium.render('MENU', True, WHITE)
+        menu_text = render_text(FONT_MEDIUM, 'MENU', WHITE)
         menu_rect = menu_text.get_rect(center=menu_button_rect.center)
         screen.blit(menu_text, menu_rect)
         
@@ -651,7 +718,7 @@ class Game:
             if button_rect.collidepoint(pos):
                 self.start_game()
         elif self.game_state == 'playing':
-            self.player.flap()
+            self.flap()
         elif self.game_state == 'game_over':
             restart_rect = pygame.Rect(SCREEN_WIDTH // 2 - 100, 400, 200, 60)
             menu_rect = pygame.Rect(SCREEN_WIDTH // 2 - 100, 480, 200, 60)
@@ -661,29 +728,65 @@ class Game:
                 self.game_state = 'menu'
     
     def run(self):
+        # Fixed timestep: the simulation always advances in 1/60 s frames,
+        # however fast or slow frames are actually drawn.
+        accumulator = 0.0
+        since_config_check = 0
         running = True
+        profiler = self.profiler
         while running:
+            profiler.begin_frame()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    self.static_screen = None  # Window contents were lost
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == 1:  # Left click
                         self.handle_click(event.pos)
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_SPACE:
                         if self.game_state == 'playing':
-                            self.player.flap()
+                            self.flap()
                         elif self.game_state == 'menu':
                             self.start_game()
+                    elif event.key == pygame.K_F3:
+                        self.toggle_profiler()
+                    elif event.key == pygame.K_F4 and profiler.enabled:
+                        self.export_trace()
+            profiler.mark('events')
             
-            self.update()
+            elapsed = self.clock.tick(FPS)
+            profiler.mark('idle')
+            since_config_check += elapsed
+            if since_config_check >= CONFIG_CHECK_MS:
+                since_config_check = 0
+                self.reload_config()
+            profiler.mark('events')
+            accumulator = min(accumulator + elapsed, FRAME_MS * 5)
+            while accumulator >= FRAME_MS:
+                self.update()
+                accumulator -= FRAME_MS
             self.draw()
-            self.clock.tick(60)
         
+        if self.trace_file and profiler.enabled:
+            self.export_trace(self.trace_file)
         pygame.quit()
         sys.exit()
 
 if __name__ == '__main__':
-    game = Game()
+    import argparse
+    parser = argparse.ArgumentParser(description='Flappy Bird - City Edition')
+    parser.add_argument('--record', metavar='DIR',
+                        help='save a replay of every finished run into DIR')
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help='only push changed screen areas to the display while playing')
+    parser.add_argument('--profile', action='store_true',
+                        help='time each update and draw phase and show them on screen (F3 toggles)')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='profile, and write the last frames as a Chrome trace to FILE on exit')
+    args = parser.parse_args()
+    game = Game(record_dir=args.record, dirty_rects=args.dirty_rects,
+                profile=args.profile or bool(args.trace), trace_file=args.trace)
     game.run()
 
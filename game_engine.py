@@ -0,0 +1,840 @@
+"""Display-free game rules for Flappy Bird - City Edition.
+
+Everything in here runs without pygame: no window, no audio and no wall
+clock. The simulation advances in fixed 1/60 s steps and every timer
+(spawns, enemy shots) counts frames, so a game is fully determined by its
+RNG seed and the frames on which the player flapped. The same rules drive
+the desktop game (flappy_bird.py), headless tools that step thousands of
+games per second, and replays (replay.py).
+"""
+import json
+import math
+import os
+import random
+from collections import namedtuple
+
+CONFIG_FILE = 'levels.json'
+
+# Fixed simulation rate; levels.json intervals are given in milliseconds
+FPS = 60
+FRAME_MS = 1000 / FPS
+
+
+def ms_to_frames(ms):
+    """Convert a levels.json interval in milliseconds to whole frames."""
+    return int(ms) * FPS // 1000
+
+
+# levels.json is compiled into immutable tables: attribute access instead of
+# string-keyed dict lookups in the hot loop, with values derived from the raw
+# settings (spawn timers in frames, wall gap bounds) computed once up front.
+
+class ConfigError(ValueError):
+    pass
+
+
+SETTINGS_FIELDS = ('screen_width', 'screen_height', 'gravity', 'flap_strength', 'player_size',
+                   'enemy_size', 'coin_size', 'projectile_size', 'wall_width', 'score_per_wall',
+                   'score_per_enemy', 'score_per_coin')
+# Sprites and the window are built at these sizes, so they can't be hot reloaded
+RESTART_FIELDS = ('screen_width', 'screen_height', 'player_size', 'enemy_size', 'coin_size',
+                  'projectile_size', 'wall_width')
+# Broadphase column width; must be at least as wide as any entity in a grid
+GRID_CELL_WIDTH = 64
+GRID_FIELDS = ('enemy_size', 'coin_size', 'projectile_size')
+LEVEL_FIELDS = ('level', 'name', 'wall_speed', 'wall_spawn_interval', 'enemy_speed',
+                'enemy_spawn_interval', 'enemy_shoot_interval', 'projectile_speed', 'coin_speed',
+                'coin_spawn_interval', 'wall_gap', 'required_score')
+# Walls keep this much building above and below the gap
+WALL_MARGIN = 100
+
+Settings = namedtuple('Settings', SETTINGS_FIELDS)
+Level = namedtuple('Level', LEVEL_FIELDS + (
+    'wall_spawn_frames', 'enemy_spawn_frames', 'enemy_shoot_frames', 'coin_spawn_frames',
+    'min_gap_y', 'max_gap_y',
+    'next_required',  # score that moves the player on to the next level, None on the last
+))
+
+
+def _number(raw, field, where):
+    if field not in raw:
+        raise ConfigError(f'{where}: missing "{field}"')
+    value = raw[field]
+    if (isinstance(value, bool) or not isinstance(value, (int, float))
+            or not math.isfinite(value)):
+        raise ConfigError(f'{where}: "{field}" must be a number, not {value!r}')
+    return value
+
+
+def compile_settings(raw):
+    settings = Settings(*(_number(raw, field, 'game_settings') for field in SETTINGS_FIELDS))
+    for field in RESTART_FIELDS:
+        if getattr(settings, field) <= 0:
+            raise ConfigError(f'game_settings: "{field}" must be positive')
+    for field in GRID_FIELDS:
+        if getattr(settings, field) > GRID_CELL_WIDTH:
+            # Collision checks would miss the player against wider entities
+            raise ConfigError(f'game_settings: "{field}" must be at most {GRID_CELL_WIDTH}')
+    return settings
+
+
+def compile_level(raw, screen_height, next_required=None):
+    if not isinstance(raw, dict):
+        raise ConfigError(f'levels must be objects, not {raw!r}')
+    where = f'level {raw.get("name", "?")!r}'
+    values = {field: _number(raw, field, where) for field in LEVEL_FIELDS if field != 'name'}
+    for field in ('wall_spawn_interval', 'enemy_spawn_interval', 'enemy_shoot_interval',
+                  'coin_spawn_interval'):
+        if values[field] <= 0:
+            raise ConfigError(f'{where}: "{field}" must be positive')
+    gap = values['wall_gap']
+    if not isinstance(gap, int) or gap <= 0 or screen_height - gap - WALL_MARGIN < WALL_MARGIN:
+        raise ConfigError(f'{where}: "wall_gap" must be a whole number that leaves '
+                          f'{WALL_MARGIN}px above and below it')
+    return Level(
+        name=str(raw.get('name', '')),
+        wall_spawn_frames=ms_to_frames(values['wall_spawn_interval']),
+        enemy_spawn_frames=ms_to_frames(values['enemy_spawn_interval']),
+        enemy_shoot_frames=ms_to_frames(values['enemy_shoot_interval']),
+        coin_spawn_frames=ms_to_frames(values['coin_spawn_interval']),
+        min_gap_y=WALL_MARGIN,
+        max_gap_y=screen_height - gap - WALL_MARGIN,
+        next_required=next_required,
+        **values,
+    )
+
+
+def override_level(level, overrides):
+    """Recompile a compiled Level with some levels.json fields replaced."""
+    raw = {field: getattr(level, field) for field in LEVEL_FIELDS}
+    raw.update(overrides)
+    return compile_level(raw, game_settings.screen_height, level.next_required)
+
+
+def compile_config(config):
+    """Validate a parsed levels.json; returns (Settings, tuple of Levels)."""
+    try:
+        raw_settings = config['game_settings']
+        raw_levels = config['levels']
+    except (KeyError, TypeError):
+        raise ConfigError('expected "game_settings" and "levels"') from None
+    if not isinstance(raw_levels, list) or not raw_levels:
+        raise ConfigError('"levels" must be a non-empty list')
+    settings = compile_settings(raw_settings)
+    compiled = [compile_level(raw, settings.screen_height) for raw in raw_levels]
+    for i in range(len(compiled) - 1):
+        required = compiled[i + 1].required_score
+        if required < compiled[i].required_score:
+            raise ConfigError(f'level {compiled[i + 1].name!r}: "required_score" is lower than '
+                              f'the level before it')
+        compiled[i] = compiled[i]._replace(next_required=required)
+    return settings, tuple(compiled)
+
+
+def load_config(path=CONFIG_FILE):
+    try:
+        with open(path, 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigError(f'{path}: {e}') from None
+    return compile_config(config)
+
+
+# Load configuration
+game_settings, levels = load_config()
+config_mtime = os.stat(CONFIG_FILE).st_mtime_ns
+
+SCREEN_WIDTH = game_settings.screen_width
+SCREEN_HEIGHT = game_settings.screen_height
+
+
+def reload_config():
+    """Install levels.json again if it changed on disk since it was loaded.
+
+    Returns True if new tables were installed. Running engines pick them up
+    through Engine.apply_config(). A file that doesn't parse or validate, or
+    changes a size that needs a restart, raises ConfigError and leaves the
+    current tables in place until the file changes again.
+    """
+    global game_settings, levels, config_mtime
+    try:
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+    except OSError as e:
+        raise ConfigError(f'{CONFIG_FILE}: {e}') from None
+    if mtime == config_mtime:
+        return False
+    config_mtime = mtime
+    settings, new_levels = load_config()
+    for field in RESTART_FIELDS:
+        if getattr(settings, field) != getattr(game_settings, field):
+            raise ConfigError(f'{CONFIG_FILE}: changing "{field}" needs a restart')
+    game_settings, levels = settings, new_levels
+    return True
+
+
+BUILDING_COLORS = [
+    (100, 149, 237),  # Cornflower blue
+    (255, 127, 80),   # Coral
+    (144, 238, 144),  # Light green
+    (255, 218, 185),  # Peach
+    (221, 160, 221),  # Plum
+]
+
+
+# Collision boxes follow pygame.Rect: float coordinates are truncated toward
+# zero, and rects A and B collide when A.left < B.right, A.top < B.bottom,
+# A.right > B.left and A.bottom > B.top. The player's box is computed once
+# per frame as (left, top, right, bottom) and passed to each collides_with.
+
+def player_hitbox(player):
+    left = int(player.x + 10)
+    top = int(player.y + 10)
+    inner = player.size - 20
+    return left, top, left + inner, top + inner
+
+
+class ColumnGrid:
+    """Uniform-grid broadphase over x.
+
+    Entities are bucketed by the GRID_CELL_WIDTH-wide column their left edge
+    is in, and re-bucketed by move() only when they cross into another
+    column. No entity is wider than a column, so query(left, right) only
+    has to look at the columns from one to the left of `left` up to the
+    one containing `right`. Entities need a `cell` slot.
+    """
+    __slots__ = ('cells',)
+
+    def __init__(self):
+        self.cells = {}
+
+    def insert(self, entity):
+        cell = entity.cell = int(entity.x) // GRID_CELL_WIDTH
+        bucket = self.cells.get(cell)
+        if bucket is None:
+            self.cells[cell] = [entity]
+        else:
+            bucket.append(entity)
+
+    def move(self, entity):
+        if int(entity.x) // GRID_CELL_WIDTH != entity.cell:
+            self.remove(entity)
+            self.insert(entity)
+
+    def remove(self, entity):
+        self.cells[entity.cell].remove(entity)
+
+    def clear(self):
+        self.cells.clear()
+
+    def query(self, left, right):
+        """Entities that may overlap the x-range [left, right)."""
+        candidates = []
+        cells = self.cells
+        for cell in range(left // GRID_CELL_WIDTH - 1, (right - 1) // GRID_CELL_WIDTH + 1):
+            bucket = cells.get(cell)
+            if bucket:
+                candidates.extend(bucket)
+        return candidates
+
+
+class Player:
+    __slots__ = ('x', 'y', 'velocity', 'size', 'angle', 'started')
+
+    def __init__(self):
+        self.x = 150
+        self.y = SCREEN_HEIGHT // 2
+        self.velocity = 0
+        self.size = game_settings.player_size
+        self.angle = 0
+        self.started = False
+
+    def flap(self):
+        self.velocity = game_settings.flap_strength
+        self.started = True
+
+    def update(self):
+        if self.started:
+            self.velocity += game_settings.gravity
+            self.y += self.velocity
+
+        # Update angle based on velocity
+        self.angle = max(-30, min(30, -self.velocity * 3))
+
+        # Keep player on screen
+        if self.y < 0:
+            self.y = 0
+            self.velocity = 0
+        if self.y > SCREEN_HEIGHT - self.size:
+            self.y = SCREEN_HEIGHT - self.size
+            self.velocity = 0
+
+    def reset(self):
+        self.y = SCREEN_HEIGHT // 2
+        self.velocity = 0
+        self.started = False
+
+
+class Wall:
+    __slots__ = ('x', 'gap_y', 'gap_height', 'width', 'speed', 'passed', 'color')
+
+    def __init__(self, x, gap_y, gap_height, speed, color):
+        self.x = x
+        self.gap_y = gap_y
+        self.gap_height = gap_height
+        self.width = game_settings.wall_width
+        self.speed = speed
+        self.passed = False
+        self.color = color
+
+    def update(self):
+        self.x -= self.speed
+
+    def collides_with(self, hitbox):
+        left, top, right, bottom = hitbox
+        x = int(self.x)
+        if left >= x + self.width or right <= x:
+            return False
+        # Top building spans [0, gap_y), bottom one starts below the gap
+        return top < self.gap_y or bottom > self.gap_y + self.gap_height
+
+    def is_off_screen(self):
+        return self.x + self.width < 0
+
+
+class Enemy:
+    __slots__ = ('x', 'y', 'size', 'speed', 'wave_offset', 'wave_amplitude', 'wave_frequency',
+                 'original_y', 'last_shot_frame', 'shoot_interval', 'projectile_speed', 'cell')
+
+    def __init__(self, level_config, rng, frame):
+        self.x = SCREEN_WIDTH + 50
+        self.y = rng.randint(100, SCREEN_HEIGHT - 100)
+        self.size = game_settings.enemy_size
+        self.speed = level_config.enemy_speed
+        self.wave_offset = rng.random() * 10
+        self.wave_amplitude = 30
+        self.wave_frequency = 0.05
+        self.original_y = self.y
+        self.last_shot_frame = frame
+        self.shoot_interval = level_config.enemy_shoot_frames
+        self.projectile_speed = level_config.projectile_speed
+
+    def update(self, frame_count):
+        self.x -= self.speed
+        # Flying motion - sine wave
+        self.y = self.original_y + self.wave_amplitude * math.sin(
+            (frame_count + self.wave_offset) * self.wave_frequency
+        )
+
+    def can_shoot(self, frame, player):
+        # Only shoot if enemy is on screen and player is visible
+        if self.x > SCREEN_WIDTH or self.x < -self.size:
+            return False
+        if frame - self.last_shot_frame > self.shoot_interval:
+            # Only shoot if player is somewhat in front (to the left)
+            if self.x > player.x:
+                return True
+        return False
+
+    def shoot(self, player, new_projectile, frame):
+        self.last_shot_frame = frame
+        # Create projectile from enemy center toward player center
+        start_x = self.x + self.size // 2
+        start_y = self.y + self.size // 2
+        target_x = player.x + player.size // 2
+        target_y = player.y + player.size // 2
+        return new_projectile(start_x, start_y, target_x, target_y, self.projectile_speed)
+
+    def collides_with(self, hitbox):
+        left, top, right, bottom = hitbox
+        x = int(self.x + 10)
+        y = int(self.y + 10)
+        inner = self.size - 20
+        return left < x + inner and top < y + inner and right > x and bottom > y
+
+    def is_off_screen(self):
+        return self.x + self.size < 0
+
+
+class Projectile:
+    __slots__ = ('x', 'y', 'size', 'speed', 'velocity_x', 'velocity_y', 'animation_frame', 'cell')
+
+    def __init__(self, start_x, start_y, target_x, target_y, speed):
+        self.x = start_x
+        self.y = start_y
+        self.size = game_settings.projectile_size
+        self.speed = speed
+
+        # Calculate direction vector
+        dx = target_x - start_x
+        dy = target_y - start_y
+        distance = math.sqrt(dx**2 + dy**2)
+
+        # Normalize and multiply by speed
+        if distance > 0:
+            self.velocity_x = (dx / distance) * speed
+            self.velocity_y = (dy / distance) * speed
+        else:
+            self.velocity_x = -speed
+            self.velocity_y = 0
+
+        self.animation_frame = 0
+
+    def update(self):
+        self.x += self.velocity_x
+        self.y += self.velocity_y
+        self.animation_frame += 1
+
+    def collides_with(self, hitbox):
+        left, top, right, bottom = hitbox
+        x = int(self.x)
+        y = int(self.y)
+        size = self.size
+        return left < x + size and top < y + size and right > x and bottom > y
+
+    def is_off_screen(self):
+        return (self.x < -self.size or self.x > SCREEN_WIDTH + self.size or
+                self.y < -self.size or self.y > SCREEN_HEIGHT + self.size)
+
+
+class Coin:
+    __slots__ = ('x', 'y', 'size', 'speed', 'rotation', 'rotation_speed', 'float_offset',
+                 'float_amplitude', 'float_frequency', 'original_y', 'cell')
+
+    def __init__(self, level_config, rng):
+        self.x = SCREEN_WIDTH + 50
+        self.y = rng.randint(100, SCREEN_HEIGHT - 100)
+        self.size = game_settings.coin_size
+        self.speed = level_config.coin_speed
+        self.rotation = 0
+        self.rotation_speed = 3
+        self.float_offset = rng.random() * 10
+        self.float_amplitude = 15
+        self.float_frequency = 0.08
+        self.original_y = self.y
+
+    def update(self, frame_count):
+        self.x -= self.speed
+        # Floating motion - slower sine wave
+        self.y = self.original_y + self.float_amplitude * math.sin(
+            (frame_count + self.float_offset) * self.float_frequency
+        )
+        # Rotation animation
+        self.rotation = (self.rotation + self.rotation_speed) % 360
+
+    def collides_with(self, hitbox):
+        left, top, right, bottom = hitbox
+        x = int(self.x + 5)
+        y = int(self.y + 5)
+        inner = self.size - 10
+        return left < x + inner and top < y + inner and right > x and bottom > y
+
+    def is_off_screen(self):
+        return self.x + self.size < 0
+
+
+def _no_mark(phase):
+    pass
+
+
+class Engine:
+    """One game's state and rules, stepped one fixed frame per update().
+
+    Each game draws from its own random.Random seeded in start_game(), and
+    flap() records the frame it happened on, so (seed, flap_frames) is
+    enough to replay a run exactly. Subclasses swap in drawable entities
+    through the *_class attributes and react to gameplay events (sounds,
+    high score) via on_event().
+    """
+    player_class = Player
+    wall_class = Wall
+    enemy_class = Enemy
+    projectile_class = Projectile
+    coin_class = Coin
+
+    def __init__(self, seed=None, level_table=None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # The levels this game plays; levels.json's unless a sweep overrides them
+        self.levels = levels if level_table is None else level_table
+        self.custom_levels = level_table is not None
+        self.flap_frames = []
+        self.player = self.player_class()
+        self.walls = []
+        self.enemies = []
+        self.coins = []
+        self.projectiles = []
+        # Free lists of removed entities, re-initialised on the next spawn
+        self.wall_pool = []
+        self.enemy_pool = []
+        self.coin_pool = []
+        self.projectile_pool = []
+        # Broadphase indexes for player-vs-entity collision
+        self.enemy_grid = ColumnGrid()
+        self.coin_grid = ColumnGrid()
+        self.projectile_grid = ColumnGrid()
+        self.score = 0
+        self.coins_collected = 0
+        self.current_level = 0
+        self.level_config = self.levels[self.current_level]
+        self.game_state = 'menu'  # menu, playing, game_over
+        self.last_wall_spawn = 0
+        self.last_enemy_spawn = 0
+        self.last_coin_spawn = 0
+        self.frame_count = 0
+
+    def on_event(self, event):
+        """Hook for 'flap', 'shoot', 'enemy_hit', 'coin' and 'game_over'."""
+
+    def start_game(self, seed=None, level=0):
+        """Start a game; `level` > 0 starts at a later level with the score it takes to get there."""
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.flap_frames = []
+        self.player.reset()
+        for entities, pool in ((self.walls, self.wall_pool), (self.enemies, self.enemy_pool),
+                               (self.coins, self.coin_pool),
+                               (self.projectiles, self.projectile_pool)):
+            pool.extend(entities)
+            entities.clear()
+        self.enemy_grid.clear()
+        self.coin_grid.clear()
+        self.projectile_grid.clear()
+        self.score = self.levels[level - 1].next_required if level else 0
+        self.coins_collected = 0
+        self.current_level = level
+        self.level_config = self.levels[self.current_level]
+        self.game_state = 'playing'
+        self.last_wall_spawn = 0
+        self.last_enemy_spawn = 0
+        self.last_coin_spawn = 0
+        self.frame_count = 0
+
+    def apply_config(self):
+        """Switch to the current level's entry in freshly reloaded tables.
+
+        Engines given their own level_table keep it.
+        """
+        if self.custom_levels:
+            return
+        self.levels = levels
+        self.current_level = min(self.current_level, len(levels) - 1)
+        self.level_config = levels[self.current_level]
+
+    def flap(self):
+        self.flap_frames.append(self.frame_count)
+        self.player.flap()
+        self.on_event('flap')
+
+    def check_level_up(self):
+        next_required = self.level_config.next_required
+        if next_required is not None and self.score >= next_required:
+            self.current_level += 1
+            self.level_config = self.levels[self.current_level]
+
+    def spawn_wall(self):
+        level = self.level_config
+        gap_y = self.rng.randint(level.min_gap_y, level.max_gap_y)
+        color = self.rng.choice(BUILDING_COLORS)
+        args = (SCREEN_WIDTH, gap_y, level.wall_gap, level.wall_speed, color)
+        if self.wall_pool:
+            wall = self.wall_pool.pop()
+            wall.__init__(*args)
+        else:
+            wall = self.wall_class(*args)
+        self.walls.append(wall)
+
+    def spawn_enemy(self):
+        args = (self.level_config, self.rng, self.frame_count)
+        if self.enemy_pool:
+            enemy = self.enemy_pool.pop()
+            enemy.__init__(*args)
+        else:
+            enemy = self.enemy_class(*args)
+        self.enemies.append(enemy)
+        self.enemy_grid.insert(enemy)
+
+    def spawn_coin(self):
+        args = (self.level_config, self.rng)
+        if self.coin_pool:
+            coin = self.coin_pool.pop()
+            coin.__init__(*args)
+        else:
+            coin = self.coin_class(*args)
+        self.coins.append(coin)
+        self.coin_grid.insert(coin)
+
+    def new_projectile(self, *args):
+        if self.projectile_pool:
+            projectile = self.projectile_pool.pop()
+            projectile.__init__(*args)
+            return projectile
+        return self.projectile_class(*args)
+
+    def update(self, mark=_no_mark):
+        """Advance the game by one fixed 1/60 s frame.
+
+        Each entity list is compacted in place as it is walked: survivors
+        are shifted down over removed entities, which go to the free list.
+        mark(phase) is called after each phase, so the desktop game's
+        profiler can time them.
+        """
+        if self.game_state != 'playing':
+            return
+
+        self.frame_count += 1
+        self.update_spawns()
+        mark('update.spawns')
+        hitbox = self.update_player()
+        mark('update.player')
+        self.update_walls(hitbox)
+        mark('update.walls')
+        self.update_enemies(hitbox)
+        mark('update.enemies')
+        self.update_projectiles(hitbox)
+        mark('update.projectiles')
+        self.update_coins(hitbox)
+        mark('update.coins')
+
+    def update_spawns(self):
+        frame = self.frame_count
+        level = self.level_config
+
+        # Spawn walls
+        if frame - self.last_wall_spawn > level.wall_spawn_frames:
+            self.spawn_wall()
+            self.last_wall_spawn = frame
+
+        # Spawn enemies
+        if frame - self.last_enemy_spawn > level.enemy_spawn_frames:
+            self.spawn_enemy()
+            self.last_enemy_spawn = frame
+
+        # Spawn coins
+        if frame - self.last_coin_spawn > level.coin_spawn_frames:
+            self.spawn_coin()
+            self.last_coin_spawn = frame
+
+    def update_player(self):
+        """Move the player; returns its hitbox for this frame's collision checks."""
+        player = self.player
+        player.update()
+        return player_hitbox(player)
+
+    def update_walls(self, hitbox):
+        player = self.player
+        walls = self.walls
+        kept = 0
+        for wall in walls:
+            wall.update()
+
+            # Check if player passed the wall
+            if not wall.passed and wall.x + wall.width < player.x:
+                wall.passed = True
+                self.score += game_settings.score_per_wall
+                self.check_level_up()
+
+            # Check collision
+            if wall.collides_with(hitbox):
+                self.game_over()
+
+            # Remove off-screen walls
+            if wall.is_off_screen():
+                self.wall_pool.append(wall)
+            else:
+                walls[kept] = wall
+                kept += 1
+        del walls[kept:]
+
+    def update_enemies(self, hitbox):
+        # Move every enemy, then run the narrow phase only on the ones the
+        # broadphase grid finds in the player's column. Projectiles and
+        # coins work the same way.
+        frame = self.frame_count
+        player = self.player
+        left, top, right, bottom = hitbox
+        enemies = self.enemies
+        enemy_grid = self.enemy_grid
+        kept = 0
+        for enemy in enemies:
+            enemy.update(frame)
+
+            # Check if enemy should shoot
+            if enemy.can_shoot(frame, player):
+                projectile = enemy.shoot(player, self.new_projectile, frame)
+                self.projectiles.append(projectile)
+                self.projectile_grid.insert(projectile)
+                self.on_event('shoot')
+
+            # Remove off-screen enemies
+            if enemy.is_off_screen():
+                enemy_grid.remove(enemy)
+                self.enemy_pool.append(enemy)
+            else:
+                enemy_grid.move(enemy)
+                enemies[kept] = enemy
+                kept += 1
+        del enemies[kept:]
+
+        for enemy in enemy_grid.query(left, right):
+            # Check collision
+            if enemy.collides_with(hitbox):
+                self.on_event('enemy_hit')
+                enemies.remove(enemy)
+                enemy_grid.remove(enemy)
+                self.enemy_pool.append(enemy)
+                self.score += game_settings.score_per_enemy
+                self.check_level_up()
+
+    def update_projectiles(self, hitbox):
+        left, top, right, bottom = hitbox
+        projectiles = self.projectiles
+        projectile_grid = self.projectile_grid
+        kept = 0
+        for projectile in projectiles:
+            projectile.update()
+
+            # Remove off-screen projectiles
+            if projectile.is_off_screen():
+                projectile_grid.remove(projectile)
+                self.projectile_pool.append(projectile)
+            else:
+                projectile_grid.move(projectile)
+                projectiles[kept] = projectile
+                kept += 1
+        del projectiles[kept:]
+
+        for projectile in projectile_grid.query(left, right):
+            # Check collision with player
+            if projectile.collides_with(hitbox):
+                self.game_over()
+
+    def update_coins(self, hitbox):
+        frame = self.frame_count
+        left, top, right, bottom = hitbox
+        coins = self.coins
+        coin_grid = self.coin_grid
+        kept = 0
+        for coin in coins:
+            coin.update(frame)
+
+            # Remove off-screen coins
+            if coin.is_off_screen():
+                coin_grid.remove(coin)
+                self.coin_pool.append(coin)
+            else:
+                coin_grid.move(coin)
+                coins[kept] = coin
+                kept += 1
+        del coins[kept:]
+
+        for coin in coin_grid.query(left, right):
+            # Check collision
+            if coin.collides_with(hitbox):
+                self.on_event('coin')
+                coins.remove(coin)
+                coin_grid.remove(coin)
+                self.coin_pool.append(coin)
+                self.coins_collected += 1
+                self.score += game_settings.score_per_coin
+                self.check_level_up()
+
+    def game_over(self):
+        self.game_state = 'game_over'
+        self.on_event('game_over')
+
+
+def _gap_target(engine):
+    player = engine.player
+    for wall in engine.walls:
+        if wall.x + wall.width >= player.x:
+            return wall.gap_y + wall.gap_height // 2
+    return SCREEN_HEIGHT // 2
+
+
+def gap_policy(engine):
+    """Simple bot: flap whenever the player sinks below the next gap's centre."""
+    player = engine.player
+    return player.y + player.size // 2 > _gap_target(engine) and player.velocity >= 0
+
+
+DODGE_HORIZON = 24  # frames
+
+
+def _frames_to_death(engine, plan, target):
+    """Frames until a wall or projectile kills the player if it flaps as `plan`
+    says (True/False per frame) and follows gap_policy after that; None if it
+    lives DODGE_HORIZON frames."""
+    player = engine.player
+    y = player.y
+    velocity = player.velocity
+    started = player.started
+    size = player.size
+    inner = size - 20
+    left = int(player.x + 10)
+    floor = SCREEN_HEIGHT - size
+    projectiles = [(p.x, p.y, p.velocity_x, p.velocity_y, p.size) for p in engine.projectiles]
+    walls = [(w.x, w.speed, w.width, w.gap_y, w.gap_y + w.gap_height) for w in engine.walls
+             if w.x + w.width >= player.x - w.speed * DODGE_HORIZON]
+    for t in range(1, DODGE_HORIZON + 1):
+        if plan[t - 1] if t <= len(plan) else (y + size // 2 > target and velocity >= 0):
+            velocity = game_settings.flap_strength
+            started = True
+        if started:
+            velocity += game_settings.gravity
+            y += velocity
+        if y < 0:
+            y = velocity = 0
+        elif y > floor:
+            y = floor
+            velocity = 0
+        top = int(y + 10)
+        for x, speed, width, gap_top, gap_bottom in walls:
+            wx = int(x - speed * t)
+            if left < wx + width and left + inner > wx and (top < gap_top or top + inner > gap_bottom):
+                return t
+        for x, py, vx, vy, psize in projectiles:
+            px = int(x + vx * t)
+            py = int(py + vy * t)
+            if left < px + psize and top < py + psize and left + inner > px and top + inner > py:
+                return t
+    return None
+
+
+# Alternatives tried when gap_policy is about to die: flap after 0-9 frames,
+# or hold off for 1-15 frames, then carry on with gap_policy
+_DODGE_PLANS = ([(False,) * k + (True,) for k in range(10)]
+                + [(False,) * k for k in range(1, 16)])
+
+
+def dodge_policy(engine):
+    """gap_policy, but it looks DODGE_HORIZON frames ahead and changes course
+    when that would run into a projectile or a wall."""
+    target = _gap_target(engine)
+    want = gap_policy(engine)
+    best = _frames_to_death(engine, (want,), target)
+    if best is None:
+        return want
+    for plan in _DODGE_PLANS:
+        hit = _frames_to_death(engine, plan, target)
+        if hit is None:
+            return plan[0]
+        if hit > best:
+            best, want = hit, plan[0]
+    return want
+
+
+def simulate(policy=gap_policy, seed=None, max_frames=FPS * 60 * 5, level_table=None):
+    """Play one headless game to completion; returns the finished Engine.
+
+    policy(engine) is asked once per frame whether to flap. No real time
+    passes, so this runs as fast as the CPU allows.
+    """
+    engine = Engine(level_table=level_table)
+    engine.start_game(seed)
+    while engine.game_state == 'playing' and engine.frame_count < max_frames:
+        if policy(engine):
+            engine.flap()
+        engine.update()
+    return engine
@@ -0,0 +1,142 @@
+"""Replays of the best verified runs, served as ghosts to race against.
+
+Each run is stored in replay.py's format (a seed plus varint-encoded
+deltas between flap frames), preceded by the player's name, and appended
+to a segment file, ghosts.seg. ghosts.idx gets one fixed-size entry per
+run. It holds the run's offset, name and replay length, score, frames, and
+submission time. Both files are append-only. Writers from every gunicorn
+worker take an flock on the index. Readers only read the index entries
+added since their last look.
+
+Each process mmaps the segment and keeps the entries ranked by score, so
+the run at a given rank is a list lookup. Its replay is a memoryview slice
+of the map, sent without copying or parsing.
+
+A run is only stored if it makes the top `capacity` when it's submitted.
+The files therefore grow with the number of times the top runs change,
+not with the number of runs played.
+
+    python ghosts.py list [--limit N]
+"""
+import argparse
+import bisect
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+
+DEFAULT_CAPACITY = 1000
+# offset, name length, replay length, score, frames, created
+_ENTRY = struct.Struct('<QBIIId')
+
+
+class GhostStore:
+    def __init__(self, directory, capacity=DEFAULT_CAPACITY):
+        self.directory = directory
+        self.capacity = capacity
+        os.makedirs(directory, exist_ok=True)
+        flags = os.O_RDWR | os.O_CREAT | os.O_APPEND
+        self._index_fd = os.open(os.path.join(directory, 'ghosts.idx'), flags, 0o644)
+        self._segment_fd = os.open(os.path.join(directory, 'ghosts.seg'), flags, 0o644)
+        self._lock = threading.Lock()
+        self._index_size = 0
+        self._map = None
+        # Entries as (-score, created, offset, name length, replay length,
+        # frames), best first: ties go to the earlier run
+        self._ranked = []
+
+    def _refresh(self):
+        # Called with self._lock held
+        size = os.fstat(self._index_fd).st_size
+        size -= size % _ENTRY.size  # an entry still being appended
+        if size <= self._index_size:
+            return
+        data = os.pread(self._index_fd, size - self._index_size, self._index_size)
+        end = 0
+        for offset, name_length, length, score, frames, created in _ENTRY.iter_unpack(data):
+            bisect.insort(self._ranked, (-score, created, offset, name_length, length, frames))
+            end = max(end, offset + name_length + length)
+        self._index_size = size
+        if self._map is None or end > len(self._map):
+            # Slices already handed out keep the old map alive until released
+            self._map = mmap.mmap(self._segment_fd, 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._ranked)
+
+    def qualifies(self, score):
+        """Whether a run with this score would be stored."""
+        with self._lock:
+            self._refresh()
+            return (len(self._ranked) < self.capacity
+                    or score > -self._ranked[self.capacity - 1][0])
+
+    def add(self, run, player):
+        """Store a replay.Replay if it makes the top `capacity`; returns its rank or None."""
+        # Up to 255 bytes, without splitting a character
+        name = player.encode()[:255].decode('utf-8', 'ignore').encode()
+        data = run.to_bytes()
+        with self._lock:
+            fcntl.flock(self._index_fd, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                if (len(self._ranked) >= self.capacity
+                        and run.score <= -self._ranked[self.capacity - 1][0]):
+                    return None
+                # Segment first, so the index never points past its end
+                offset = os.fstat(self._segment_fd).st_size
+                created = time.time()
+                os.write(self._segment_fd, name + data)
+                os.write(self._index_fd, _ENTRY.pack(offset, len(name), len(data), run.score,
+                                                     run.frames, created))
+                self._refresh()
+            finally:
+                fcntl.flock(self._index_fd, fcntl.LOCK_UN)
+            return bisect.bisect_left(self._ranked, (-run.score, created, offset)) + 1
+
+    def get(self, rank):
+        """(replay bytes as a memoryview, player, score, frames) of the run at 1-based rank.
+
+        None if there's no run at that rank.
+        """
+        with self._lock:
+            self._refresh()
+            if not 1 <= rank <= min(len(self._ranked), self.capacity):
+                return None
+            score, _, offset, name_length, length, frames = self._ranked[rank - 1]
+            view = memoryview(self._map)
+        name = bytes(view[offset:offset + name_length]).decode(errors='replace')
+        start = offset + name_length
+        return view[start:start + length], name, -score, frames
+
+    def top(self, limit):
+        """[(rank, player, score, frames), ...] for the best `limit` runs."""
+        return [(rank, *self.get(rank)[1:]) for rank in range(1, min(limit, self.capacity, len(self)) + 1)]
+
+    def close(self):
+        with self._lock:
+            self._map = None
+            os.close(self._index_fd)
+            os.close(self._segment_fd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ghost replay store tools.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    listing = commands.add_parser('list', help='the best stored runs')
+    listing.add_argument('--dir', default=os.environ.get('GHOST_DIR', 'ghosts'))
+    listing.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    store = GhostStore(args.dir)
+    print(f'{len(store)} runs stored in {args.dir}')
+    for rank, player, score, frames in store.top(args.limit):
+        print(f'{rank:5} {score:6} {frames / 60:7.1f}s  {player}')
+
+
+if __name__ == '__main__':
+    main()
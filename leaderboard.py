@@ -0,0 +1,174 @@
+"""Leaderboard storage shared by every gunicorn worker: SQLite in WAL mode.
+
+Every finished run is a row in `scores`. `players` keeps each player's best
+score, updated in the same transaction, so top-N reads don't have to group
+all runs. Writes take the database's write lock up front (BEGIN IMMEDIATE),
+so comparing against the current high score and recording the run happen
+atomically across threads and processes.
+
+Each Leaderboard keeps the top-N players in memory. A version counter,
+bumped by every write, is read before serving from the cache. This is a
+single-row lookup, and it lets writes from other workers invalidate the
+cache too.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_PLAYER = 'anonymous'
+TOP_N = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    level INTEGER,
+    coins INTEGER,
+    verified INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_level ON scores (level, score);
+CREATE TABLE IF NOT EXISTS players (
+    player TEXT PRIMARY KEY,
+    best INTEGER NOT NULL,
+    runs INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_by_best ON players (best DESC, player);
+CREATE TABLE IF NOT EXISTS meta (
+    version INTEGER NOT NULL
+);
+INSERT INTO meta (version) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM meta);
+"""
+
+
+class Leaderboard:
+    def __init__(self, path, top_n=TOP_N, legacy_file=None):
+        self.path = path
+        self.top_n = top_n
+        self._local = threading.local()
+        # (version, [(player, best), ...]) for the top_n players
+        self._cache = None
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for statement in _SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+            (runs,) = conn.execute('SELECT COUNT(*) FROM scores').fetchone()
+            if not runs and legacy_file:
+                self._import_legacy(conn, legacy_file)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _connect(self):
+        # sqlite3 connections can't be shared between threads; one each
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _import_legacy(self, conn, legacy_file):
+        # Carry the single score from highscore.json over on first start
+        try:
+            with open(legacy_file, 'r') as f:
+                high_score = json.load(f).get('high_score', 0)
+        except (OSError, ValueError):
+            return
+        if isinstance(high_score, int) and high_score > 0:
+            self._record(conn, high_score, DEFAULT_PLAYER, None, None, False)
+
+    def _record(self, conn, score, player, level, coins, verified):
+        conn.execute('INSERT INTO scores (player, score, level, coins, verified, created) '
+                     'VALUES (?, ?, ?, ?, ?, ?)',
+                     (player, score, level, coins, int(verified), time.time()))
+        conn.execute('INSERT INTO players (player, best, runs) VALUES (?, ?, 1) '
+                     'ON CONFLICT (player) DO UPDATE SET best = MAX(best, excluded.best), '
+                     'runs = runs + 1', (player, score))
+        conn.execute('UPDATE meta SET version = version + 1')
+
+    def submit(self, score, player=DEFAULT_PLAYER, level=None, coins=None, verified=False):
+        """Record a finished run; returns True if it beat the overall high score."""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            (high_score,) = conn.execute('SELECT COALESCE(MAX(best), 0) FROM players').fetchone()
+            self._record(conn, score, player, level, coins, verified)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return score > high_score
+
+    def submit_many(self, runs):
+        """Record many runs in one transaction.
+
+        runs are (score, player, level, coins, verified) tuples.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany('INSERT INTO scores (player, score, level, coins, verified, created) '
+                             'VALUES (?, ?, ?, ?, ?, ?)',
+                             [(player, score, level, coins, int(verified), now)
+                              for score, player, level, coins, verified in runs])
+            conn.executemany('INSERT INTO players (player, best, runs) VALUES (?, ?, 1) '
+                             'ON CONFLICT (player) DO UPDATE SET best = MAX(best, excluded.best), '
+                             'runs = runs + 1', [(player, score) for score, player, *_ in runs])
+            conn.execute('UPDATE meta SET version = version + 1')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def top(self, limit=None):
+        """The best players as [(player, best score)], highest first."""
+        if limit is None:
+            limit = self.top_n
+        conn = self._connect()
+        if limit > self.top_n:
+            return conn.execute('SELECT player, best FROM players ORDER BY best DESC, player '
+                                'LIMIT ?', (limit,)).fetchall()
+        # Read the version first: rows fetched after it are at least that new
+        version = self.version()
+        cached = self._cache
+        if cached is None or cached[0] != version:
+            rows = conn.execute('SELECT player, best FROM players ORDER BY best DESC, player '
+                                'LIMIT ?', (self.top_n,)).fetchall()
+            cached = self._cache = (version, rows)
+        return cached[1][:limit]
+
+    def version(self):
+        """Changes whenever any process writes to the leaderboard."""
+        (version,) = self._connect().execute('SELECT version FROM meta').fetchone()
+        return version
+
+    def high_score(self):
+        top = self.top(1)
+        return top[0][1] if top else 0
+
+    def player_best(self, player):
+        row = self._connect().execute('SELECT best, runs FROM players WHERE player = ?',
+                                      (player,)).fetchone()
+        return {'player': player, 'best': row[0] if row else 0, 'runs': row[1] if row else 0}
+
+    def level_stats(self):
+        """Runs, best and mean score for each level that runs ended on."""
+        rows = self._connect().execute(
+            'SELECT level, COUNT(*), MAX(score), AVG(score) FROM scores '
+            'WHERE level IS NOT NULL GROUP BY level ORDER BY level').fetchall()
+        return [{'level': level, 'runs': runs, 'best': best, 'mean_score': round(mean, 2)}
+                for level, runs, best, mean in rows]
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
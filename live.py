@@ -0,0 +1,87 @@
+"""Live leaderboard pushed to browsers as Server-Sent Events.
+
+One publisher thread per worker watches the leaderboard's version counter,
+which is bumped by writes from any worker. When it changes, the thread
+encodes the top players once as an SSE message and wakes every stream
+waiting on it. Writes in this worker call notify() to skip the poll wait.
+The publisher waits COALESCE seconds after a change before reading, so a
+burst of scores goes out as one message. Streams only keep the sequence
+number of the last message they sent, so a slow client skips to the latest
+snapshot and never builds up a backlog.
+"""
+import json
+import threading
+import time
+
+
+class LeaderboardFeed:
+    def __init__(self, board, limit, poll_interval=0.5, coalesce=0.1, max_subscribers=1000):
+        self.board = board
+        self.limit = limit
+        self.poll_interval = poll_interval
+        self.coalesce = coalesce
+        self.max_subscribers = max_subscribers
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.message = None
+        self.published_at = 0.0
+        self.subscribers = 0
+        self.changed = threading.Event()
+        self.thread = None
+
+    def start(self):
+        with self.cond:
+            if self.thread is None:
+                self.publish(self.board.version())
+                self.thread = threading.Thread(target=self._run, name='leaderboard-feed', daemon=True)
+                self.thread.start()
+
+    def notify(self):
+        """A score was written in this process; publish without waiting for the poll."""
+        self.changed.set()
+
+    def publish(self, version):
+        top = self.board.top(self.limit)
+        data = json.dumps({'players': [{'player': player, 'score': best} for player, best in top]},
+                          separators=(',', ':'))
+        message = f'id: {version}\nevent: leaderboard\ndata: {data}\n\n'.encode()
+        with self.cond:
+            self.seq += 1
+            self.message = message
+            self.published_at = time.time()
+            self.cond.notify_all()
+
+    def _run(self):
+        version = self.board.version()
+        while True:
+            if self.changed.wait(self.poll_interval):
+                time.sleep(self.coalesce)  # Let the rest of a burst land
+                self.changed.clear()
+            latest = self.board.version()
+            if latest != version:
+                version = latest
+                self.publish(version)
+
+    def subscribe(self):
+        """Take a stream slot; False when max_subscribers are already connected."""
+        with self.cond:
+            if self.subscribers >= self.max_subscribers:
+                return False
+            self.subscribers += 1
+            return True
+
+    def unsubscribe(self):
+        with self.cond:
+            self.subscribers -= 1
+
+    def wait(self, seen, timeout):
+        """(seq, message) once there's a message newer than seen, or (seen, None) on timeout."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq != seen, timeout):
+                return seen, None
+            return self.seq, self.message
+
+    def stats(self):
+        with self.cond:
+            return {'subscribers': self.subscribers, 'max_subscribers': self.max_subscribers,
+                    'messages': self.seq, 'last_published': self.published_at}
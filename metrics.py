@@ -0,0 +1,196 @@
+"""Prometheus metrics shared by every gunicorn worker.
+
+Each process counts into plain dicts under one lock. A background thread
+writes the process's values to <directory>/<pid>.json every
+`flush_interval` seconds. A scrape writes its own process's values, then
+adds up every file in the directory and renders the Prometheus text
+exposition format. Counters and histograms from workers that have exited
+are kept, so totals never go backwards. Gauges only count live processes.
+"""
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers a cached config hit up to a slow replay verification
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Metrics:
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        # name -> (kind, help, label names, buckets)
+        self._definitions = {}
+        # name -> {label values: number, or [bucket counts..., sum] for histograms}
+        self._values = {}
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def define(self, name, kind, help, labels=(), buckets=DEFAULT_BUCKETS):
+        assert kind in ('counter', 'gauge', 'histogram')
+        self._definitions[name] = (kind, help, tuple(labels), tuple(buckets))
+        self._values[name] = {}
+
+    def inc(self, name, labels=(), value=1):
+        """Add to a counter or gauge; gauges may go down."""
+        self._start_flusher()
+        with self._lock:
+            series = self._values[name]
+            series[labels] = series.get(labels, 0) + value
+
+    def observe(self, name, labels, value):
+        self._start_flusher()
+        buckets = self._definitions[name][3]
+        # Only the first matching bucket is counted; rendering makes them cumulative
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            series = self._values[name]
+            counts = series.get(labels)
+            if counts is None:
+                counts = series[labels] = [0] * (len(buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def timer(self, name, labels=()):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, labels, time.perf_counter() - start)
+
+    def instrument(self, obj, methods, name, label):
+        """Time calls to obj's methods into histogram `name`, labelled `label.method`."""
+        for method in methods:
+            original = getattr(obj, method)
+
+            def timed(*args, _original=original, _labels=(f'{label}.{method}',), **kwargs):
+                start = time.perf_counter()
+                try:
+                    return _original(*args, **kwargs)
+                finally:
+                    self.observe(name, _labels, time.perf_counter() - start)
+            setattr(obj, method, timed)
+        return obj
+
+    def _snapshot(self):
+        with self._lock:
+            return {name: [[list(labels), list(value) if isinstance(value, list) else value]
+                           for labels, value in series.items()]
+                    for name, series in self._values.items()}
+
+    def flush(self):
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'pid': os.getpid(), 'values': self._snapshot()}, f)
+        os.replace(tmp, path)
+
+    def _start_flusher(self):
+        # Per process: a gunicorn worker forked after import needs its own thread
+        if self._flusher_pid == os.getpid() or not self.directory:
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def _collect(self):
+        """Values summed over all processes, in the same shape as self._values."""
+        if not self.directory:
+            snapshots = [(os.getpid(), self._snapshot())]
+        else:
+            self.flush()
+            snapshots = []
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                try:
+                    with open(path) as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    continue  # being replaced
+                snapshots.append((data['pid'], data['values']))
+        totals = {name: {} for name in self._definitions}
+        for pid, values in snapshots:
+            live = None
+            for name, series in values.items():
+                if name not in self._definitions:
+                    continue
+                if self._definitions[name][0] == 'gauge':
+                    if live is None:
+                        live = pid == os.getpid() or _alive(pid)
+                    if not live:
+                        continue
+                merged = totals[name]
+                for labels, value in series:
+                    labels = tuple(labels)
+                    if isinstance(value, list):
+                        current = merged.setdefault(labels, [0] * len(value))
+                        for i, v in enumerate(value):
+                            current[i] += v
+                    else:
+                        merged[labels] = merged.get(labels, 0) + value
+        return totals
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, series in self._collect().items():
+            kind, help, label_names, buckets = self._definitions[name]
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(series.items()):
+                if kind != 'histogram':
+                    lines.append(f'{name}{_labels(label_names, labels)} {_format(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float('inf'),), value):
+                    cumulative += count
+                    le = f'le="{_format(bound)}"'
+                    lines.append(f'{name}_bucket{_labels(label_names, labels, le)} {cumulative}')
+                lines.append(f'{name}_sum{_labels(label_names, labels)} {_format(value[-1])}')
+                lines.append(f'{name}_count{_labels(label_names, labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
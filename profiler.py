@@ -0,0 +1,122 @@
+"""Frame profiler for the desktop game: where each frame's time goes.
+
+The game loop calls begin_frame() once per displayed frame. After each phase
+(an update step, drawing walls, the HUD...) it calls mark(phase), which
+charges the time since the previous mark to that phase. Phases that run more
+than once in a frame, like fixed-timestep updates, add up. The last
+`capacity` frames are kept in a ring buffer of preallocated rows, and so is
+every individual mark, so it can be exported as a trace.
+
+While disabled, mark() and count() return straight away.
+"""
+import json
+import os
+import time
+
+DEFAULT_CAPACITY = 600  # 10 seconds at 60 FPS
+MARKS_PER_FRAME = 64
+
+
+def _distribution(samples):
+    samples = sorted(samples)
+    return (samples[len(samples) // 2],
+            samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+            samples[-1])
+
+
+class FrameProfiler:
+    def __init__(self, phases, counters=(), capacity=DEFAULT_CAPACITY):
+        self.phases = tuple(phases)
+        self.counters = tuple(counters)
+        self.capacity = capacity
+        self.enabled = False
+        self._phase_index = {phase: i for i, phase in enumerate(self.phases)}
+        self._counter_index = {name: i for i, name in enumerate(self.counters)}
+        # Per frame: start time, time per phase and counter values
+        self._starts = [0.0] * capacity
+        self._times = [[0.0] * len(self.phases) for _ in range(capacity)]
+        self._counts = [[0] * len(self.counters) for _ in range(capacity)]
+        # Per mark, for traces: (phase index, start, duration)
+        self._marks = [None] * (capacity * MARKS_PER_FRAME)
+        self._mark_count = 0
+        self.frames = 0
+        self._row = None
+        self._last = 0.0
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+        self._row = None
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        slot = self.frames % self.capacity
+        self.frames += 1
+        self._starts[slot] = now
+        row = self._row = self._times[slot]
+        for i in range(len(row)):
+            row[i] = 0.0
+        counts = self._counts[slot]
+        for i in range(len(counts)):
+            counts[i] = 0
+        self._last = now
+
+    def mark(self, phase):
+        """Charge the time since the last mark (or begin_frame) to phase."""
+        if self._row is None:
+            return
+        now = time.perf_counter()
+        i = self._phase_index[phase]
+        self._row[i] += now - self._last
+        self._marks[self._mark_count % len(self._marks)] = (i, self._last, now - self._last)
+        self._mark_count += 1
+        self._last = now
+
+    def skip(self):
+        """Don't charge the time since the last mark to any phase."""
+        if self._row is not None:
+            self._last = time.perf_counter()
+
+    def count(self, counter, value):
+        if self._row is not None:
+            self._counts[(self.frames - 1) % self.capacity][self._counter_index[counter]] = value
+
+    def _recent(self, frames=None):
+        # Rows of the buffered frames, oldest first, excluding the one in progress
+        available = min(self.frames - 1, self.capacity - 1)
+        if frames is not None:
+            available = min(available, frames)
+        end = self.frames - 1
+        return [(end - n) % self.capacity for n in range(available, 0, -1)]
+
+    def summary(self, frames=None):
+        """{phase: (p50, p99, max) in seconds} and the latest counter values."""
+        slots = self._recent(frames)
+        if not slots:
+            return {}, {}
+        rows = [self._times[slot] for slot in slots]
+        stats = {phase: _distribution([row[i] for row in rows]) for i, phase in enumerate(self.phases)}
+        stats['frame'] = _distribution([sum(row) for row in rows])
+        counts = dict(zip(self.counters, self._counts[slots[-1]]))
+        return stats, counts
+
+    def export_trace(self, path):
+        """Write the buffered marks as Chrome trace events (chrome://tracing, Perfetto)."""
+        total = len(self._marks)
+        first = max(0, self._mark_count - total)
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                   'args': {'name': 'game loop'}}]
+        for n in range(first, self._mark_count):
+            phase, start, duration = self._marks[n % total]
+            name = self.phases[phase]
+            events.append({'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': pid, 'tid': 0,
+                           'ts': start * 1e6, 'dur': duration * 1e6})
+        for slot in self._recent():
+            events.append({'name': 'entities', 'ph': 'C', 'pid': pid, 'tid': 0,
+                           'ts': self._starts[slot] * 1e6,
+                           'args': dict(zip(self.counters, self._counts[slot]))})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
@@ -0,0 +1,143 @@
+"""Compact binary replays: a seed plus the frames on which the player flapped.
+
+Because game_engine runs at a fixed timestep with a per-game RNG, these
+two things reproduce a run exactly. Layout (little-endian):
+
+    magic    4s   b'FBRP'
+    version  B    1
+    seed     Q
+    frames   I    frames simulated before the run ended
+    score    I    score the run finished with
+    count    I    number of flaps
+    flaps    varint-encoded deltas between successive flap frames
+
+A typical minute-long run is a few hundred bytes. Replay a file headlessly
+with:
+
+    python replay.py run.fbr
+"""
+import struct
+import sys
+import time
+
+import game_engine
+
+MAGIC = b'FBRP'
+VERSION = 1
+_HEADER = struct.Struct('<4sBQIII')
+
+
+class ReplayError(ValueError):
+    pass
+
+
+class Replay:
+    def __init__(self, seed, flap_frames, frames=0, score=0):
+        self.seed = seed
+        self.flap_frames = list(flap_frames)
+        self.frames = frames
+        self.score = score
+
+    @classmethod
+    def from_engine(cls, engine):
+        return cls(engine.seed, engine.flap_frames, engine.frame_count, engine.score)
+
+    def to_bytes(self):
+        out = bytearray(_HEADER.pack(MAGIC, VERSION, self.seed, self.frames, self.score,
+                                     len(self.flap_frames)))
+        previous = 0
+        for frame in self.flap_frames:
+            delta = frame - previous
+            if delta < 0:
+                raise ReplayError('flap frames must be in increasing order')
+            previous = frame
+            # Unsigned LEB128 varint
+            while delta >= 0x80:
+                out.append((delta & 0x7F) | 0x80)
+                delta >>= 7
+            out.append(delta)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < _HEADER.size:
+            raise ReplayError('replay is truncated')
+        magic, version, seed, frames, score, count = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError('not a replay file')
+        if version != VERSION:
+            raise ReplayError(f'unsupported replay version {version}')
+        flap_frames = []
+        frame = 0
+        pos = _HEADER.size
+        for _ in range(count):
+            delta = 0
+            shift = 0
+            while True:
+                if pos >= len(data):
+                    raise ReplayError('replay is truncated')
+                byte = data[pos]
+                pos += 1
+                delta |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            frame += delta
+            flap_frames.append(frame)
+        return cls(seed, flap_frames, frames, score)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+def play(replay, max_frames=None):
+    """Re-simulate a replay headlessly and return the finished Engine."""
+    if max_frames is None:
+        max_frames = replay.frames
+    engine = game_engine.Engine()
+    engine.start_game(replay.seed)
+    flaps = replay.flap_frames
+    next_flap = 0
+    while engine.game_state == 'playing' and engine.frame_count < max_frames:
+        # Several flaps on one frame behave like the last one
+        while next_flap < len(flaps) and flaps[next_flap] == engine.frame_count:
+            engine.flap()
+            next_flap += 1
+        engine.update()
+    return engine
+
+
+def verify(seed, flap_frames, score, frames):
+    """Re-simulate a submitted run; returns (matches, simulated_score, simulated_frames).
+
+    It matches if the game ends on exactly the claimed frame with the claimed
+    score, so a run can't be cut short or padded. Module-level so it can be
+    sent to a process pool.
+    """
+    flap_frames = sorted(flap_frames)
+    engine = play(Replay(seed, flap_frames), max_frames=frames)
+    matches = (engine.game_state == 'game_over' and engine.frame_count == frames
+               and engine.score == score)
+    return matches, engine.score, engine.frame_count
+
+
+def main():
+    for path in sys.argv[1:]:
+        replay = Replay.load(path)
+        start = time.perf_counter()
+        engine = play(replay)
+        elapsed = time.perf_counter() - start
+        status = 'ok' if engine.score == replay.score else f'MISMATCH (recorded {replay.score})'
+        speedup = engine.frame_count / game_engine.FPS / elapsed if elapsed else float('inf')
+        print(f'{path}: seed={replay.seed} score={engine.score} frames={engine.frame_count} '
+              f'{status}, replayed in {elapsed * 1000:.1f}ms ({speedup:,.0f}x real time)')
+
+
+if __name__ == '__main__':
+    main()
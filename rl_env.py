@@ -0,0 +1,310 @@
+"""Reinforcement-learning environments over the headless game rules.
+
+FlappyEnv follows the Gym API: reset() returns (observation, info) and
+step(action) returns (observation, reward, terminated, truncated, info).
+The action is 1 to flap and 0 to do nothing, one frame per step. The
+observation is a float32 vector of OBS_SIZE numbers rather than pixels:
+- the player's height, vertical speed and level;
+- the next walls' gap edges;
+- the nearest enemies, projectiles and coins, relative to the player.
+Missing entities are zeros with their `present` flag cleared (see
+OBS_LAYOUT).
+
+VectorEnv steps many games split over worker processes. Actions,
+observations, rewards and done flags live in one shared-memory block, so a
+step only sends a few bytes down each worker's pipe. Finished games are reset
+in the same step, with the next seed.
+
+If gymnasium is installed, FlappyEnv is a gymnasium.Env with matching
+spaces.
+"""
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import game_engine
+from game_engine import SCREEN_WIDTH, SCREEN_HEIGHT
+
+try:
+    import gymnasium
+except ImportError:
+    gymnasium = None
+
+# (name, slots, features per slot), in observation order
+OBS_LAYOUT = (
+    ('player', 1, ('y', 'velocity', 'level')),
+    ('walls', 2, ('present', 'dx', 'gap_top', 'gap_bottom')),
+    ('enemies', 3, ('present', 'dx', 'dy')),
+    ('projectiles', 4, ('present', 'dx', 'dy', 'vx', 'vy')),
+    ('coins', 2, ('present', 'dx', 'dy')),
+)
+OBS_SIZE = sum(slots * len(features) for _, slots, features in OBS_LAYOUT)
+_SLOTS = {name: slots for name, slots, _ in OBS_LAYOUT}
+# Speeds are divided by this to keep them around [-1, 1]
+VELOCITY_SCALE = 10.0
+
+# Per step: the score gained, a little for staying alive, a penalty for dying
+ALIVE_REWARD = 0.01
+DEATH_REWARD = -1.0
+MAX_FRAMES = game_engine.FPS * 60 * 5
+
+_Base = gymnasium.Env if gymnasium is not None else object
+
+
+def _nearest(entities, cx, cy, slots, half):
+    # Closest `slots` entities to (cx, cy), by the distance to their centres
+    if len(entities) > slots:
+        entities = sorted(entities, key=lambda e: (e.x + half - cx) ** 2 + (e.y + half - cy) ** 2)
+    return entities[:slots]
+
+
+class FlappyEnv(_Base):
+    """One game as a Gym environment."""
+    metadata = {'render_modes': []}
+
+    def __init__(self, max_frames=MAX_FRAMES, level_table=None):
+        self.max_frames = max_frames
+        self.engine = game_engine.Engine(level_table=level_table)
+        self._last_level = max(len(self.engine.levels) - 1, 1)
+        if gymnasium is not None:
+            self.observation_space = gymnasium.spaces.Box(-np.inf, np.inf, (OBS_SIZE,), np.float32)
+            self.action_space = gymnasium.spaces.Discrete(2)
+
+    def reset(self, seed=None, options=None):
+        obs = np.empty(OBS_SIZE, dtype=np.float32)
+        self.reset_into(seed, obs)
+        return obs, self._info()
+
+    def step(self, action):
+        obs = np.empty(OBS_SIZE, dtype=np.float32)
+        reward, terminated, truncated = self.step_into(action, obs)
+        return obs, reward, terminated, truncated, self._info()
+
+    def reset_into(self, seed, out):
+        """reset(), writing the observation into `out` instead of a new array."""
+        self.engine.start_game(seed)
+        self.observe(out)
+
+    def step_into(self, action, out):
+        """step(), writing the observation into `out`; returns (reward, terminated, truncated)."""
+        engine = self.engine
+        score = engine.score
+        if action:
+            engine.flap()
+        engine.update()
+        terminated = engine.game_state == 'game_over'
+        truncated = not terminated and engine.frame_count >= self.max_frames
+        reward = engine.score - score + (DEATH_REWARD if terminated else ALIVE_REWARD)
+        self.observe(out)
+        return reward, terminated, truncated
+
+    def _info(self):
+        engine = self.engine
+        return {'score': engine.score, 'level': engine.current_level + 1,
+                'frame': engine.frame_count, 'seed': engine.seed}
+
+    def observe(self, out):
+        """Write the current observation into the float32 array `out`."""
+        engine = self.engine
+        player = engine.player
+        half = player.size / 2
+        cx = player.x + half
+        cy = player.y + half
+        values = [player.y / SCREEN_HEIGHT, player.velocity / VELOCITY_SCALE,
+                  engine.current_level / self._last_level]
+
+        slots = _SLOTS['walls']
+        for wall in engine.walls:
+            if slots and wall.x + wall.width >= player.x:
+                values += (1.0, (wall.x - cx) / SCREEN_WIDTH, wall.gap_y / SCREEN_HEIGHT,
+                           (wall.gap_y + wall.gap_height) / SCREEN_HEIGHT)
+                slots -= 1
+        values += (0.0,) * (4 * slots)
+
+        for name, entities, velocity in (('enemies', engine.enemies, False),
+                                         ('projectiles', engine.projectiles, True),
+                                         ('coins', engine.coins, False)):
+            slots = _SLOTS[name]
+            if entities:
+                centre = entities[0].size / 2
+                nearest = _nearest(entities, cx, cy, slots, centre)
+                for entity in nearest:
+                    values += (1.0, (entity.x + centre - cx) / SCREEN_WIDTH,
+                               (entity.y + centre - cy) / SCREEN_HEIGHT)
+                    if velocity:
+                        values += (entity.velocity_x / VELOCITY_SCALE,
+                                   entity.velocity_y / VELOCITY_SCALE)
+                slots -= len(nearest)
+            values += (0.0,) * (slots * (5 if velocity else 3))
+        out[:] = values
+
+
+def _views(buf, num_envs):
+    """numpy views over a shared block: observations, rewards, scores, actions, terminated, truncated."""
+    shapes = (((num_envs, OBS_SIZE), np.float32), ((num_envs,), np.float32),
+              ((num_envs,), np.int32), ((num_envs,), np.uint8), ((num_envs,), np.bool_),
+              ((num_envs,), np.bool_))
+    views = []
+    offset = 0
+    for shape, dtype in shapes:
+        view = np.ndarray(shape, dtype, buffer=buf, offset=offset)
+        views.append(view)
+        offset += view.nbytes
+    return views
+
+
+def _buffer_size(num_envs):
+    return num_envs * (OBS_SIZE * 4 + 4 + 4 + 1 + 1 + 1)
+
+
+class _Block:
+    """The games [start, stop) of a VectorEnv, stepped into the shared arrays."""
+
+    def __init__(self, buf, num_envs, start, stop, seed, env_kwargs):
+        (self.observations, self.rewards, self.scores, self.actions,
+         self.terminated, self.truncated) = _views(buf, num_envs)
+        self.num_envs = num_envs
+        self.start = start
+        self.seed = seed
+        self.envs = [FlappyEnv(**env_kwargs) for _ in range(start, stop)]
+        self.episodes = [0] * len(self.envs)
+
+    def _reset(self, n, i):
+        # Game i's k-th episode uses seed + i + k * num_envs, so every game
+        # gets distinct seeds however the games are split between workers
+        self.envs[n].reset_into(self.seed + i + self.episodes[n] * self.num_envs,
+                                self.observations[i])
+        self.episodes[n] += 1
+
+    def reset(self):
+        for n in range(len(self.envs)):
+            self._reset(n, self.start + n)
+        stop = self.start + len(self.envs)
+        self.rewards[self.start:stop] = 0
+        self.terminated[self.start:stop] = False
+        self.truncated[self.start:stop] = False
+
+    def step(self):
+        observations = self.observations
+        actions = self.actions
+        rewards = self.rewards
+        terminated = self.terminated
+        truncated = self.truncated
+        for n, env in enumerate(self.envs):
+            i = self.start + n
+            reward, done, cut = env.step_into(actions[i], observations[i])
+            rewards[i] = reward
+            terminated[i] = done
+            truncated[i] = cut
+            if done or cut:
+                self.scores[i] = env.engine.score
+                self._reset(n, i)
+
+
+def _worker(shm_name, num_envs, start, stop, seed, env_kwargs, conn):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        block = _Block(shm.buf, num_envs, start, stop, seed, env_kwargs)
+        while True:
+            command = conn.recv()
+            if command == 'close':
+                break
+            try:
+                getattr(block, command)()
+            except Exception as e:
+                conn.send(e)
+                break
+            conn.send(None)
+        del block
+    finally:
+        shm.close()
+
+
+class VectorEnv:
+    """num_envs FlappyEnvs stepped together over `workers` processes.
+
+    step(actions) returns (observations, rewards, terminated, truncated,
+    info) as arrays with one row per game. They are views of the shared
+    block, valid until the next step. When a game ends, its row already
+    holds the first observation of its next game, and info['score'] holds
+    the score of the game that ended. workers=0 steps every game in this
+    process.
+    """
+
+    def __init__(self, num_envs, workers=None, seed=0, max_frames=MAX_FRAMES, level_table=None):
+        if num_envs < 1:
+            raise ValueError(f'num_envs must be at least 1, not {num_envs}')
+        if workers is not None and workers < 0:
+            raise ValueError(f'workers must be 0 or more, not {workers}')
+        self.num_envs = num_envs
+        # More workers than games would leave some with nothing to step
+        workers = min(os.cpu_count() if workers is None else workers, num_envs)
+        env_kwargs = {'max_frames': max_frames, 'level_table': level_table}
+        self._shm = shared_memory.SharedMemory(create=True, size=_buffer_size(num_envs))
+        (self.observations, self.rewards, self.scores, self._actions,
+         self.terminated, self.truncated) = _views(self._shm.buf, num_envs)
+        self._local = None
+        self._workers = []
+        if not workers:
+            self._local = _Block(self._shm.buf, num_envs, 0, num_envs, seed, env_kwargs)
+        for w in range(workers):
+            start = num_envs * w // workers
+            stop = num_envs * (w + 1) // workers
+            conn, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker, args=(self._shm.name, num_envs, start, stop, seed, env_kwargs, child),
+                name=f'flappy-env-{w}', daemon=True)
+            process.start()
+            child.close()
+            self._workers.append((process, conn))
+
+    def _run(self, command):
+        if self._local is not None:
+            getattr(self._local, command)()
+            return
+        for _, conn in self._workers:
+            conn.send(command)
+        for _, conn in self._workers:
+            error = conn.recv()
+            if error is not None:
+                raise RuntimeError(f'environment worker failed: {error!r}') from error
+
+    def reset(self):
+        self._run('reset')
+        return self.observations, {'score': self.scores}
+
+    def step(self, actions):
+        self._actions[:] = actions
+        self._run('step')
+        return (self.observations, self.rewards, self.terminated, self.truncated,
+                {'score': self.scores})
+
+    def close(self):
+        if self._shm is None:
+            return
+        for process, conn in self._workers:
+            try:
+                conn.send('close')
+            except OSError:
+                pass
+        for process, conn in self._workers:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+        self._workers = []
+        self._local = None
+        # The views must go before the block can be unmapped
+        del self.observations, self.rewards, self.scores, self._actions
+        del self.terminated, self.truncated
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -6,5 +6,8 @@ PORT=${PORT:-5000}
 
 echo "Starting Gunicorn on port $PORT..."
 
+# Threads per worker; each live leaderboard viewer holds one (see LIVE_MAX_SUBSCRIBERS)
+THREADS=${GUNICORN_THREADS:-4}
+
 # Start Gunicorn
-exec gunicorn --bind 0.0.0.0:$PORT --workers 2 --threads 4 --timeout 60 app:app
+exec gunicorn --bind 0.0.0.0:$PORT --workers 2 --threads $THREADS --timeout 60 app:app
@@ -15,6 +15,12 @@ let score = 0;
 let coins = 0;
 let frameCount = 0;
 
+// Fingerprinted asset URLs from the page; plain /static paths if there
+// hasn't been an asset build
+function assetUrl(filename) {
+    return (window.ASSET_URLS || {})[filename] || '/static/' + filename;
+}
+
 // Images
 const images = {
     player: new Image(),
@@ -24,10 +30,10 @@ const images = {
 
 // Audio
 const audio = {
-    flap: new Audio('/static/audio/flap.mp3'),
-    enemy: new Audio('/static/audio/enemy.mp3'),
-    gameover: new Audio('/static/audio/gameover.mp3'),
-    bg: new Audio('/static/audio/bg.mp3')
+    flap: new Audio(assetUrl('audio/flap.mp3')),
+    enemy: new Audio(assetUrl('audio/enemy.mp3')),
+    gameover: new Audio(assetUrl('audio/gameover.mp3')),
+    bg: new Audio(assetUrl('audio/bg.mp3'))
 };
 
 // Building colors
@@ -52,6 +58,21 @@ let lastWallTime = 0;
 let lastEnemyTime = 0;
 let lastCoinTime = 0;
 
+// Frame-time telemetry, sent in batches. The buckets' upper edges (ms) must
+// match FRAME_BUCKETS_MS in telemetry.py; the last bucket is open-ended.
+const FRAME_BUCKETS_MS = [8, 12, 17, 20, 25, 34, 50, 67, 100, 250];
+const LONG_FRAME_MS = 50;
+const MAX_LONG_FRAMES = 50;
+const TELEMETRY_INTERVAL_MS = 30000;
+let telemetry = { frames: {}, long: [], assets: [], load: null };
+let telemetryHasData = false;
+let lastFrameTime = null;
+let firstFrameRecorded = false;
+
+// Finished runs waiting to be sent to the leaderboard
+const MAX_PENDING_SCORES = 50;
+let pendingScores = [];
+
 // Player class
 class Player {
     constructor() {
@@ -339,16 +360,14 @@ async function init() {
     gameSettings = config.game_settings;
     levels = config.levels;
     
-    // Load high score
-    const hsResponse = await fetch('/api/highscore');
-    const hsData = await hsResponse.json();
-    highScore = hsData.high_score;
-    document.getElementById('high-score').textContent = highScore;
+    // Keep the high score live; fall back to a one-off fetch if the
+    // server can't take another stream
+    watchHighScore();
     
     // Load images
-    images.player.src = '/static/images/player.png';
-    images.enemy.src = '/static/images/enemy.png';
-    images.map.src = '/static/images/map.png';
+    images.player.src = assetUrl('images/player.png');
+    images.enemy.src = assetUrl('images/enemy.png');
+    images.map.src = assetUrl('images/map.png');
     
     // Setup audio
     audio.bg.loop = true;
@@ -362,8 +381,16 @@ async function init() {
     document.addEventListener('keydown', handleKeyDown);
     canvas.addEventListener('click', handleClick);
     
+    // Send frame-time telemetry now and then, and when the tab is hidden
+    // (frames aren't drawn while it is, so don't count that gap as one)
+    setInterval(sendTelemetry, TELEMETRY_INTERVAL_MS);
+    document.addEventListener('visibilitychange', () => {
+        lastFrameTime = null;
+        if (document.visibilityState === 'hidden') sendTelemetry();
+    });
+    
     // Start game loop
-    gameLoop();
+    requestAnimationFrame(gameLoop);
 }
 
 // Start game
@@ -418,23 +445,66 @@ function gameOver() {
     if (score > highScore) {
         highScore = score;
         document.getElementById('new-high-score').classList.remove('hidden');
-        
-        // Save to server
-        fetch('/api/highscore', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ score: score })
-        });
     } else {
         document.getElementById('new-high-score').classList.add('hidden');
     }
     
+    // Save every run to the leaderboard
+    pendingScores.push({ score: score, level: currentLevel + 1, coins: coins });
+    submitScores();
+    
     document.getElementById('final-score').textContent = score;
     document.getElementById('final-level').textContent = levels[currentLevel].name;
     document.getElementById('final-coins').textContent = coins;
     document.getElementById('gameover-screen').classList.remove('hidden');
 }
 
+// Show the best score on the server, updated as other players set new ones
+function showHighScore(best) {
+    if (best > highScore) {
+        highScore = best;
+        document.getElementById('high-score').textContent = highScore;
+    }
+}
+
+function watchHighScore() {
+    if (!window.EventSource) {
+        fetchHighScore();
+        return;
+    }
+    const stream = new EventSource('/api/leaderboard/stream');
+    stream.addEventListener('leaderboard', event => {
+        const players = JSON.parse(event.data).players;
+        if (players.length > 0) showHighScore(players[0].score);
+    });
+    stream.onerror = () => {
+        // Closed (rather than reconnecting) when the server refused the stream
+        if (stream.readyState === EventSource.CLOSED) fetchHighScore();
+    };
+}
+
+async function fetchHighScore() {
+    const response = await fetch('/api/highscore');
+    const data = await response.json();
+    showHighScore(data.high_score);
+}
+
+// Send finished runs to the server; ones it couldn't take are resent with the next run
+function submitScores() {
+    const events = pendingScores;
+    pendingScores = [];
+    const requeue = () => {
+        pendingScores = events.concat(pendingScores).slice(-MAX_PENDING_SCORES);
+    };
+    fetch('/api/scores', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ events: events })
+    }).then(response => {
+        if (response.status === 503) requeue();
+    }).catch(requeue);
+}
+
 // Level up
 function levelUp() {
     if (currentLevel < levels.length - 1) {
@@ -588,12 +658,65 @@ function draw() {
 }
 
 // Game loop
-function gameLoop() {
+function gameLoop(now) {
     update();
     draw();
+    recordFrame(now);
     requestAnimationFrame(gameLoop);
 }
 
+// Count this frame's duration in the current level's histogram
+function recordFrame(now) {
+    if (now === undefined) return;
+    if (!firstFrameRecorded && Object.values(images).every(image => image.complete && image.naturalWidth)) {
+        // Time from navigation to the first frame with every sprite loaded
+        firstFrameRecorded = true;
+        telemetry.load = Math.round(now);
+        telemetry.assets = assetTimings();
+        telemetryHasData = true;
+    }
+    const elapsed = lastFrameTime === null ? null : now - lastFrameTime;
+    lastFrameTime = gameState === 'playing' ? now : null;
+    if (elapsed === null) return;
+    
+    let bucket = FRAME_BUCKETS_MS.findIndex(edge => elapsed <= edge);
+    if (bucket < 0) bucket = FRAME_BUCKETS_MS.length;
+    const counts = telemetry.frames[currentLevel] ||
+        (telemetry.frames[currentLevel] = new Array(FRAME_BUCKETS_MS.length + 1).fill(0));
+    counts[bucket]++;
+    if (elapsed > LONG_FRAME_MS && telemetry.long.length < MAX_LONG_FRAMES) {
+        telemetry.long.push([Math.round(elapsed), currentLevel, walls.length, enemies.length,
+                             projectiles.length, coinsList.length]);
+    }
+    telemetryHasData = true;
+}
+
+// How long each image, sound, script and stylesheet took to load
+function assetTimings() {
+    if (!window.performance || !performance.getEntriesByType) return [];
+    return performance.getEntriesByType('resource')
+        .filter(entry => /\/(static|assets)\//.test(entry.name))
+        .slice(0, 32)
+        .map(entry => [
+            // Drop the origin and any content hash so timings group across deploys
+            new URL(entry.name).pathname.replace(/\.[0-9a-f]{12}(\.\w+)$/, '$1'),
+            Math.round(entry.duration),
+            entry.transferSize || 0
+        ]);
+}
+
+function sendTelemetry() {
+    if (!telemetryHasData) return;
+    const body = JSON.stringify(telemetry);
+    telemetry = { frames: {}, long: [], assets: [], load: null };
+    telemetryHasData = false;
+    const blob = new Blob([body], { type: 'application/json' });
+    if (!(navigator.sendBeacon && navigator.sendBeacon('/api/telemetry', blob))) {
+        fetch('/api/telemetry', { method: 'POST', body: blob, keepalive: true,
+                                  headers: { 'Content-Type': 'application/json' } }).catch(() => {});
+    }
+}
+
 // Update UI
 function updateUI() {
     document.getElementById('current-score').textContent = score;
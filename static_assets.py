@@ -0,0 +1,126 @@
+"""Fingerprinted, precompressed copies of static/ for long-lived caching.
+
+    python static_assets.py
+
+copies every file under static/ to dist/ with a hash of its contents in the
+name (js/game.js -> js/game.3f2a9c1d0b7e.js), writes .gz (and .br, if the
+brotli package is installed) next to text files and records the mapping in
+dist/manifest.json. A hashed URL always names the same bytes, so browsers
+can cache it for a year without revalidating. A new build yields new URLs.
+Files from earlier builds are kept, so pages already open can still load them.
+
+app.py reads the manifest at start-up. Without one, pages link to /static
+as before.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = 'static'
+DIST_DIR = os.environ.get('ASSET_DIST_DIR', 'dist')
+MANIFEST_FILE = 'manifest.json'
+HASH_LENGTH = 12
+# Images and MP3s are already compressed
+COMPRESS_EXTENSIONS = ('.js', '.css', '.html', '.json', '.svg', '.txt')
+MIN_COMPRESS_SIZE = 256
+# Suffix on disk for each Content-Encoding, best first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def fingerprint(path, data):
+    stem, ext = os.path.splitext(path)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Write hashed and precompressed copies of static_dir; returns the manifest."""
+    manifest = {'files': {}, 'encodings': {}}
+    for root, _, names in os.walk(static_dir):
+        for name in sorted(names):
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+            hashed = fingerprint(logical, data)
+            manifest['files'][logical] = hashed
+            target = os.path.join(dist_dir, hashed)
+            if not os.path.exists(target):
+                _write(target, data)
+
+            if not logical.endswith(COMPRESS_EXTENSIONS) or len(data) < MIN_COMPRESS_SIZE:
+                continue
+            compressed = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed['br'] = brotli.compress(data, quality=11)
+            encodings = []
+            for encoding, suffix in ENCODINGS:
+                # Only worth serving if it's actually smaller
+                if encoding in compressed and len(compressed[encoding]) < len(data):
+                    if not os.path.exists(target + suffix):
+                        _write(target + suffix, compressed[encoding])
+                    encodings.append(encoding)
+            if encodings:
+                manifest['encodings'][hashed] = encodings
+    _write(os.path.join(dist_dir, MANIFEST_FILE), json.dumps(manifest, indent=2).encode())
+    return manifest
+
+
+def load_manifest(dist_dir=DIST_DIR):
+    """The manifest from the last build, or an empty one if there hasn't been one."""
+    try:
+        with open(os.path.join(dist_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {'files': {}, 'encodings': {}}
+    return manifest
+
+
+def accepts_encoding(accept_encoding, encoding):
+    """Whether an Accept-Encoding header allows `encoding`, honouring q=0 and *."""
+    return parse_accept_header(accept_encoding)[encoding] > 0
+
+
+def choose_variant(manifest, filename, accept_encoding):
+    """The file to send for a hashed asset: (path in dist, Content-Encoding, mimetype)."""
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    available = manifest['encodings'].get(filename, ())
+    if available:
+        for encoding, suffix in ENCODINGS:
+            if encoding in available and accepts_encoding(accept_encoding, encoding):
+                return filename + suffix, encoding, mimetype
+    return filename, None, mimetype
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build fingerprinted static assets.')
+    parser.add_argument('--static-dir', default=STATIC_DIR)
+    parser.add_argument('--dist-dir', default=DIST_DIR)
+    args = parser.parse_args()
+    manifest = build(args.static_dir, args.dist_dir)
+    for logical, hashed in sorted(manifest['files'].items()):
+        encodings = manifest['encodings'].get(hashed)
+        print(f'{logical} -> {hashed}{" (" + ", ".join(encodings) + ")" if encodings else ""}')
+    if brotli is None:
+        print('brotli is not installed; wrote gzip variants only')
+
+
+if __name__ == '__main__':
+    main()
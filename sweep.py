@@ -0,0 +1,284 @@
+"""Difficulty sweep: simulate bot games over a grid of levels.json settings.
+
+    python sweep.py --grid wall_gap=160,180,200 --grid enemy_shoot_interval=1000,1500 \\
+        --levels 3 4 --start-level 3 --games 400
+
+Each grid point replaces those fields in the chosen levels (all levels by
+default). It then plays the same seeded games through the headless engine,
+so the only difference between points is the settings. The bots rarely get
+past the first few levels, so --start-level starts every game at the first
+level being tuned, and a warning says when an overridden level got too few
+games. Games are split into chunks and spread over a process pool on every
+core. For each level the report gives:
+- how many games reached it and died in it;
+- a Kaplan-Meier survival curve (the chance of still being alive t seconds
+  into the level, where moving on counts as surviving);
+- the final scores of the games that ended there.
+
+Finished points are cached in .cache/sweep/ under a hash of everything that
+affects them: the overrides, the games, the bot, levels.json and the engine
+source. A re-run only simulates new points.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import game_engine
+
+CACHE_DIR = os.path.join('.cache', 'sweep')
+CHUNK_GAMES = 25
+SURVIVAL_SECONDS = (5, 10, 20, 30, 60)
+# Fewer games than this in an overridden level say little about it
+MIN_REACHED = 20
+# Fields that only make sense as whole numbers
+INTEGER_FIELDS = ('wall_gap',)
+# Identify a level or order the table, so they stay as in levels.json
+FIXED_FIELDS = ('level', 'name', 'required_score')
+
+
+def sloppy_policy(seed):
+    """dodge_policy with a human-ish reaction delay and the occasional missed flap."""
+    rng = random.Random(seed ^ 0x5EED)
+    pending = []
+
+    def policy(engine):
+        if game_engine.dodge_policy(engine) and rng.random() > 0.08:
+            pending.append(engine.frame_count + rng.randint(1, 3))
+        if pending and pending[0] <= engine.frame_count:
+            del pending[:]
+            return True
+        return False
+    return policy
+
+
+# gap never dodges projectiles, so it rarely gets past level 1
+POLICIES = {
+    'gap': lambda seed: game_engine.gap_policy,
+    'dodge': lambda seed: game_engine.dodge_policy,
+    'sloppy': sloppy_policy,
+}
+
+
+def parse_grid(specs):
+    """[('wall_gap', [160, 180]), ...] from "field=v1,v2" strings."""
+    grid = []
+    for spec in specs:
+        field, _, values = spec.partition('=')
+        if field not in game_engine.LEVEL_FIELDS or field in FIXED_FIELDS:
+            raise SystemExit(f'{field!r} is not a levels.json field that can be swept')
+        try:
+            parsed = [int(v) if field in INTEGER_FIELDS else float(v) for v in values.split(',')]
+        except ValueError:
+            raise SystemExit(f'bad values for {field}: {values!r}') from None
+        # Every sweepable field is a speed, an interval or a gap
+        if not all(math.isfinite(v) and v > 0 for v in parsed):
+            raise SystemExit(f'values for {field} must be finite and positive: {values!r}')
+        grid.append((field, [int(v) if float(v).is_integer() else v for v in parsed]))
+    return grid
+
+
+def level_table(overrides, level_numbers):
+    return tuple(game_engine.override_level(level, overrides) if number in level_numbers else level
+                 for number, level in enumerate(game_engine.levels, 1))
+
+
+def run_chunk(overrides, level_numbers, policy, seeds, max_frames, start_level=1):
+    """Play seeds with the overridden levels; one (score, deaths, level spans) per game.
+
+    spans are (level index, frames spent in it) in the order they were played.
+    """
+    table = level_table(overrides, level_numbers)
+    games = []
+    for seed in seeds:
+        make_policy = POLICIES[policy]
+        bot = make_policy(seed)
+        engine = game_engine.Engine(level_table=table)
+        engine.start_game(seed, start_level - 1)
+        spans = []
+        entered = 0
+        level = start_level - 1
+        while engine.game_state == 'playing' and engine.frame_count < max_frames:
+            if bot(engine):
+                engine.flap()
+            engine.update()
+            if engine.current_level != level:
+                spans.append((level, engine.frame_count - entered))
+                level, entered = engine.current_level, engine.frame_count
+        spans.append((level, engine.frame_count - entered))
+        games.append((engine.score, engine.game_state == 'game_over', spans))
+    return games
+
+
+def kaplan_meier(durations, checkpoints):
+    """Survival probability at each checkpoint from (frames, died) pairs."""
+    # At tied times, deaths count while the censored games are still at risk
+    durations = sorted(durations, key=lambda d: (d[0], not d[1]))
+    at_risk = len(durations)
+    survival = 1.0
+    curve = []
+    i = 0
+    for checkpoint in checkpoints:
+        while i < len(durations) and durations[i][0] <= checkpoint:
+            frames, died = durations[i]
+            if died and at_risk:
+                survival *= 1 - 1 / at_risk
+            at_risk -= 1
+            i += 1
+        curve.append(round(survival, 4))
+    return curve
+
+
+def summarize(games):
+    levels = {}
+    for score, died, spans in games:
+        for n, (level, frames) in enumerate(spans):
+            last = n == len(spans) - 1
+            entry = levels.setdefault(level, {'durations': [], 'scores': []})
+            entry['durations'].append((frames, died and last))
+            if last:
+                entry['scores'].append(score)
+    checkpoints = [seconds * game_engine.FPS for seconds in SURVIVAL_SECONDS]
+    report = []
+    for level, entry in sorted(levels.items()):
+        scores = sorted(entry['scores'])
+        report.append({
+            'level': level + 1,
+            'reached': len(entry['durations']),
+            'died': sum(died for _, died in entry['durations']),
+            'survival': dict(zip(map(str, SURVIVAL_SECONDS), kaplan_meier(entry['durations'], checkpoints))),
+            'scores': {
+                'games': len(scores),
+                'p10': scores[len(scores) // 10] if scores else None,
+                'p50': scores[len(scores) // 2] if scores else None,
+                'p90': scores[min(len(scores) - 1, len(scores) * 9 // 10)] if scores else None,
+                'max': scores[-1] if scores else None,
+            },
+        })
+    scores = sorted(score for score, _, _ in games)
+    return {'games': len(games), 'mean_score': sum(scores) / len(scores),
+            'median_score': scores[len(scores) // 2], 'levels': report}
+
+
+def point_key(overrides, level_numbers, args, fingerprint):
+    spec = {'overrides': overrides, 'levels': sorted(level_numbers), 'games': args.games,
+            'seed': args.seed, 'policy': args.policy, 'max_frames': args.max_frames,
+            'start_level': args.start_level, 'engine': fingerprint}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:24]
+
+
+def engine_fingerprint():
+    # Anything that changes how a game plays out invalidates the cache,
+    # including the bots defined here
+    digest = hashlib.sha256()
+    for path in (game_engine.__file__, game_engine.CONFIG_FILE, __file__):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def sweep(args):
+    grid = parse_grid(args.grid)
+    count = len(game_engine.levels)
+    if args.games < 1:
+        raise SystemExit('--games must be at least 1')
+    if args.levels and not all(1 <= number <= count for number in args.levels):
+        raise SystemExit(f'--levels must be between 1 and {count}')
+    if not 1 <= args.start_level <= count:
+        raise SystemExit(f'--start-level must be between 1 and {count}')
+    level_numbers = set(args.levels or range(1, count + 1))
+    fields = [field for field, _ in grid]
+    points = [dict(zip(fields, values)) for values in itertools.product(*(v for _, v in grid))]
+    for overrides in points:
+        try:
+            level_table(overrides, level_numbers)  # reject invalid settings before starting
+        except game_engine.ConfigError as e:
+            raise SystemExit(f'{overrides}: {e}') from None
+
+    fingerprint = engine_fingerprint()
+    os.makedirs(args.cache_dir, exist_ok=True)
+    results = {}
+    todo = []
+    for overrides in points:
+        key = point_key(overrides, level_numbers, args, fingerprint)
+        path = os.path.join(args.cache_dir, f'{key}.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                results[key] = json.load(f)
+        else:
+            todo.append((key, path, overrides))
+
+    seeds = list(range(args.seed, args.seed + args.games))
+    chunks = [seeds[i:i + CHUNK_GAMES] for i in range(0, len(seeds), CHUNK_GAMES)]
+    start = time.perf_counter()
+    if todo:
+        with ProcessPoolExecutor(args.workers) as pool:
+            futures = {key: [pool.submit(run_chunk, overrides, level_numbers, args.policy, chunk,
+                                         args.max_frames, args.start_level) for chunk in chunks]
+                       for key, _, overrides in todo}
+            for key, path, overrides in todo:
+                games = [game for future in futures[key] for game in future.result()]
+                result = dict(summarize(games), overrides=overrides)
+                results[key] = result
+                tmp = f'{path}.tmp'
+                with open(tmp, 'w') as f:
+                    json.dump(result, f)
+                os.replace(tmp, path)
+                print(f'  simulated {overrides}', file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    ordered = [results[point_key(overrides, level_numbers, args, fingerprint)] for overrides in points]
+    print(f'{len(points)} points x {args.games} games ({args.policy} bot), levels '
+          f'{",".join(map(str, sorted(level_numbers)))} overridden; '
+          f'{len(todo)} simulated in {elapsed:.1f}s, {len(points) - len(todo)} from cache')
+    for result in ordered:
+        print()
+        print(', '.join(f'{field}={value}' for field, value in result['overrides'].items())
+              + f': mean score {result["mean_score"]:.1f}, median {result["median_score"]}')
+        print(f'  {"level":5} {"reached":>7} {"died":>5}  '
+              + ' '.join(f'{f"S({s}s)":>7}' for s in SURVIVAL_SECONDS)
+              + f'  {"score p10/p50/p90/max":>22}')
+        for level in result['levels']:
+            scores = level['scores']
+            score_text = ('/'.join(str(scores[k]) for k in ('p10', 'p50', 'p90', 'max'))
+                          if scores['games'] else '-')
+            print(f'  {level["level"]:5} {level["reached"]:7} {level["died"]:5}  '
+                  + ' '.join(f'{level["survival"][str(s)]:7.2f}' for s in SURVIVAL_SECONDS)
+                  + f'  {score_text:>22}')
+    for number in sorted(level_numbers):
+        reached = min(next((level['reached'] for level in result['levels'] if level['level'] == number), 0)
+                      for result in ordered)
+        if reached < MIN_REACHED:
+            print(f'warning: level {number} was reached by only {reached} games at some grid '
+                  f'points; try --start-level {number}', file=sys.stderr)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(ordered, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep levels.json settings with simulated games.')
+    parser.add_argument('--grid', action='append', required=True, metavar='FIELD=V1,V2,...',
+                        help='a levels.json field and the values to try; repeat for more fields')
+    parser.add_argument('--levels', type=int, nargs='+', metavar='N',
+                        help='level numbers to override (default: all)')
+    parser.add_argument('--games', type=int, default=200, help='games per grid point')
+    parser.add_argument('--seed', type=int, default=0, help='first game seed')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='sloppy')
+    parser.add_argument('--start-level', type=int, default=1, metavar='N',
+                        help='start every game at this level, with the score needed to reach it')
+    parser.add_argument('--max-frames', type=int, default=game_engine.FPS * 60 * 3)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--json', metavar='FILE', help='also write the results as JSON')
+    sweep(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
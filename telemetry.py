@@ -0,0 +1,267 @@
+"""Client frame-time telemetry: an append-only, gzipped, size-rotated log.
+
+Browsers send batches of frame-time histograms per level, long frames with
+the entity counts on screen when they happened, and asset load timings.
+app.py validates each batch and calls TelemetryLog.append(). Batches are
+buffered and written every few seconds as one gzip member, so they compress
+well, to telemetry-<start time>-<pid>.jsonl.gz. Each gunicorn worker writes
+its own segment. A new segment is started once the current one reaches
+segment_bytes. The oldest segments are deleted beyond max_segments.
+
+    python telemetry.py rollup
+
+reads every segment and prints p50/p95/p99 frame times per level.
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+
+# Upper edges of the frame-time histogram buckets in ms, shared with
+# static/js/game.js. A last, open-ended bucket counts anything slower.
+FRAME_BUCKETS_MS = (8, 12, 17, 20, 25, 34, 50, 67, 100, 250)
+LONG_FRAME_MS = 50
+MAX_LONG_FRAMES = 50  # per batch
+MAX_ASSETS = 32
+MAX_LEVELS = 64
+
+SEGMENT_PATTERN = 'telemetry-*.jsonl.gz'
+# Segments written to this recently may still be open in another worker
+ACTIVE_SEGMENT_AGE = 60.0
+
+
+def parse_batch(data):
+    """A batch as stored, or None if it doesn't validate.
+
+    {"frames": {"<level index>": [count per bucket]},
+     "long": [[ms, level, walls, enemies, projectiles, coins], ...],
+     "assets": [[name, ms, bytes], ...], "load": ms to first frame}
+    """
+    if not isinstance(data, dict):
+        return None
+    frames = data.get('frames', {})
+    long_frames = data.get('long', [])
+    assets = data.get('assets', [])
+    load = data.get('load')
+    if (not isinstance(frames, dict) or len(frames) > MAX_LEVELS
+            or not isinstance(long_frames, list) or len(long_frames) > MAX_LONG_FRAMES
+            or not isinstance(assets, list) or len(assets) > MAX_ASSETS
+            or not (load is None or isinstance(load, (int, float)) and 0 <= load < 3600_000)):
+        return None
+    for level, counts in frames.items():
+        # isdigit() alone would let through digits like '²' that int() rejects
+        if (not (level.isascii() and level.isdecimal()) or int(level) >= MAX_LEVELS
+                or not isinstance(counts, list)
+                or len(counts) != len(FRAME_BUCKETS_MS) + 1
+                or not all(isinstance(n, int) and 0 <= n < 1_000_000 for n in counts)):
+            return None
+    for entry in long_frames:
+        if (not isinstance(entry, list) or len(entry) != 6
+                or not all(isinstance(n, (int, float)) and 0 <= n < 1_000_000 for n in entry)
+                or entry[1] >= MAX_LEVELS):
+            return None
+    for entry in assets:
+        if (not isinstance(entry, list) or len(entry) != 3 or not isinstance(entry[0], str)
+                or len(entry[0]) > 200
+                or not all(isinstance(n, (int, float)) and n >= 0 for n in entry[1:])):
+            return None
+    if not (frames or long_frames or assets or load is not None):
+        return None
+    return {'frames': frames, 'long': long_frames, 'assets': assets, 'load': load}
+
+
+class TelemetryLog:
+    def __init__(self, directory, segment_bytes=16 * 1024 * 1024, max_segments=32,
+                 flush_interval=5.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._cond = threading.Condition()
+        self._segment = None
+        self._thread = None
+        self.stats = {'batches': 0, 'bytes_written': 0, 'segments': 0, 'write_errors': 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, batch):
+        with self._cond:
+            self._pending.append(batch)
+            self.stats['batches'] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, name='telemetry',
+                                                daemon=True)
+                self._thread.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self._cond:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        now = time.time()
+        lines = ''.join(json.dumps(dict(batch, t=round(now, 3)), separators=(',', ':')) + '\n'
+                        for batch in pending)
+        # One gzip member per flush; gzip readers treat the members as one stream
+        member = gzip.compress(lines.encode(), mtime=0)
+        try:
+            path = self._current_segment(len(member))
+            with open(path, 'ab') as f:
+                f.write(member)
+            self.stats['bytes_written'] += len(member)
+        except OSError:
+            self.stats['write_errors'] += 1
+
+    def _current_segment(self, incoming):
+        if self._segment is not None:
+            try:
+                size = os.path.getsize(self._segment)
+            except OSError:
+                size = 0
+            if size + incoming <= self.segment_bytes:
+                return self._segment
+        self._segment = os.path.join(
+            self.directory, f'telemetry-{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}.jsonl.gz')
+        self.stats['segments'] += 1
+        self._prune()
+        return self._segment
+
+    def _prune(self):
+        segments = sorted(glob.glob(os.path.join(self.directory, SEGMENT_PATTERN)),
+                          key=os.path.getmtime)
+        now = time.time()
+        for path in segments[:max(0, len(segments) - self.max_segments)]:
+            try:
+                if now - os.path.getmtime(path) > ACTIVE_SEGMENT_AGE:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def read_batches(directory):
+    for path in sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN))):
+        try:
+            with gzip.open(path, 'rt') as f:
+                for line in f:
+                    yield json.loads(line)
+        except (OSError, EOFError, ValueError):
+            # A segment still being written can end mid-member
+            continue
+
+
+def histogram_percentile(counts, fraction):
+    """Frame time in ms at `fraction`, interpolated within its bucket."""
+    total = sum(counts)
+    if not total:
+        return None
+    target = fraction * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if count and seen + count >= target:
+            if i == len(FRAME_BUCKETS_MS):
+                return float(FRAME_BUCKETS_MS[-1])  # open-ended: a lower bound
+            low = FRAME_BUCKETS_MS[i - 1] if i else 0
+            return low + (FRAME_BUCKETS_MS[i] - low) * (target - seen) / count
+        seen += count
+    return float(FRAME_BUCKETS_MS[-1])
+
+
+def rollup(batches, level_names=()):
+    """Frame-time percentiles and long-frame causes per level, and asset timings.
+
+    Records that don't validate (written by an older version, or damaged)
+    are counted in 'skipped' rather than stopping the rollup.
+    """
+    frames = {}
+    long_frames = {}
+    assets = {}
+    loads = []
+    skipped = 0
+    for batch in batches:
+        batch = parse_batch(batch)
+        if batch is None:
+            skipped += 1
+            continue
+        for level, counts in batch['frames'].items():
+            merged = frames.setdefault(int(level), [0] * (len(FRAME_BUCKETS_MS) + 1))
+            for i, count in enumerate(counts):
+                merged[i] += count
+        for ms, level, walls, enemies, projectiles, coins in batch['long']:
+            long_frames.setdefault(int(level), []).append((ms, walls, enemies, projectiles, coins))
+        for name, ms, size in batch['assets']:
+            assets.setdefault(name, []).append(ms)
+        if batch.get('load') is not None:
+            loads.append(batch['load'])
+
+    levels = []
+    for level in sorted(set(frames) | set(long_frames)):
+        counts = frames.get(level, [0])
+        long = long_frames.get(level, [])
+        entry = {
+            'level': level + 1,
+            'name': level_names[level] if level < len(level_names) else None,
+            'frames': sum(counts),
+            'p50_ms': histogram_percentile(counts, 0.5),
+            'p95_ms': histogram_percentile(counts, 0.95),
+            'p99_ms': histogram_percentile(counts, 0.99),
+            'long_frames': len(long),
+        }
+        if long:
+            entry['mean_on_long_frames'] = {
+                name: round(sum(frame[i] for frame in long) / len(long), 1)
+                for i, name in enumerate(('ms', 'walls', 'enemies', 'projectiles', 'coins'))}
+        levels.append(entry)
+
+    def summary(samples):
+        samples = sorted(samples)
+        return {'count': len(samples), 'p50_ms': samples[len(samples) // 2],
+                'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))]}
+
+    return {'levels': levels,
+            'assets': {name: summary(times) for name, times in sorted(assets.items())},
+            'first_frame': summary(loads) if loads else None, 'skipped': skipped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Client telemetry tools.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    report = commands.add_parser('rollup', help='frame-time percentiles per level')
+    report.add_argument('--dir', default=os.environ.get('TELEMETRY_DIR', 'telemetry'))
+    report.add_argument('--json', action='store_true', help='print the rollup as JSON')
+    args = parser.parse_args()
+
+    import game_engine
+    result = rollup(read_batches(args.dir), [level.name for level in game_engine.levels])
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f'{"level":24} {"frames":>9} {"p50":>7} {"p95":>7} {"p99":>7} {"long":>6}  '
+          f'on long frames: walls/enemies/projectiles/coins')
+    for level in result['levels']:
+        name = f'{level["level"]} {level["name"] or ""}'
+        causes = level.get('mean_on_long_frames')
+        print(f'{name:24} {level["frames"]:9,} '
+              + ' '.join(f'{level[key]:5.1f}ms' if level[key] is not None else f'{"-":>7}'
+                         for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+              + f' {level["long_frames"]:6}'
+              + (f'  {causes["walls"]}/{causes["enemies"]}/{causes["projectiles"]}/{causes["coins"]}'
+                 if causes else ''))
+    for name, timing in result['assets'].items():
+        print(f'asset {name}: p50 {timing["p50_ms"]:.0f}ms, p95 {timing["p95_ms"]:.0f}ms '
+              f'({timing["count"]} loads)')
+    if result['first_frame']:
+        print(f'first frame: p50 {result["first_frame"]["p50_ms"]:.0f}ms, '
+              f'p95 {result["first_frame"]["p95_ms"]:.0f}ms')
+    if result['skipped']:
+        print(f'skipped {result["skipped"]} records that did not validate')
+
+
+if __name__ == '__main__':
+    main()